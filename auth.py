@@ -1,4 +1,4 @@
-from database import create_connection, get_user_by_username
+from database import create_connection, release_connection, get_user_by_username
 from models import User
 
 
@@ -6,7 +6,7 @@ def login(username, password):
     conn = create_connection()
     if conn is not None:
         user = get_user_by_username(conn, username)
-        conn.close()
+        release_connection(conn)
 
         if user is not None and user[2] == password:  # 檢查密碼
             return {
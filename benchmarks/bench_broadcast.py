@@ -0,0 +1,166 @@
+"""同一份需求單派發給多位員工 (廣播) 的儲存與寫入量測試
+
+以版本 7 的結構 (每位接收者一列，各自複製標題、內容與附件) 建立廣播為主的
+測試資料庫，量測需求單相關表格與索引的大小，以及再廣播一份需求單時寫入
+WAL 的位元組數；再執行版本 8 的遷移 (本體只存一份，每位接收者一列精簡的
+指派)，以相同資料重新量測，並以 create_requirements_bulk 量測寫入量。
+
+用法:
+    python benchmarks/bench_broadcast.py [廣播份數] [每份接收人數]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+# 添加父目錄到系統路徑，以便可以導入 database 模組
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import (open_connection, migrate_database, create_requirements_bulk, encode_text,
+                      _query_requirements, _requirement_summary_factory, get_user_names, clear_query_cache)
+
+PAGE_SIZE = 100
+WHERE_SQL = "r.assigner_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0"
+WORDS = ("請", "各位", "同仁", "本週五", "前", "完成", "年度", "資訊安全", "教育訓練", "並", "上傳",
+         "結業證明", "系統", "報表", "資料", "核對", "差異", "清單", "回報", "主管", "會議", "流程")
+REQUIREMENT_TABLES = ('requirement_items', 'requirement_texts', 'requirement_bodies', 'requirement_comments')
+
+
+def description(task):
+    """約 0.5 到 4 KiB 的內容；隨機組合字詞，壓縮率接近一般文件"""
+    rng = random.Random(task)
+    return f"公告 {task}\n" + "".join(rng.choice(WORDS) for _ in range(100 + task % 40 * 20))
+
+
+def build_database(path, task_count, fan_out):
+    """以版本 7 的結構建立測試資料庫：每份需求單派發給 fan_out 位員工，十分之一已提交"""
+    conn = open_connection(path)
+    migrate_database(conn, target_version=7)
+    conn.execute("INSERT INTO users (id, username, password, name, email, role) "
+                 "VALUES (1, 'admin', 'x', 'Admin', 'a@x', 'admin')")
+    conn.executemany(
+        "INSERT INTO users (username, password, name, email, role) VALUES (?, 'x', ?, ?, 'staff')",
+        ((f"staff{i}", f"員工{i}", f"staff{i}@example.com") for i in range(fan_out))
+    )
+    for task in range(task_count):
+        legacy_broadcast(conn, task, fan_out, commit=False)
+    # 十分之一的指派已提交完成說明
+    conn.execute("UPDATE requirement_items SET status = 2, completed_at = created_at + 3600 WHERE id % 10 = 0")
+    conn.execute("UPDATE requirement_texts SET comment = '已完成，證明如附件' WHERE requirement_id % 10 = 0")
+    conn.commit()
+    return conn
+
+
+def legacy_broadcast(conn, task, fan_out, commit=True):
+    """版本 7 的批次派發：每位接收者各寫入一列需求單與一列內容"""
+    created_at = 1704067200 + task * 60
+    first_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM requirement_items").fetchone()[0]
+    conn.executemany(
+        """INSERT INTO requirement_items
+           (title, assigner_id, assignee_id, status, created_at, is_dispatched)
+           VALUES (?, 1, ?, 1, ?, 1)""",
+        ((f"公告 {task}", 2 + staff, created_at) for staff in range(fan_out))
+    )
+    conn.execute(
+        """INSERT INTO requirement_texts (requirement_id, description, attachment_path)
+           SELECT id, ?, ? FROM requirement_items WHERE id > ?""",
+        (encode_text(description(task)), f"/attachments/{task}.pdf", first_id)
+    )
+    if commit:
+        conn.commit()
+
+
+def storage_size(conn):
+    """需求單相關表格與索引的總位元組數；需要 SQLite 編譯時啟用 dbstat"""
+    tables = [name for name in REQUIREMENT_TABLES if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()]
+    placeholders = ', '.join('?' * len(tables))
+    return conn.execute(
+        f"SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN ({placeholders}) "
+        f"OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name IN ({placeholders}))",
+        tables + tables).fetchone()[0]
+
+
+def wal_bytes_written(path, conn, write):
+    """執行 write 後 WAL 檔案增加的位元組數 (期間不做 checkpoint)"""
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("PRAGMA wal_autocheckpoint = 0")
+    try:
+        write()
+        return os.path.getsize(path + "-wal")
+    finally:
+        conn.execute("PRAGMA wal_autocheckpoint = 1000")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def legacy_list(conn, page_size):
+    """版本 7 的列表查詢：標題就在 requirement_items"""
+    sql = f'''
+        SELECT r.id, r.title, r.status, r.priority, r.created_at,
+               r.assigner_id, r.assignee_id, r.scheduled_time, r.deleted_at
+        FROM requirement_items r
+        WHERE {WHERE_SQL}
+        ORDER BY r.created_at DESC, r.id DESC
+    '''
+    if page_size:
+        sql += f" LIMIT {int(page_size)}"
+    cursor = conn.cursor()
+    cursor.row_factory = _requirement_summary_factory(get_user_names(conn))
+    return cursor.execute(sql, [1]).fetchall()
+
+
+def current_list(conn, page_size):
+    """目前的列表查詢：標題以 body_id JOIN requirement_bodies"""
+    return _query_requirements(conn, WHERE_SQL, [1], 'created_at', True, page_size)
+
+
+def report(conn, path, label, list_func):
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    print(label)
+    try:
+        print(f"  需求單表格與索引 {storage_size(conn) / 1024 / 1024:8.2f} MiB  "
+              f"檔案 {os.path.getsize(path) / 1024 / 1024:8.2f} MiB")
+    except Exception as e:
+        print(f"  無法讀取 dbstat ({e})，檔案 {os.path.getsize(path) / 1024 / 1024:.2f} MiB")
+    results = []
+    for name, page_size, repeat in [("第一頁", PAGE_SIZE, 100), ("整份列表", None, 3)]:
+        list_func(conn, page_size)  # 預熱頁面快取
+        start = time.perf_counter()
+        for _ in range(repeat):
+            rows = list_func(conn, page_size)
+        elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+        print(f"  {name:<6} {len(rows):>8} 筆  {elapsed_ms:10.3f} 毫秒")
+        results.append([(row.id, row.title, row.status, row.assignee_name) for row in rows])
+    return results
+
+
+if __name__ == "__main__":
+    task_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    fan_out = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        conn = build_database(path, task_count, fan_out)
+        print(f"廣播 {task_count} 份，每份 {fan_out} 人 (共 {task_count * fan_out} 筆需求單)")
+        before = report(conn, path, "版本 7 (每位接收者一份完整需求單)", legacy_list)
+        legacy_wal = wal_bytes_written(path, conn, lambda: legacy_broadcast(conn, task_count, fan_out))
+        # 移除量測寫入量時新增的那一份，遷移前後的資料才相同
+        first_id = conn.execute("SELECT MAX(id) FROM requirement_items").fetchone()[0] - fan_out
+        conn.execute("DELETE FROM requirement_texts WHERE requirement_id > ?", (first_id,))
+        conn.execute("DELETE FROM requirement_items WHERE id > ?", (first_id,))
+        conn.commit()
+
+        start = time.perf_counter()
+        migrate_database(conn)
+        print(f"遷移至最新版本 {time.perf_counter() - start:.2f} 秒")
+        clear_query_cache()
+        after = report(conn, path, "版本 8 (本體一份 + 精簡的指派)", current_list)
+        print(f"結果一致: {before == after}")
+
+        staff_ids = list(range(2, 2 + fan_out))
+        current_wal = wal_bytes_written(path, conn, lambda: create_requirements_bulk(
+            conn, f"公告 {task_count}", description(task_count), 1, staff_ids,
+            attachment_path=f"/attachments/{task_count}.pdf"))
+        print(f"再廣播一份給 {fan_out} 人寫入 WAL: 版本 7 {legacy_wal / 1024:.0f} KiB, "
+              f"版本 8 {current_wal / 1024:.0f} KiB")
+        conn.close()
@@ -0,0 +1,97 @@
+"""預約發派效能測試
+
+比較舊的「逐筆 UPDATE」發派方式與集合式 dispatch_scheduled_requirements()
+在大量需求單同時到期時的處理速度，並以兩個調度器同時執行驗證不會重複發派。
+
+用法:
+    python benchmarks/bench_dispatch.py [到期筆數]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# 添加父目錄到系統路徑，以便可以導入 database 模組
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import (open_connection, create_tables, dispatch_scheduled_requirements,
+                      encode_timestamp, STATUS_CODES)
+
+
+def build_database(path, due_count):
+    """建立測試資料庫並插入指定數量的已到期預約需求單"""
+    conn = open_connection(path)
+    create_tables(conn)
+    conn.execute("INSERT INTO users (username, password, name, email, role) VALUES ('admin', 'x', 'Admin', 'a@x', 'admin')")
+    conn.execute("INSERT INTO users (username, password, name, email, role) VALUES ('staff', 'x', 'Staff', 's@x', 'staff')")
+    scheduled_time = encode_timestamp("2000-01-01 00:00:00")
+    conn.execute("INSERT INTO requirement_bodies (id, title) VALUES (1, 'benchmark')")
+    conn.executemany(
+        """INSERT INTO requirement_items
+           (body_id, assigner_id, assignee_id, scheduled_time, is_dispatched, status)
+           VALUES (1, 1, 2, ?, 0, ?)""",
+        ((scheduled_time, STATUS_CODES['not_dispatched']) for _ in range(due_count))
+    )
+    conn.commit()
+    return conn
+
+
+def legacy_dispatch(conn):
+    """舊版做法：先查出到期ID，再逐筆 UPDATE"""
+    now = int(time.time())
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT id FROM requirement_items WHERE is_dispatched = 0 AND scheduled_time <= ? AND is_deleted = 0",
+        (now,)
+    )
+    req_ids = [row[0] for row in cursor.fetchall()]
+    for req_id in req_ids:
+        cursor.execute(
+            "UPDATE requirement_items SET is_dispatched = 1, created_at = ?, status = ? WHERE id = ?",
+            (now, STATUS_CODES['pending'], req_id)
+        )
+    conn.commit()
+    return len(req_ids)
+
+
+def measure(label, func, due_count):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, "bench.db"), due_count)
+        start = time.perf_counter()
+        result = func(conn)
+        elapsed = time.perf_counter() - start
+        count = result if isinstance(result, int) else len(result)
+        conn.close()
+    print(f"{label:<12} {count:>8} 筆  {elapsed:8.3f} 秒  {count / elapsed:12,.0f} 筆/秒")
+
+
+def check_concurrent_schedulers(due_count):
+    """兩個調度器同時發派，確認每筆需求單只被認領一次"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_database(path, due_count).close()
+        results = {}
+
+        def run(name):
+            conn = open_connection(path)
+            results[name] = dispatch_scheduled_requirements(conn, claimed_by=name)
+            conn.close()
+
+        threads = [threading.Thread(target=run, args=(f"scheduler-{i}",)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        claimed = [req_id for ids in results.values() for req_id in ids]
+        duplicates = len(claimed) - len(set(claimed))
+        print(f"併發調度器: 共認領 {len(claimed)} 筆 "
+              f"({', '.join(f'{name}={len(ids)}' for name, ids in sorted(results.items()))})，重複 {duplicates} 筆")
+
+
+if __name__ == "__main__":
+    due_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"同時到期的預約需求單: {due_count} 筆")
+    measure("逐筆 UPDATE", legacy_dispatch, due_count)
+    measure("集合式認領", dispatch_scheduled_requirements, due_count)
+    check_concurrent_schedulers(due_count)
@@ -0,0 +1,166 @@
+"""需求單冷熱欄位分表效能測試：每次列表查詢讀取的頁數
+
+以版本 6 的結構 (內容、完成說明與附件路徑和列表欄位放在同一列) 建立測試資料庫，
+量測各種列表查詢從資料庫檔案讀取的頁數與時間；再執行版本 7 的遷移
+(大文字欄位移到 requirement_texts)，以相同資料重新量測。
+查詢與版本 6、7 的列表查詢相同 (標題仍在 requirement_items)。
+
+頁數以 Linux 的 /proc/self/io (rchar) 計算：每次量測都開新連接 (頁面快取為空)
+並關閉 mmap，SQLite 每讀一頁就是一次 page_size 的 read，讀取量除以 page_size
+即為頁數。其他平台只量測時間。
+
+用法:
+    python benchmarks/bench_hot_cold.py [需求單筆數] [員工人數]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# 添加父目錄到系統路徑，以便可以導入 database 模組
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import (open_connection, migrate_database, _count_requirements, _requirement_summary_factory,
+                      get_user_names, encode_timestamp, STATUS_CODES)
+
+PAGE_SIZE = 100
+ADMIN_WHERE = "r.assigner_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0"
+STAFF_WHERE = "r.assignee_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0 AND r.status = ?"
+STATUSES = ('pending', 'reviewing', 'completed', 'invalid')
+PARAGRAPH = "請於本週內完成系統報表的資料核對，並將差異整理成清單回報。"
+
+
+def list_query(conn, where_sql, params, order_sql, page_size=None):
+    """版本 6、7 的列表查詢 (只讀列表欄位)，回傳筆數"""
+    sql = f'''
+        SELECT r.id, r.title, r.status, r.priority, r.created_at,
+               r.assigner_id, r.assignee_id, r.scheduled_time, r.deleted_at
+        FROM requirement_items r
+        WHERE {where_sql}
+        ORDER BY {order_sql}
+    '''
+    if page_size:
+        sql += f" LIMIT {int(page_size)}"
+    cursor = conn.cursor()
+    cursor.row_factory = _requirement_summary_factory(get_user_names(conn))
+    return len(cursor.execute(sql, params).fetchall())
+
+
+def detail_query(conn, req_id):
+    """版本 7 的詳情查詢：以主鍵讀取列表欄位與 requirement_texts"""
+    return conn.execute('''
+        SELECT r.*, t.description, t.comment, t.attachment_path
+        FROM requirement_items r LEFT JOIN requirement_texts t ON t.requirement_id = r.id
+        WHERE r.id = ?
+    ''', (req_id,)).fetchone()
+
+
+# (名稱, 查詢)；查詢接受連接並回傳筆數
+QUERIES = [
+    ("管理員第一頁", lambda conn: list_query(
+        conn, ADMIN_WHERE, [1], "r.created_at DESC, r.id DESC", PAGE_SIZE)),
+    ("管理員整份列表", lambda conn: list_query(
+        conn, ADMIN_WHERE, [1], "r.created_at DESC, r.id DESC")),
+    ("依標題排序第一頁", lambda conn: list_query(
+        conn, ADMIN_WHERE, [1], "r.title, r.id", PAGE_SIZE)),
+    ("員工待處理列表", lambda conn: list_query(
+        conn, STAFF_WHERE, [2, STATUS_CODES['pending']], "r.created_at DESC, r.id DESC")),
+    ("管理員筆數", lambda conn: _count_requirements(conn, ADMIN_WHERE, [1])),
+]
+
+
+def build_database(path, requirement_count, staff_count):
+    """以版本 6 的結構建立測試資料庫；內容長度約 0.3 到 6 KiB，已提交的需求單附完成說明"""
+    conn = open_connection(path)
+    migrate_database(conn, target_version=6)
+    conn.execute("INSERT INTO users (id, username, password, name, email, role) "
+                 "VALUES (1, 'admin', 'x', 'Admin', 'a@x', 'admin')")
+    conn.executemany(
+        "INSERT INTO users (username, password, name, email, role) VALUES (?, 'x', ?, ?, 'staff')",
+        ((f"staff{i}", f"員工{i}", f"staff{i}@example.com") for i in range(staff_count))
+    )
+    start = encode_timestamp("2024-01-01 00:00:00")
+    rows = []
+    for i in range(requirement_count):
+        status = STATUSES[i % len(STATUSES)]
+        rows.append((
+            f"req {i}", f"需求單 {i}\n" + PARAGRAPH * (1 + i % 60), 2 + i % staff_count,
+            STATUS_CODES[status], start + i,
+            start + i + 3600 if status != 'pending' else None,
+            PARAGRAPH * (1 + i % 8) if status != 'pending' else None,
+            f"/attachments/{i}.pdf" if i % 10 == 0 else None,
+        ))
+    conn.executemany(
+        """INSERT INTO requirement_items
+           (title, description, assigner_id, assignee_id, status, created_at, completed_at,
+            comment, attachment_path, is_dispatched, dispatched_by)
+           VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, 1, 'bench')""",
+        rows
+    )
+    conn.commit()
+    return conn
+
+
+def read_bytes():
+    """本程序累計讀取的位元組數；無法取得時回傳 None"""
+    try:
+        with open("/proc/self/io") as io:
+            for line in io:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def measure(path, query):
+    """以空的頁面快取執行一次查詢，回傳 (筆數, 讀取頁數或 None, 毫秒)"""
+    conn = open_connection(path)
+    try:
+        conn.execute("PRAGMA mmap_size = 0")
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()  # 先載入結構描述
+        get_user_names(conn)
+        before = read_bytes()
+        start = time.perf_counter()
+        count = query(conn)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        after = read_bytes()
+        pages = None if before is None else (after - before) / page_size
+        return count, pages, elapsed_ms
+    finally:
+        conn.close()
+
+
+def report(conn, path, label):
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    print(f"{label}  檔案 {os.path.getsize(path) / 1024:.0f} KiB")
+    results = {}
+    for name, query in QUERIES:
+        count, pages, elapsed_ms = measure(path, query)
+        pages_text = "  (無法讀取 /proc/self/io)" if pages is None else f"{pages:10.0f} 頁"
+        print(f"  {name:<10} {count:>8} 筆 {pages_text}  {elapsed_ms:10.2f} 毫秒")
+        results[name] = count
+    return results
+
+
+if __name__ == "__main__":
+    requirement_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    staff_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        conn = build_database(path, requirement_count, staff_count)
+        print(f"需求單 {requirement_count} 筆，員工 {staff_count} 人 (每次查詢皆為冷快取)")
+        before = report(conn, path, "版本 6 (大文字欄位與列表欄位同一列)")
+
+        start = time.perf_counter()
+        migrate_database(conn, target_version=7)
+        print(f"遷移至版本 7 {time.perf_counter() - start:.2f} 秒")
+        after = report(conn, path, "版本 7 (列表欄位 requirement_items / 大文字 requirement_texts)")
+        print(f"結果一致: {before == after}")
+
+        detail = lambda c: 1 if detail_query(c, requirement_count // 2) else 0
+        count, pages, elapsed_ms = measure(path, detail)
+        pages_text = "" if pages is None else f"  {pages:.0f} 頁"
+        print(f"詳情視窗 (單筆需求單){pages_text}  {elapsed_ms:.2f} 毫秒")
+        conn.close()
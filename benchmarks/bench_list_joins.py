@@ -0,0 +1,99 @@
+"""需求單列表查詢效能測試：JOIN users 與姓名對照表
+
+比較舊的列表查詢 (每一列 JOIN users 兩次取得發派者與接收者姓名) 與
+目前的做法 (只讀使用者ID，再以記憶體中的姓名對照表補上姓名)，
+分別量測第一頁 (LIMIT) 與整份列表的查詢時間。
+
+用法:
+    python benchmarks/bench_list_joins.py [需求單筆數] [員工人數]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# 添加父目錄到系統路徑，以便可以導入 database 模組
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import (open_connection, create_tables, _query_requirements, get_user_names,
+                      encode_timestamp, STATUS_CODES)
+
+PAGE_SIZE = 100
+WHERE_SQL = "r.assigner_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0"
+
+
+def build_database(path, requirement_count, staff_count):
+    """建立測試資料庫：一位管理員發派需求單給多位員工"""
+    conn = open_connection(path)
+    create_tables(conn)
+    conn.execute("INSERT INTO users (id, username, password, name, email, role) "
+                 "VALUES (1, 'admin', 'x', 'Admin', 'a@x', 'admin')")
+    conn.executemany(
+        "INSERT INTO users (username, password, name, email, role) VALUES (?, 'x', ?, ?, 'staff')",
+        ((f"staff{i}", f"員工{i}", f"staff{i}@example.com") for i in range(staff_count))
+    )
+    start = encode_timestamp("2024-01-01 00:00:00")
+    conn.executemany("INSERT INTO requirement_bodies (id, title) VALUES (?, ?)",
+                     ((i + 1, f"req {i}") for i in range(requirement_count)))
+    conn.executemany(
+        """INSERT INTO requirement_items
+           (body_id, assigner_id, assignee_id, status, created_at, is_dispatched)
+           VALUES (?, 1, ?, ?, ?, 1)""",
+        ((i + 1, 2 + i % staff_count, STATUS_CODES['pending'], start + i % 3600)
+         for i in range(requirement_count))
+    )
+    conn.commit()
+    return conn
+
+
+def legacy_query(conn, admin_id, page_size):
+    """舊版做法：JOIN users 兩次取得姓名"""
+    sql = f'''
+        SELECT r.id, b.title, r.status, r.priority, r.created_at,
+               assigner_user.name, assignee_user.name, r.scheduled_time, r.deleted_at
+        FROM requirement_items r
+        JOIN requirement_bodies b ON b.id = r.body_id
+        JOIN users assigner_user ON r.assigner_id = assigner_user.id
+        JOIN users assignee_user ON r.assignee_id = assignee_user.id
+        WHERE {WHERE_SQL}
+        ORDER BY r.created_at DESC, r.id DESC
+    '''
+    params = [admin_id]
+    if page_size:
+        sql += " LIMIT ?"
+        params.append(page_size)
+    return conn.execute(sql, params).fetchall()
+
+
+def current_query(conn, admin_id, page_size):
+    """目前做法：只讀ID，以姓名對照表補上姓名"""
+    return _query_requirements(conn, WHERE_SQL, [admin_id], 'created_at', True, page_size)
+
+
+def ids_and_names(rows):
+    """兩種做法的 (ID, 發派者姓名, 接收者姓名)，用來確認結果一致"""
+    return [(row[0], row[5], row[6]) for row in rows]
+
+
+def measure(label, func, conn, page_size, repeat):
+    func(conn, 1, page_size)  # 預熱頁面快取
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = func(conn, 1, page_size)
+    elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label:<10} {len(rows):>8} 筆  {elapsed_ms:10.3f} 毫秒")
+    return rows
+
+
+if __name__ == "__main__":
+    requirement_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    staff_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, "bench.db"), requirement_count, staff_count)
+        get_user_names(conn)
+        print(f"需求單 {requirement_count} 筆，員工 {staff_count} 人")
+        for title, page_size, repeat in [("第一頁", PAGE_SIZE, 200), ("整份列表", None, 3)]:
+            print(title)
+            legacy = measure("JOIN users", legacy_query, conn, page_size, repeat)
+            current = measure("姓名對照表", current_query, conn, page_size, repeat)
+            print(f"  結果一致: {ids_and_names(legacy) == ids_and_names(current)}")
+        conn.close()
@@ -0,0 +1,107 @@
+"""需求單列表資料列效能測試：原始 tuple 與 RequirementSummary
+
+比較舊的做法 (查詢回傳原始 tuple，介面每次繪製時解包並轉換代碼與時間)
+與目前的做法 (row factory 在查詢時產生 RequirementSummary 並解碼一次，
+介面直接以屬性讀取)，量測查詢、繪製與兩者合計的時間，以及每列佔用的記憶體。
+
+用法:
+    python benchmarks/bench_requirement_rows.py [需求單筆數] [員工人數]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# 添加父目錄到系統路徑，以便可以導入 database 模組
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import _query_requirements, get_user_names, STATUS_NAMES, PRIORITY_NAMES
+from models import STATUS_TEXT, PRIORITY_TEXT
+from bench_list_joins import build_database, WHERE_SQL
+
+RENDERS = 3
+
+
+def legacy_query(conn, admin_id):
+    """舊版做法：回傳原始 tuple，狀態與時間仍是資料庫中的值"""
+    rows = conn.execute(f'''
+        SELECT r.id, b.title, r.status, r.priority, r.created_at,
+               r.assigner_id, r.assignee_id, r.scheduled_time, r.deleted_at
+        FROM requirement_items r
+        JOIN requirement_bodies b ON b.id = r.body_id
+        WHERE {WHERE_SQL}
+        ORDER BY r.created_at DESC, r.id DESC
+    ''', [admin_id]).fetchall()
+    names = get_user_names(conn)
+    return [
+        (req_id, title, status, priority, created_at,
+         names.get(assigner_id, ''), names.get(assignee_id, ''), scheduled_time, deleted_at)
+        for req_id, title, status, priority, created_at,
+            assigner_id, assignee_id, scheduled_time, deleted_at in rows
+    ]
+
+
+def legacy_render(requirements):
+    """舊版繪製：每列檢查長度、解包並轉換代碼與時間"""
+    rows = []
+    for req in requirements:
+        if len(req) < 9:
+            continue
+        (req_id, title, status, priority, created_at,
+         assigner_name, assignee_name, scheduled_time, deleted_at) = req
+        try:
+            date_text = datetime.datetime.fromtimestamp(created_at).strftime("%Y-%m-%d %H:%M")
+        except (TypeError, ValueError):
+            date_text = created_at
+        status_text = STATUS_TEXT.get(STATUS_NAMES[status])
+        priority_text = PRIORITY_TEXT[PRIORITY_NAMES[priority]]
+        rows.append((req_id, (req_id, title, assignee_name, status_text, priority_text, date_text)))
+    return rows
+
+
+def current_query(conn, admin_id):
+    """目前做法：row factory 產生 RequirementSummary"""
+    return _query_requirements(conn, WHERE_SQL, [admin_id], 'created_at', True, None)
+
+
+def current_render(requirements):
+    """目前繪製：以屬性讀取，時間已是 datetime"""
+    rows = []
+    for req in requirements:
+        date_text = req.created_at.strftime("%Y-%m-%d %H:%M")
+        rows.append((req.id, (req.id, req.title, req.assignee_name, req.status_text, req.priority_text, date_text)))
+    return rows
+
+
+def measure(label, query, render, conn):
+    query(conn, 1)  # 預熱頁面快取
+    start = time.perf_counter()
+    requirements = query(conn, 1)
+    query_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(RENDERS):
+        rendered = render(requirements)
+    render_ms = (time.perf_counter() - start) / RENDERS * 1000
+
+    # 只計算資料列本身 (含時間物件) 佔用的記憶體
+    tracemalloc.start()
+    requirements = query(conn, 1)
+    row_bytes = tracemalloc.get_traced_memory()[0] / max(1, len(requirements))
+    tracemalloc.stop()
+    print(f"  {label:<18} 查詢 {query_ms:9.1f} 毫秒  繪製 {render_ms:9.1f} 毫秒  "
+          f"合計 {query_ms + render_ms:9.1f} 毫秒  每列 {row_bytes:6.0f} 位元組")
+    return rendered
+
+
+if __name__ == "__main__":
+    requirement_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    staff_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, "bench.db"), requirement_count, staff_count)
+        get_user_names(conn)
+        print(f"需求單 {requirement_count} 筆，員工 {staff_count} 人 (繪製取 {RENDERS} 次平均)")
+        legacy = measure("tuple + 逐列轉換", legacy_query, legacy_render, conn)
+        current = measure("RequirementSummary", current_query, current_render, conn)
+        print(f"  結果一致: {legacy == current}")
+        conn.close()
@@ -0,0 +1,166 @@
+"""需求單全文搜尋效能測試
+
+以最新結構建立測試資料庫 (需求單本體、指派與完成說明直接以 SQL 寫入，再以
+rebuild_search_index() 建立全文索引)，量測各種搜尋在管理員與員工範圍內的回應時間、
+全文索引的大小，以及同時更新索引的單筆發派與提交的時間。
+內容以 Zipf 分布隨機組合字詞：最常見的詞出現在三成以上的需求單，罕見的詞只有幾筆。
+
+用法:
+    python benchmarks/bench_search.py [需求單筆數] [員工人數]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+# 添加父目錄到系統路徑，以便可以導入 database 模組
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import (open_connection, migrate_database, search_requirements, create_requirement,
+                      submit_requirement, rebuild_search_index, encode_text, encode_timestamp)
+
+ADMIN_COUNT = 5
+BROADCAST_EVERY = 10     # 每 10 份本體有 1 份是廣播
+BROADCAST_SIZE = 20      # 廣播給幾位員工
+COMMENT_EVERY = 3        # 每 3 筆需求單有 1 筆已提交完成說明
+REPEAT = 20
+WRITES = 200
+CHARS = ("的一是在不了有和人這中大為上個國我以要他時來用們生到作地於出就分對成會可主發年動同工也能下過子說產"
+         "種面而方後多定行學法所民得經十三之進著等部度家電力裡如水化高自二理起小物現實加量都兩體制機當使點從業"
+         "本去把性好應開它合還因由其些然前外天政四日那社義事平形相全表間樣與關各重新線內數正心反你明看原又麼利"
+         "比或但質氣第向道命此變條只沒結解問意建月公無系軍很情者最立代想已通並提直題黨程展五果料象員革位入常文"
+         "總次品式活設及管特件長求老頭基資邊流路級少圖山統接知較將組見計別她手角期根論運農指幾九區強放決西被幹做"
+         "必戰先回則任取據處隊南給色光門即保治北造百規熱領七海口東導器壓志世金增爭濟階油思術極交受聯什認六共權收證改清")
+ENGLISH = ("ERP", "VPN", "SAP", "API", "SQL", "excel", "report", "server", "backup", "invoice",
+           "deploy", "printer", "firewall", "license", "payroll", "budget", "audit", "vendor")
+
+
+def vocabulary(rng, size=6000):
+    """約 size 個二到四字的詞與少量英文詞；依 Zipf 分布給權重 (第 k 個詞的權重為 1/k)"""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(CHARS) for _ in range(rng.choice((2, 2, 2, 3, 4)))))
+    words = sorted(words)
+    rng.shuffle(words)
+    words[50:50] = ENGLISH
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    return words, weights
+
+
+def build_database(path, requirement_count, staff_count):
+    """以最新結構建立測試資料庫；回傳 (連接, 字詞表, 建立全文索引的秒數)"""
+    rng = random.Random(25)
+    words, weights = vocabulary(rng)
+    conn = open_connection(path)
+    migrate_database(conn)
+    conn.executemany(
+        "INSERT INTO users (id, username, password, name, email, role) VALUES (?, ?, 'x', ?, ?, 'admin')",
+        ((i, f"admin{i}", f"管理員{i}", f"admin{i}@example.com") for i in range(1, ADMIN_COUNT + 1))
+    )
+    conn.executemany(
+        "INSERT INTO users (username, password, name, email, role) VALUES (?, 'x', ?, ?, 'staff')",
+        ((f"staff{i}", f"員工{i}", f"staff{i}@example.com") for i in range(staff_count))
+    )
+
+    def text(low, high, sep=""):
+        return sep.join(rng.choices(words, weights, k=rng.randint(low, high)))
+
+    start = encode_timestamp("2024-01-01 00:00:00")
+    first_staff = ADMIN_COUNT + 1
+    req_id = 0
+    body_id = 0
+    with conn:
+        while req_id < requirement_count:
+            body_id += 1
+            conn.execute("INSERT INTO requirement_bodies (id, title) VALUES (?, ?)", (body_id, text(2, 6)))
+            conn.execute("INSERT INTO requirement_texts (body_id, description) VALUES (?, ?)",
+                         (body_id, encode_text(text(20, 160, rng.choice(("", "，", " "))))))
+            fan_out = BROADCAST_SIZE if body_id % BROADCAST_EVERY == 0 else 1
+            assigner_id = 1 + body_id % ADMIN_COUNT
+            for assignee in rng.sample(range(staff_count), min(fan_out, requirement_count - req_id, staff_count)):
+                req_id += 1
+                submitted = req_id % COMMENT_EVERY == 0
+                conn.execute(
+                    """INSERT INTO requirement_items
+                       (id, body_id, assigner_id, assignee_id, status, created_at, completed_at, is_dispatched)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, 1)""",
+                    (req_id, body_id, assigner_id, first_staff + assignee, 2 if submitted else 1,
+                     start + body_id * 60, start + body_id * 60 + 3600 if submitted else None))
+                if submitted:
+                    conn.execute("INSERT INTO requirement_comments (requirement_id, comment) VALUES (?, ?)",
+                                 (req_id, text(5, 40)))
+    start = time.perf_counter()
+    rebuild_search_index(conn)
+    index_seconds = time.perf_counter() - start
+    conn.execute("PRAGMA optimize")
+    return conn, words, index_seconds
+
+
+def index_size(conn):
+    """全文索引 (兩個 FTS5 表格的影子表格) 的位元組數；需要 SQLite 編譯時啟用 dbstat"""
+    try:
+        return conn.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'requirement_%_search_%'").fetchone()[0]
+    except Exception:
+        return None
+
+
+def measure(conn, query, **scope):
+    search_requirements(conn, query, **scope)  # 預熱頁面快取
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        results = search_requirements(conn, query, **scope)
+    return results, (time.perf_counter() - start) / REPEAT * 1000
+
+
+def measure_writes(conn, words):
+    """單筆發派與提交 (各自一個交易，同時更新全文索引) 的平均毫秒數"""
+    rng = random.Random(1)
+    req_ids = []
+    start = time.perf_counter()
+    for i in range(WRITES):
+        req_ids.append(create_requirement(
+            conn, " ".join(rng.sample(words[:500], 3)), "".join(rng.choices(words[:2000], k=80)),
+            1, ADMIN_COUNT + 1 + i % 10))
+    dispatch_ms = (time.perf_counter() - start) / WRITES * 1000
+    start = time.perf_counter()
+    for req_id in req_ids:
+        submit_requirement(conn, req_id, "".join(rng.choices(words[:2000], k=20)))
+    submit_ms = (time.perf_counter() - start) / WRITES * 1000
+    return dispatch_ms, submit_ms
+
+
+if __name__ == "__main__":
+    requirement_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    staff_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        start = time.perf_counter()
+        conn, words, index_seconds = build_database(path, requirement_count, staff_count)
+        print(f"需求單 {requirement_count} 筆，員工 {staff_count} 人，"
+              f"建立 {time.perf_counter() - start:.1f} 秒 (其中建立全文索引 {index_seconds:.1f} 秒)")
+        size = index_size(conn)
+        if size is not None:
+            print(f"全文索引 {size / 1024 / 1024:.1f} MiB，資料庫檔案 {os.path.getsize(path) / 1024 / 1024:.1f} MiB")
+
+        queries = [
+            ("單字", words[0][0]),
+            ("最常見的詞", words[0]),
+            ("常見詞", words[10]),
+            ("中等詞", words[300]),
+            ("罕見詞", words[-1]),
+            ("兩個詞", f"{words[5]} {words[200]}"),
+            ("英文前綴", ENGLISH[9][:3]),
+            ("無結果", "不存在的詞xyz"),
+        ]
+        scopes = [("管理員", {"assigner_id": 1}), ("員工", {"assignee_id": ADMIN_COUNT + 1})]
+        for label, query in queries:
+            for scope_label, scope in scopes:
+                results, elapsed_ms = measure(conn, query, **scope)
+                order = "無" if not results else "最新" if results[0].score is None else "相關度"
+                print(f"  {label:<6} {query!r:<16} {scope_label:<4} {len(results):>3} 筆 ({order})  "
+                      f"{elapsed_ms:8.2f} 毫秒")
+
+        dispatch_ms, submit_ms = measure_writes(conn, words)
+        print(f"單筆發派 {dispatch_ms:.2f} 毫秒，單筆提交 {submit_ms:.2f} 毫秒 (含全文索引更新)")
+        conn.close()
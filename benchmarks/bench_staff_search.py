@@ -0,0 +1,56 @@
+"""員工搜尋效能測試
+
+以隨機產生的員工資料建立 StaffSearchIndex，量測建立索引的時間與各種查詢
+(姓名、帳號、Email 的前綴與子字串、找不到的字串) 每次按鍵的平均回應時間。
+
+用法:
+    python benchmarks/bench_staff_search.py [員工人數]
+"""
+import os
+import random
+import string
+import sys
+import time
+
+# 添加父目錄到系統路徑，以便可以導入 staff_directory 模組
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from staff_directory import StaffSearchIndex
+
+SURNAMES = "王李張劉陳楊黃趙吳周徐孫馬朱胡郭何林高羅"
+GIVEN_NAMES = "偉芳娜敏靜麗強磊軍洋勇艷傑娟濤明超秀霞平剛桂英"
+
+
+def build_profiles(count, seed=1):
+    """產生 [(id, name, username, email), ...]"""
+    rng = random.Random(seed)
+    profiles = []
+    for staff_id in range(1, count + 1):
+        name = rng.choice(SURNAMES) + "".join(rng.choice(GIVEN_NAMES) for _ in range(rng.randint(1, 2)))
+        username = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+        profiles.append((staff_id, name, username, f"{username}.{staff_id}@example.com"))
+    return profiles
+
+
+def measure(index, query, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = index.search(query)
+    elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {query!r:<14} {len(results):>3} 筆  {elapsed_ms:8.3f} 毫秒")
+    return elapsed_ms
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    profiles = build_profiles(count)
+    start = time.perf_counter()
+    index = StaffSearchIndex(profiles)
+    print(f"員工 {count} 人，建立索引 {time.perf_counter() - start:.3f} 秒")
+
+    sample = profiles[len(profiles) // 2]
+    queries = ["", "a", "王", sample[1], sample[2][:3], sample[2][1:4],
+               "@ex", "example", f".{sample[0]}", "zzzzzz"]
+    # 模擬逐字輸入一個 Email
+    queries += [sample[3][:length] for length in range(1, len(sample[3]) + 1, 3)]
+    worst = max(measure(index, query) for query in queries)
+    print(f"最慢的查詢: {worst:.3f} 毫秒")
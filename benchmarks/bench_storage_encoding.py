@@ -0,0 +1,148 @@
+"""需求單儲存格式效能測試：文字狀態與時間字串 (版本 5) 與整數代碼與 epoch (版本 6)
+
+以版本 5 的結構建立測試資料庫，量測 requirements 表格與索引的大小及列表載入
+時間 (包含把時間字串解析為 datetime)，再執行版本 6 的遷移並以相同資料量測
+requirement_items 的大小與列表查詢 (以目前的 row factory 解碼) 的載入時間。
+
+用法:
+    python benchmarks/bench_storage_encoding.py [需求單筆數] [員工人數]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+# 添加父目錄到系統路徑，以便可以導入 database 模組
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlite3 import Error
+
+from database import (open_connection, migrate_database, _requirement_summary_factory, get_user_names)
+from models import RequirementSummary
+
+PAGE_SIZE = 100
+WHERE_SQL = "r.assigner_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0"
+STATUSES = ('pending', 'reviewing', 'completed', 'invalid')
+
+
+def build_legacy_database(path, requirement_count, staff_count):
+    """以版本 5 的結構 (文字狀態、時間字串) 建立測試資料庫"""
+    conn = open_connection(path)
+    migrate_database(conn, target_version=5)
+    conn.execute("INSERT INTO users (id, username, password, name, email, role) "
+                 "VALUES (1, 'admin', 'x', 'Admin', 'a@x', 'admin')")
+    conn.executemany(
+        "INSERT INTO users (username, password, name, email, role) VALUES (?, 'x', ?, ?, 'staff')",
+        ((f"staff{i}", f"員工{i}", f"staff{i}@example.com") for i in range(staff_count))
+    )
+    start = datetime.datetime(2024, 1, 1)
+    conn.executemany(
+        """INSERT INTO requirements
+           (title, description, assigner_id, assignee_id, status, priority, created_at,
+            completed_at, is_dispatched, dispatched_by)
+           VALUES (?, 'benchmark', 1, ?, ?, ?, ?, ?, 1, 'bench')""",
+        ((f"req {i}", 2 + i % staff_count, STATUSES[i % len(STATUSES)],
+          'urgent' if i % 5 == 0 else 'normal',
+          (start + datetime.timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"),
+          (start + datetime.timedelta(seconds=i, hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+          if STATUSES[i % len(STATUSES)] != 'pending' else None)
+         for i in range(requirement_count))
+    )
+    conn.commit()
+    return conn
+
+
+def storage_size(conn, table):
+    """回傳 (表格位元組, 索引位元組)；需要 SQLite 編譯時啟用 dbstat"""
+    indexes = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table,))]
+    sizes = dict(conn.execute(
+        f"SELECT name, SUM(pgsize) FROM dbstat WHERE name IN ({', '.join('?' * (len(indexes) + 1))}) "
+        "GROUP BY name", [table] + indexes).fetchall())
+    return sizes.get(table, 0), sum(sizes.get(name, 0) for name in indexes)
+
+
+def legacy_load(conn, admin_id, page_size):
+    """版本 5：讀取文字欄位，再把時間字串解析為 datetime"""
+    sql = f'''
+        SELECT r.id, r.title, r.status, r.priority, r.created_at,
+               r.assigner_id, r.assignee_id, r.scheduled_time, r.deleted_at
+        FROM requirements r
+        WHERE {WHERE_SQL}
+        ORDER BY r.created_at DESC, r.id DESC
+    '''
+    params = [admin_id]
+    if page_size:
+        sql += " LIMIT ?"
+        params.append(page_size)
+    names = get_user_names(conn)
+    parse = datetime.datetime.fromisoformat
+    return [
+        RequirementSummary(req_id, title, status, priority, parse(created_at),
+                           names.get(assigner_id, ''), names.get(assignee_id, ''),
+                           parse(scheduled_time) if scheduled_time else None,
+                           parse(deleted_at) if deleted_at else None)
+        for req_id, title, status, priority, created_at,
+            assigner_id, assignee_id, scheduled_time, deleted_at in conn.execute(sql, params)
+    ]
+
+
+def current_load(conn, admin_id, page_size):
+    """版本 6：整數代碼與 epoch 由列表查詢的 row factory 解碼"""
+    sql = f'''
+        SELECT r.id, r.title, r.status, r.priority, r.created_at,
+               r.assigner_id, r.assignee_id, r.scheduled_time, r.deleted_at
+        FROM requirement_items r
+        WHERE {WHERE_SQL}
+        ORDER BY r.created_at DESC, r.id DESC
+    '''
+    params = [admin_id]
+    if page_size:
+        sql += " LIMIT ?"
+        params.append(page_size)
+    cursor = conn.cursor()
+    cursor.row_factory = _requirement_summary_factory(get_user_names(conn))
+    return cursor.execute(sql, params).fetchall()
+
+
+def measure_load(label, func, conn, page_size, repeat):
+    func(conn, 1, page_size)  # 預熱頁面快取
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = func(conn, 1, page_size)
+    elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+    print(f"    {label:<8} {len(rows):>8} 筆  {elapsed_ms:10.3f} 毫秒")
+    return rows
+
+
+def report(conn, path, table, load, label):
+    conn.execute("VACUUM")
+    print(f"{label}")
+    try:
+        table_bytes, index_bytes = storage_size(conn, table)
+        print(f"  表格 {table_bytes / 1024:10.0f} KiB  索引 {index_bytes / 1024:10.0f} KiB  "
+              f"檔案 {os.path.getsize(path) / 1024:10.0f} KiB")
+    except Error as e:
+        print(f"  無法讀取 dbstat ({e})，檔案 {os.path.getsize(path) / 1024:.0f} KiB")
+    return {
+        "first_page": measure_load("第一頁", load, conn, PAGE_SIZE, 200),
+        "full_list": measure_load("整份列表", load, conn, None, 3),
+    }
+
+
+if __name__ == "__main__":
+    requirement_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    staff_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        conn = build_legacy_database(path, requirement_count, staff_count)
+        print(f"需求單 {requirement_count} 筆，員工 {staff_count} 人")
+        legacy = report(conn, path, "requirements", legacy_load, "版本 5 (文字狀態、時間字串)")
+
+        start = time.perf_counter()
+        # 只遷移到版本 6：之後的版本把大文字欄位移出 requirement_items，表格大小無法直接比較
+        migrate_database(conn, target_version=6)
+        print(f"遷移至版本 6 {time.perf_counter() - start:.2f} 秒")
+        current = report(conn, path, "requirement_items", current_load, "版本 6 (整數代碼、epoch)")
+        print(f"結果一致: {legacy == current}")
+        conn.close()
@@ -1,16 +1,381 @@
 import sqlite3
 from sqlite3 import Error
+import base64
 import datetime
+import json
+import os
+import re
+import socket
+import threading
+import time
+import zlib
+
+from models import Requirement, RequirementSummary, RequirementSearchResult
+from query_cache import QueryCache
+
+# 資料庫檔案一律以本模組所在目錄解析成絕對路徑，不受目前工作目錄影響
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.db')
+
+# 等待其他連接釋放鎖的最長時間 (毫秒)
+BUSY_TIMEOUT_MS = 5000
+
+# 每個連接建立時套用的 PRAGMA 設定
+CONNECTION_PRAGMAS = (
+    ("journal_mode", "WAL"),         # 讀寫互不阻塞，減少 "database is locked"
+    ("synchronous", "NORMAL"),       # WAL 模式下安全且大幅減少 fsync
+    ("busy_timeout", BUSY_TIMEOUT_MS),
+    ("cache_size", -20000),          # 負數表示 KiB，約 20MB 頁面快取
+    ("mmap_size", 268435456),        # 256MB 記憶體映射讀取
+    ("temp_store", "MEMORY"),
+)
+
+# 本程序作為預約發派調度器時的識別，記錄在其認領的需求單上
+SCHEDULER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# UPDATE ... RETURNING 需要 SQLite 3.35 以上
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# 狀態與緊急程度在資料庫中以整數代碼儲存 (元組索引即代碼；只能在尾端新增)
+STATUS_NAMES = ('not_dispatched', 'pending', 'reviewing', 'completed', 'invalid', 'cancelled')
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+PRIORITY_NAMES = ('normal', 'urgent')
+PRIORITY_CODES = {name: code for code, name in enumerate(PRIORITY_NAMES)}
+
+# 需求單內容與完成說明超過此大小 (UTF-8 位元組) 時以 zlib 壓縮後存成 BLOB
+TEXT_COMPRESSION_THRESHOLD = 1024
+TEXT_COMPRESSION_LEVEL = 6
+
+# 全文搜尋：中日韓文字之間沒有空白，FTS5 的 unicode61 分詞器會把一整段當成一個詞。
+# 建立索引前把每段連續的中日韓文字拆成相鄰兩字一組的詞 (bigram)，段落最後一個字
+# 另外成為一個單字詞，這樣每個字都是某個詞的開頭：兩字以上的查詢以片語比對，
+# 單字查詢以前綴比對
+_CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+_CJK_RUN = re.compile(f'[{_CJK_CHARS}]+')
+# 全文索引中符合的需求單超過此數時不計算 bm25 (它要讀完所有符合的文件才能得到
+# 詞的出現頻率)，改為回傳範圍內最新的結果
+SEARCH_RANK_LIMIT = 5000
+# 搜尋範圍 (某位員工的需求單) 在此筆數以內時，先取出範圍內的ID再比對全文索引；
+# 範圍較大 (管理員) 時則由全文索引逐筆 JOIN 需求單
+SEARCH_SCOPE_SET_LIMIT = 5000
+# 搜尋結果摘要在命中處前後各取的字數
+SEARCH_SNIPPET_CONTEXT = 20
+
+# 每個線程 (UI 線程、調度器線程、工作線程) 各自持有一個長期連接
+_thread_local = threading.local()
+
+# 預約排程變更的監聽者 (例如預約發派調度器)，在寫入提交後被呼叫
+_schedule_listeners = []
+
+# 新增使用者的監聽者 (例如員工名錄)，在寫入提交後被呼叫
+_user_listeners = []
+
+# 需求單列表、筆數與詳情的查詢結果快取，由寫入函式依發派者/接收者精準清除
+_query_cache = QueryCache()
+
+# 使用者ID -> 姓名，列表查詢以它代替 JOIN users；users 的變更計數器改變時才重新載入
+_user_names = {}
+_user_names_version = None
+
+def set_database_path(db_path):
+    """改用指定的資料庫檔案 (例如由命令列指定)；目前線程的舊連接會被關閉"""
+    global DB_PATH
+    close_connection()
+    DB_PATH = os.path.abspath(db_path)
+    _query_cache.clear()
+
+def _configure_connection(conn):
+    """套用連接層級的效能設定"""
+    for name, value in CONNECTION_PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+
+def open_connection(db_path=None):
+    """開啟一個新的、已套用效能設定的連接 (呼叫者負責關閉)"""
+    conn = sqlite3.connect(db_path or DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
+    _configure_connection(conn)
+    return conn
 
 def create_connection():
-    """建立資料庫連接"""
-    conn = None
+    """取得目前線程的資料庫連接
+
+    連接與線程綁定並長期重用，不需 (也不應) 由呼叫者關閉；
+    使用完畢後請呼叫 release_connection()。
+    """
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is not None:
+        return conn
     try:
-        conn = sqlite3.connect('users.db')
+        conn = open_connection()
+        _thread_local.conn = conn
         return conn
     except Error as e:
         print(f"建立資料庫連接時發生錯誤: {e}")
-    return conn
+    return None
+
+def release_connection(conn):
+    """歸還線程連接：回滾未提交的交易，連接本身保留供下次重用"""
+    if conn is None:
+        return
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except Error as e:
+        print(f"釋放資料庫連接時發生錯誤: {e}")
+
+def close_connection():
+    """關閉目前線程持有的連接 (線程結束或程式關閉時呼叫)"""
+    conn = getattr(_thread_local, 'conn', None)
+    if conn is None:
+        return
+    _thread_local.conn = None
+    try:
+        conn.close()
+    except Error as e:
+        print(f"關閉資料庫連接時發生錯誤: {e}")
+
+def add_schedule_listener(listener):
+    """註冊預約排程變更的監聽者
+
+    listener(scheduled_time) 會在新增預約時收到預約時間字串；
+    取消或恢復等其他變更時收到 None，表示需要重新讀取排程。
+    """
+    if listener not in _schedule_listeners:
+        _schedule_listeners.append(listener)
+
+def remove_schedule_listener(listener):
+    """移除預約排程變更的監聽者"""
+    if listener in _schedule_listeners:
+        _schedule_listeners.remove(listener)
+
+def _notify_schedule_changed(scheduled_time=None):
+    """通知所有監聽者預約排程已變更"""
+    for listener in list(_schedule_listeners):
+        try:
+            listener(scheduled_time)
+        except Exception as e:
+            print(f"通知預約排程變更時發生錯誤: {e}")
+
+def add_user_listener(listener):
+    """註冊新增使用者的監聽者
+
+    listener(user, users_version) 收到 (id, username, name, email, role) 與
+    這次新增後 users 變更計數器的值。
+    """
+    if listener not in _user_listeners:
+        _user_listeners.append(listener)
+
+def remove_user_listener(listener):
+    """移除新增使用者的監聽者"""
+    if listener in _user_listeners:
+        _user_listeners.remove(listener)
+
+def _notify_user_added(user, users_version):
+    """通知所有監聽者已新增使用者"""
+    for listener in list(_user_listeners):
+        try:
+            listener(user, users_version)
+        except Exception as e:
+            print(f"通知新增使用者時發生錯誤: {e}")
+
+def get_query_cache_stats():
+    """回傳查詢快取的統計數字 (命中、未命中、清除與淘汰次數等)"""
+    return _query_cache.stats()
+
+def clear_query_cache():
+    """清除全部查詢快取"""
+    _query_cache.clear()
+
+def _cached_query(conn, key, scope, loader, tags=None):
+    """先查詢快取，未命中時執行 loader() 並存入快取
+
+    Args:
+        key: 快取鍵 (查詢名稱與參數)
+        scope: (範圍, 使用者ID)；以該範圍與 users 的變更計數器確認快取仍有效，
+               因此其他程序 (例如常駐調度器) 的寫入或使用者改名都不會讀到舊結果
+        tags: 寫入時用來清除這筆快取的範圍，預設為 [scope]
+    """
+    version = _get_cache_version(conn, *scope)
+    if version is None:
+        return loader()
+    tags = tags or [scope]
+    hit, value = _query_cache.get(key, version)
+    if not hit:
+        token = _query_cache.snapshot(tags)
+        value = loader()
+        _query_cache.put(key, value, tags, version, token)
+    # 列表回傳副本，呼叫者修改結果不會影響快取
+    return list(value) if isinstance(value, list) else value
+
+def _get_cache_version(conn, scope, owner_id):
+    """一次讀取範圍與 users 的變更計數器，回傳 (範圍版本, users 版本)；錯誤時回傳 None"""
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT scope, version FROM change_counters
+               WHERE (scope = ? AND owner_id = ?) OR (scope = 'users' AND owner_id = 0)""",
+            (scope, owner_id)
+        )
+        versions = dict(cursor.fetchall())
+        return versions.get(scope, 0), versions.get('users', 0)
+    except Error as e:
+        print(f"讀取變更計數器時發生錯誤: {e}")
+        return None
+
+def _invalidate_owner_caches(owners, req_ids=()):
+    """清除與 (發派者ID, 接收者ID) 相關的列表快取及指定需求單的詳情快取"""
+    tags = set()
+    for assigner_id, assignee_id in owners:
+        tags.add(('assigner', assigner_id))
+        tags.add(('assignee', assignee_id))
+    tags.update(('requirement', req_id) for req_id in req_ids)
+    _query_cache.invalidate(tags)
+
+def _invalidate_requirement_caches(conn, req_id):
+    """需求單被修改後，依其發派者與接收者清除相關快取"""
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT assigner_id, assignee_id FROM requirement_items WHERE id = ?", (req_id,))
+        _invalidate_owner_caches(cursor.fetchall(), [req_id])
+    except Error as e:
+        # 查不到範圍時寧可全部清除，也不要留下過期結果
+        print(f"清除需求單 #{req_id} 快取時發生錯誤: {e}")
+        _query_cache.clear()
+
+def encode_status(status):
+    """狀態名稱 -> 資料庫代碼"""
+    try:
+        return STATUS_CODES[status]
+    except KeyError:
+        raise ValueError(f"不支援的狀態: {status}") from None
+
+def encode_priority(priority):
+    """緊急程度名稱 -> 資料庫代碼 (非 'urgent' 一律視為普通)"""
+    return PRIORITY_CODES['urgent'] if priority == 'urgent' else PRIORITY_CODES['normal']
+
+def decode_status(code):
+    """資料庫代碼 -> 狀態名稱；未知的值原樣回傳"""
+    return STATUS_NAMES[code] if isinstance(code, int) and 0 <= code < len(STATUS_NAMES) else code
+
+def decode_priority(code):
+    """資料庫代碼 -> 緊急程度名稱"""
+    return PRIORITY_NAMES[code] if isinstance(code, int) and 0 <= code < len(PRIORITY_NAMES) else code
+
+def encode_timestamp(value):
+    """將時間轉為資料庫儲存的 epoch 秒數
+
+    接受 datetime、"%Y-%m-%d %H:%M:%S" 格式的字串 (皆視為本地時間) 或 epoch 秒數；
+    None 原樣回傳。
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return int(value.timestamp())
+
+def decode_timestamp(value):
+    """將資料庫的 epoch 秒數轉為本地時間的 datetime；None 原樣回傳"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        # 無法轉換的舊資料在遷移時保留原字串
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return datetime.datetime.fromtimestamp(value)
+
+def _now_timestamp():
+    """目前時間的 epoch 秒數"""
+    return int(time.time())
+
+def encode_text(value, threshold=TEXT_COMPRESSION_THRESHOLD):
+    """把大文字轉成資料庫中的值：超過門檻且壓縮後較小時回傳 zlib 壓縮的 bytes，否則原樣回傳
+
+    requirement_texts 中 BLOB 型態的值一律是壓縮過的文字，TEXT 則是原文。
+    """
+    if not isinstance(value, str):
+        return value
+    data = value.encode('utf-8')
+    if len(data) <= threshold:
+        return value
+    compressed = zlib.compress(data, TEXT_COMPRESSION_LEVEL)
+    return compressed if len(compressed) < len(data) else value
+
+def decode_text(value):
+    """把資料庫中的大文字值轉回字串 (壓縮過的 BLOB 在此解壓縮)"""
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value
+
+def _cjk_bigrams(run, final_unigram):
+    """把一段連續的中日韓文字拆成相鄰兩字一組的詞"""
+    tokens = [run[i:i + 2] for i in range(len(run) - 1)]
+    if final_unigram or len(run) == 1:
+        tokens.append(run[-1])
+    return ' '.join(tokens)
+
+def search_text(value):
+    """把標題、內容或完成說明轉成全文索引用的文字 (壓縮過的先解壓縮)"""
+    value = decode_text(value)
+    if not value:
+        return value
+    return _CJK_RUN.sub(lambda m: f' {_cjk_bigrams(m.group(), True)} ', value)
+
+def _index_requirement_body(conn, body_id, title, description):
+    """把需求單本體的標題與內容寫入全文索引；呼叫者負責交易"""
+    conn.execute(
+        "INSERT INTO requirement_body_search (rowid, title, description) VALUES (?, ?, ?)",
+        (body_id, search_text(title), search_text(description))
+    )
+
+def _index_requirement_comment(conn, req_id, old_comment, new_comment):
+    """完成說明改變時更新全文索引；呼叫者負責交易
+
+    不保存文字的索引要以當初索引的文字才能刪除，所以需要修改前的完成說明；
+    空的完成說明不建立索引。
+    """
+    old_comment, new_comment = decode_text(old_comment), decode_text(new_comment)
+    if old_comment == new_comment:
+        return
+    if old_comment:
+        conn.execute(
+            "INSERT INTO requirement_comment_search (requirement_comment_search, rowid, comment) "
+            "VALUES ('delete', ?, ?)", (req_id, search_text(old_comment)))
+    if new_comment:
+        conn.execute("INSERT INTO requirement_comment_search (rowid, comment) VALUES (?, ?)",
+                     (req_id, search_text(new_comment)))
+
+def _fill_search_index(conn):
+    """清空全文索引，再由需求單本體與完成說明重新建立；回傳 (本體數, 完成說明數)，呼叫者負責交易"""
+    conn.execute("INSERT INTO requirement_body_search (requirement_body_search) VALUES ('delete-all')")
+    conn.execute("INSERT INTO requirement_comment_search (requirement_comment_search) VALUES ('delete-all')")
+    bodies = conn.execute('''
+        SELECT b.id, b.title, t.description
+        FROM requirement_bodies b JOIN requirement_texts t ON t.body_id = b.id
+    ''')
+    body_count = conn.executemany(
+        "INSERT INTO requirement_body_search (rowid, title, description) VALUES (?, ?, ?)",
+        ((body_id, search_text(title), search_text(description)) for body_id, title, description in bodies)
+    ).rowcount
+    comments = ((req_id, decode_text(comment)) for req_id, comment in conn.execute(
+        "SELECT requirement_id, comment FROM requirement_comments WHERE comment IS NOT NULL"))
+    comment_count = conn.executemany(
+        "INSERT INTO requirement_comment_search (rowid, comment) VALUES (?, ?)",
+        ((req_id, search_text(comment)) for req_id, comment in comments if comment)
+    ).rowcount
+    return body_count, comment_count
+
+def rebuild_search_index(conn):
+    """重建全文索引 (維護命令用，例如以外部工具修改過需求單文字之後)
+
+    Returns:
+        tuple: (索引的本體數, 索引的完成說明數)；發生錯誤時回傳 None
+    """
+    try:
+        with conn:
+            return _fill_search_index(conn)
+    except Error as e:
+        print(f"重建全文索引時發生錯誤: {e}")
+        return None
 
 def get_user_by_username(conn, username):
     """根據使用者名稱獲取使用者資料"""
@@ -18,63 +383,635 @@ def get_user_by_username(conn, username):
     cursor.execute("SELECT * FROM users WHERE username=?", (username,))
     return cursor.fetchone()
 
-def create_tables(conn):
-    """建立所有需要的表格"""
-    try:
-        # 使用者表格
-        conn.execute('''CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT UNIQUE NOT NULL,
-                        password TEXT NOT NULL,
-                        name TEXT NOT NULL,
-                        email TEXT NOT NULL,
-                        role TEXT NOT NULL DEFAULT 'staff'
-                    );''')
-
-        # 需求單表格
-        conn.execute('''CREATE TABLE IF NOT EXISTS requirements (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        title TEXT NOT NULL,
-                        description TEXT NOT NULL,
-                        assigner_id INTEGER NOT NULL,
-                        assignee_id INTEGER NOT NULL,
-                        status TEXT NOT NULL DEFAULT 'pending',
-                        priority TEXT NOT NULL DEFAULT 'normal',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        scheduled_time TIMESTAMP,
-                        is_dispatched INTEGER DEFAULT 1, -- 0 for scheduled, 1 for dispatched
-                        completed_at TIMESTAMP,
-                        comment TEXT,
-                        attachment_path TEXT,          -- New field for attachment
-                        is_deleted INTEGER DEFAULT 0,    -- 0 for not deleted, 1 for deleted
-                        deleted_at TIMESTAMP,
-                        FOREIGN KEY (assigner_id) REFERENCES users (id),
-                        FOREIGN KEY (assignee_id) REFERENCES users (id)
-                    );''')
-        
-        # 檢查並添加欄位 (確保兼容舊資料庫)
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(requirements)")
-        columns = {col[1]: col for col in cursor.fetchall()}
-
-        if 'comment' not in columns:
-            conn.execute("ALTER TABLE requirements ADD COLUMN comment TEXT")
-            print("已為 requirements 表添加 comment 欄位")
-        if 'completed_at' not in columns:
-            conn.execute("ALTER TABLE requirements ADD COLUMN completed_at TIMESTAMP")
-            print("已為 requirements 表添加 completed_at 欄位")
-        if 'is_deleted' not in columns:
-            conn.execute("ALTER TABLE requirements ADD COLUMN is_deleted INTEGER DEFAULT 0")
-            print("已為 requirements 表添加 is_deleted 欄位")
-        if 'deleted_at' not in columns:
-            conn.execute("ALTER TABLE requirements ADD COLUMN deleted_at TIMESTAMP")
-            print("已為 requirements 表添加 deleted_at 欄位")
-        if 'attachment_path' not in columns:
-            conn.execute("ALTER TABLE requirements ADD COLUMN attachment_path TEXT")
-            print("已為 requirements 表添加 attachment_path 欄位")
-            
-        conn.commit()
+def _migrate_base_tables(conn):
+    """版本 1：建立基本表格，並補齊舊版資料庫缺少的欄位"""
+    # 使用者表格
+    conn.execute('''CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    role TEXT NOT NULL DEFAULT 'staff'
+                );''')
+
+    # 需求單表格
+    conn.execute('''CREATE TABLE IF NOT EXISTS requirements (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    assigner_id INTEGER NOT NULL,
+                    assignee_id INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    priority TEXT NOT NULL DEFAULT 'normal',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    scheduled_time TIMESTAMP,
+                    is_dispatched INTEGER DEFAULT 1, -- 0 for scheduled, 1 for dispatched
+                    completed_at TIMESTAMP,
+                    comment TEXT,
+                    attachment_path TEXT,          -- New field for attachment
+                    is_deleted INTEGER DEFAULT 0,    -- 0 for not deleted, 1 for deleted
+                    deleted_at TIMESTAMP,
+                    FOREIGN KEY (assigner_id) REFERENCES users (id),
+                    FOREIGN KEY (assignee_id) REFERENCES users (id)
+                );''')
+
+    # 未版本化的舊資料庫可能缺少後來新增的欄位 (只在升級到版本 1 時檢查一次)
+    columns = {col[1] for col in conn.execute("PRAGMA table_info(requirements)")}
+    legacy_columns = [
+        ('comment', 'TEXT'),
+        ('completed_at', 'TIMESTAMP'),
+        ('is_deleted', 'INTEGER DEFAULT 0'),
+        ('deleted_at', 'TIMESTAMP'),
+        ('attachment_path', 'TEXT'),
+    ]
+    for name, column_type in legacy_columns:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE requirements ADD COLUMN {name} {column_type}")
+            print(f"已為 requirements 表添加 {name} 欄位")
+
+def _migrate_requirement_indexes(conn):
+    """版本 2：依各列表查詢的 WHERE + ORDER BY 建立索引"""
+    # get_user_requirements: assignee + 已發派 + 未刪除，依 created_at 排序
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_requirements_assignee_list
+                    ON requirements (assignee_id, is_dispatched, is_deleted, created_at)''')
+    # get_admin_dispatched_requirements: assigner + 已發派 + 未刪除，依 created_at 排序
+    # get_admin_scheduled_requirements: assigner + 未發派 + 未刪除，依 scheduled_time 排序
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_requirements_assigner_list
+                    ON requirements (assigner_id, is_dispatched, is_deleted, created_at)''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_requirements_assigner_scheduled
+                    ON requirements (assigner_id, is_dispatched, scheduled_time)
+                    WHERE is_deleted = 0''')
+    # 依員工篩選的管理員列表
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_requirements_assigner_assignee
+                    ON requirements (assigner_id, assignee_id, is_dispatched, is_deleted, created_at)''')
+    # get_deleted_requirements: assigner + 已刪除，依 deleted_at 排序
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_requirements_assigner_deleted
+                    ON requirements (assigner_id, deleted_at)
+                    WHERE is_deleted = 1''')
+    # dispatch_scheduled_requirements / has_upcoming_scheduled_requirements:
+    # 只索引尚未發派的預約需求單，已發派的歷史資料不佔索引空間
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_requirements_due
+                    ON requirements (scheduled_time)
+                    WHERE is_dispatched = 0 AND is_deleted = 0''')
+
+def _migrate_status_indexes(conn):
+    """版本 3：支援在 SQL 中依狀態篩選的列表索引"""
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_requirements_assigner_status
+                    ON requirements (assigner_id, is_dispatched, is_deleted, status, created_at)''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_requirements_assignee_status
+                    ON requirements (assignee_id, is_dispatched, is_deleted, status, created_at)''')
+
+def _migrate_dispatch_claim(conn):
+    """版本 4：記錄是哪個調度器認領並發派了預約需求單"""
+    conn.execute("ALTER TABLE requirements ADD COLUMN dispatched_by TEXT")
+
+def _migrate_change_counters(conn):
+    """版本 5：由觸發器維護的變更計數器，讓界面以主鍵查詢判斷列表是否過期
+
+    scope 為 'assigner' / 'assignee' 時 owner_id 是使用者ID，
+    需求單的新增、修改、刪除會遞增相關指派者與接收者的計數；
+    scope 為 'users' (owner_id = 0) 時代表使用者資料的變更。
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS change_counters (
+            scope TEXT NOT NULL,
+            owner_id INTEGER NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, owner_id)
+        ) WITHOUT ROWID
+    ''')
+    _create_change_triggers(conn, 'requirements')
+    for name, event in [('trg_users_changed_insert', 'AFTER INSERT'),
+                        ('trg_users_changed_update', 'AFTER UPDATE'),
+                        ('trg_users_changed_delete', 'AFTER DELETE')]:
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {name} {event} ON users\n"
+            f"BEGIN\n"
+            f"    {_CHANGE_COUNTER_BUMP.format(scope='users', owner=0)}\n"
+            f"END"
+        )
+
+# 變更計數器觸發器中遞增一個範圍的語句 (版本 5 到 8 的觸發器都由此產生，不可修改)
+_CHANGE_COUNTER_BUMP = ("INSERT INTO change_counters (scope, owner_id, version) VALUES ('{scope}', {owner}, 1) "
+                        "ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;")
+
+def _copy_autoincrement(conn, old_table, new_table):
+    """重建表格時沿用舊表格的 AUTOINCREMENT 計數，已刪除的ID不會被重新使用"""
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (new_table,))
+    conn.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT ?, seq FROM sqlite_sequence WHERE name = ?",
+        (new_table, old_table)
+    )
+
+def _create_change_triggers(conn, table):
+    """在需求單表格上建立變更計數器觸發器
 
+    版本 5 建立在 requirements 上；之後的版本重建需求單表格時，觸發器隨舊表格
+    一起被刪除，因此在新表格上重新建立。已發布的遷移都呼叫這裡，產生的觸發器
+    不可再改變；觸發器需要修改時請新增一個遷移重建它們。
+    """
+    requirement_triggers = [
+        ('trg_requirements_changed_insert', 'AFTER INSERT', 'NEW'),
+        ('trg_requirements_changed_update', 'AFTER UPDATE', 'NEW'),
+        ('trg_requirements_changed_delete', 'AFTER DELETE', 'OLD'),
+        # 指派者或接收者被修改時，原本的使用者也需要更新
+        ('trg_requirements_changed_owner', 'AFTER UPDATE OF assigner_id, assignee_id', 'OLD'),
+    ]
+    for name, event, row in requirement_triggers:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(
+            f"CREATE TRIGGER {name} {event} ON {table}\n"
+            f"BEGIN\n"
+            f"    {_CHANGE_COUNTER_BUMP.format(scope='assigner', owner=f'{row}.assigner_id')}\n"
+            f"    {_CHANGE_COUNTER_BUMP.format(scope='assignee', owner=f'{row}.assignee_id')}\n"
+            f"END"
+        )
+
+def _create_requirement_item_indexes(conn):
+    """在 requirement_items 上建立列表索引 (與版本 2、3 相同的欄位組合)"""
+    conn.execute('''CREATE INDEX idx_requirement_items_assignee_list
+                    ON requirement_items (assignee_id, is_dispatched, is_deleted, created_at)''')
+    conn.execute('''CREATE INDEX idx_requirement_items_assigner_list
+                    ON requirement_items (assigner_id, is_dispatched, is_deleted, created_at)''')
+    conn.execute('''CREATE INDEX idx_requirement_items_assigner_scheduled
+                    ON requirement_items (assigner_id, is_dispatched, scheduled_time)
+                    WHERE is_deleted = 0''')
+    conn.execute('''CREATE INDEX idx_requirement_items_assigner_assignee
+                    ON requirement_items (assigner_id, assignee_id, is_dispatched, is_deleted, created_at)''')
+    conn.execute('''CREATE INDEX idx_requirement_items_assigner_deleted
+                    ON requirement_items (assigner_id, deleted_at)
+                    WHERE is_deleted = 1''')
+    conn.execute('''CREATE INDEX idx_requirement_items_due
+                    ON requirement_items (scheduled_time)
+                    WHERE is_dispatched = 0 AND is_deleted = 0''')
+    conn.execute('''CREATE INDEX idx_requirement_items_assigner_status
+                    ON requirement_items (assigner_id, is_dispatched, is_deleted, status, created_at)''')
+    conn.execute('''CREATE INDEX idx_requirement_items_assignee_status
+                    ON requirement_items (assignee_id, is_dispatched, is_deleted, status, created_at)''')
+
+def _create_requirements_view(conn, from_sql, title='r.title', description='r.description',
+                              comment='r.comment', attachment_path='r.attachment_path',
+                              mark_compressed=False):
+    """重建相容檢視表 requirements
+
+    欄位與版本 5 的 requirements 表格相同 (文字狀態、本地時間字串)，只供讀取。
+    from_sql 必須以別名 r 提供需求單的狀態與時間欄位；標題、內容、完成說明與
+    附件路徑所在的表格隨版本不同，以各自的 SQL 運算式傳入。
+    mark_compressed (版本 10 起)：壓縮儲存的內容與完成說明 (BLOB) 無法在 SQL 中
+    解壓縮，在檢視表中改為 NULL，並由最後的 description_compressed /
+    comment_compressed 欄位標示 (1 表示已壓縮)。
+    """
+    conn.execute("DROP VIEW IF EXISTS requirements")
+    compressed_columns = ""
+    if mark_compressed:
+        readable = "CASE WHEN typeof({0}) = 'blob' THEN NULL ELSE {0} END"
+        compressed_columns = (f",\n               (typeof({description}) = 'blob') AS description_compressed,"
+                              f"\n               (typeof({comment}) = 'blob') AS comment_compressed")
+        description, comment = readable.format(description), readable.format(comment)
+    status_names = " ".join(f"WHEN {code} THEN '{name}'" for code, name in enumerate(STATUS_NAMES))
+    local_time = "datetime(r.{0}, 'unixepoch', 'localtime') AS {0}"
+    conn.execute(f'''
+        CREATE VIEW requirements AS
+        SELECT r.id, {title} AS title, {description} AS description, r.assigner_id, r.assignee_id,
+               CASE r.status {status_names} ELSE r.status END AS status,
+               CASE r.priority WHEN 1 THEN 'urgent' ELSE 'normal' END AS priority,
+               {local_time.format('created_at')},
+               {local_time.format('scheduled_time')},
+               r.is_dispatched,
+               {local_time.format('completed_at')},
+               {comment} AS comment, {attachment_path} AS attachment_path, r.is_deleted,
+               {local_time.format('deleted_at')},
+               r.dispatched_by{compressed_columns}
+        FROM {from_sql}
+    ''')
+
+def _migrate_compact_encoding(conn):
+    """版本 6：狀態與緊急程度改存整數代碼，時間改存 epoch 秒數
+
+    需求單移到 requirement_items 表格 (小欄位在前、大文字欄位在後)；原本的
+    requirements 改為檢視表，以原來的文字格式提供給舊的報表或外部工具讀取。
+    舊資料的時間字串視為本地時間，只有以 CURRENT_TIMESTAMP 預設值寫入的
+    created_at (立即發派且未經調度器) 是 UTC。
+    """
+    conn.execute('''
+        CREATE TABLE requirement_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            assigner_id INTEGER NOT NULL,
+            assignee_id INTEGER NOT NULL,
+            status INTEGER NOT NULL DEFAULT 1,
+            priority INTEGER NOT NULL DEFAULT 0,
+            is_dispatched INTEGER NOT NULL DEFAULT 1,
+            is_deleted INTEGER NOT NULL DEFAULT 0,
+            created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            scheduled_time INTEGER,
+            completed_at INTEGER,
+            deleted_at INTEGER,
+            dispatched_by TEXT,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            comment TEXT,
+            attachment_path TEXT,
+            FOREIGN KEY (assigner_id) REFERENCES users (id),
+            FOREIGN KEY (assignee_id) REFERENCES users (id)
+        )
+    ''')
+    status_case = " ".join(f"WHEN '{name}' THEN {code}" for code, name in enumerate(STATUS_NAMES))
+    local_epoch = "COALESCE(CAST(strftime('%s', {0}, 'utc') AS INTEGER), {0})"
+    conn.execute(f'''
+        INSERT INTO requirement_items
+            (id, assigner_id, assignee_id, status, priority, is_dispatched, is_deleted,
+             created_at, scheduled_time, completed_at, deleted_at, dispatched_by,
+             title, description, comment, attachment_path)
+        SELECT id, assigner_id, assignee_id,
+               CASE status {status_case} ELSE status END,
+               CASE priority WHEN 'urgent' THEN 1 ELSE 0 END,
+               COALESCE(is_dispatched, 1), COALESCE(is_deleted, 0),
+               CASE WHEN dispatched_by IS NULL AND (scheduled_time IS NULL OR is_dispatched = 0)
+                    THEN COALESCE(CAST(strftime('%s', created_at) AS INTEGER), created_at)
+                    ELSE {local_epoch.format('created_at')} END,
+               {local_epoch.format('scheduled_time')},
+               {local_epoch.format('completed_at')},
+               {local_epoch.format('deleted_at')},
+               dispatched_by, title, description, comment, attachment_path
+        FROM requirements
+    ''')
+    _copy_autoincrement(conn, 'requirements', 'requirement_items')
+    conn.execute("DROP TABLE requirements")
+
+    _create_requirement_item_indexes(conn)
+    _create_change_triggers(conn, 'requirement_items')
+
+    _create_requirements_view(conn, "requirement_items r")
+
+def _migrate_hot_cold_split(conn):
+    """版本 7：把大文字欄位移到 requirement_texts，requirement_items 只保留小欄位
+
+    列表、篩選、筆數與調度器的查詢都只讀 requirement_items (每頁可放下更多列)；
+    內容 (description)、完成說明 (comment) 與附件路徑只在詳情視窗以主鍵讀取。
+    requirement_texts 以需求單ID為主鍵 (即 rowid)，一對一對應 requirement_items。
+    """
+    conn.execute("DROP VIEW IF EXISTS requirements")
+    conn.execute('''
+        CREATE TABLE requirement_texts (
+            requirement_id INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            comment TEXT,
+            attachment_path TEXT,
+            FOREIGN KEY (requirement_id) REFERENCES requirement_items (id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO requirement_texts (requirement_id, description, comment, attachment_path)
+        SELECT id, description, comment, attachment_path FROM requirement_items
+    ''')
+    conn.execute('''
+        CREATE TABLE requirement_items_hot (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            assigner_id INTEGER NOT NULL,
+            assignee_id INTEGER NOT NULL,
+            status INTEGER NOT NULL DEFAULT 1,
+            priority INTEGER NOT NULL DEFAULT 0,
+            is_dispatched INTEGER NOT NULL DEFAULT 1,
+            is_deleted INTEGER NOT NULL DEFAULT 0,
+            created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            scheduled_time INTEGER,
+            completed_at INTEGER,
+            deleted_at INTEGER,
+            dispatched_by TEXT,
+            title TEXT NOT NULL,
+            FOREIGN KEY (assigner_id) REFERENCES users (id),
+            FOREIGN KEY (assignee_id) REFERENCES users (id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO requirement_items_hot
+            (id, assigner_id, assignee_id, status, priority, is_dispatched, is_deleted,
+             created_at, scheduled_time, completed_at, deleted_at, dispatched_by, title)
+        SELECT id, assigner_id, assignee_id, status, priority, is_dispatched, is_deleted,
+               created_at, scheduled_time, completed_at, deleted_at, dispatched_by, title
+        FROM requirement_items
+    ''')
+    _copy_autoincrement(conn, 'requirement_items', 'requirement_items_hot')
+    conn.execute("DROP TABLE requirement_items")
+    # 改名時 sqlite_sequence 的計數也一併改名
+    conn.execute("ALTER TABLE requirement_items_hot RENAME TO requirement_items")
+    _create_requirement_item_indexes(conn)
+    _create_change_triggers(conn, 'requirement_items')
+    _create_requirements_view(
+        conn, "requirement_items r LEFT JOIN requirement_texts t ON t.requirement_id = r.id",
+        description='t.description', comment='t.comment', attachment_path='t.attachment_path')
+
+# 版本 8 起相容檢視表的資料來源：本體、內容、指派與完成說明分別在四個表格
+_SHARED_BODY_VIEW_SOURCE = dict(
+    from_sql="""requirement_items r
+        JOIN requirement_bodies b ON b.id = r.body_id
+        LEFT JOIN requirement_texts t ON t.body_id = r.body_id
+        LEFT JOIN requirement_comments c ON c.requirement_id = r.id""",
+    title='b.title', description='t.description', comment='c.comment',
+    attachment_path='COALESCE(c.attachment_path, t.attachment_path)')
+
+def _migrate_shared_bodies(conn):
+    """版本 8：同一份需求單派發給多位員工時，標題、內容與附件只存一份
+
+    - requirement_bodies: 需求單本體的標題 (列表需要，保持窄小)
+    - requirement_texts: 本體的內容與附件路徑 (改以 body_id 為主鍵，詳情視窗才讀取)
+    - requirement_items: 每位接收者一列 (指派)，只存 body_id 與狀態、時間等整數欄位
+    - requirement_comments: 員工提交的完成說明與附件，只有提交過的指派才有資料
+    需求單ID (requirement_items.id) 不變。既有資料以發派者、標題、內容、建立與
+    預約時間相同者視為同一次派發而合併本體；員工提交時覆寫的附件路徑
+    存在 requirement_comments，詳情中優先顯示。
+    """
+    conn.execute("DROP VIEW IF EXISTS requirements")
+    # 每筆需求單所屬的本體；本體ID沿用該組中最小的需求單ID。
+    # 有無附件也參與分組，這樣組內每筆都有附件 (或都沒有)，與本體附件不同的
+    # (員工提交時覆寫的) 都能以 requirement_comments 的附件還原。
+    # 本體附件優先取尚未提交者的附件，也就是派發時的原始附件
+    conn.execute('''
+        CREATE TEMP TABLE requirement_body_map AS
+        SELECT requirement_id, body_id,
+               COALESCE(MIN(CASE WHEN completed_at IS NULL THEN attachment_path END) OVER body,
+                        MIN(attachment_path) OVER body) AS attachment_path
+        FROM (
+            SELECT r.id AS requirement_id, r.completed_at, t.attachment_path,
+                   MIN(r.id) OVER (
+                       PARTITION BY r.assigner_id, r.title, t.description, r.created_at,
+                                    r.scheduled_time, t.attachment_path IS NULL
+                   ) AS body_id
+            FROM requirement_items r
+            LEFT JOIN requirement_texts t ON t.requirement_id = r.id
+        )
+        WINDOW body AS (PARTITION BY body_id)
+    ''')
+    conn.execute("CREATE UNIQUE INDEX temp.requirement_body_map_id ON requirement_body_map (requirement_id)")
+
+    conn.execute('''
+        CREATE TABLE requirement_bodies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO requirement_bodies (id, title)
+        SELECT r.id, r.title FROM requirement_items r
+        JOIN requirement_body_map m ON m.requirement_id = r.id
+        WHERE m.body_id = r.id
+    ''')
+    _copy_autoincrement(conn, 'requirement_items', 'requirement_bodies')
+
+    conn.execute('''
+        CREATE TABLE requirement_texts_shared (
+            body_id INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            attachment_path TEXT,
+            FOREIGN KEY (body_id) REFERENCES requirement_bodies (id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO requirement_texts_shared (body_id, description, attachment_path)
+        SELECT b.id, COALESCE(t.description, ''), m.attachment_path
+        FROM requirement_bodies b
+        JOIN requirement_body_map m ON m.requirement_id = b.id
+        LEFT JOIN requirement_texts t ON t.requirement_id = b.id
+    ''')
+
+    conn.execute('''
+        CREATE TABLE requirement_comments (
+            requirement_id INTEGER PRIMARY KEY,
+            comment TEXT,
+            attachment_path TEXT,
+            FOREIGN KEY (requirement_id) REFERENCES requirement_items (id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO requirement_comments (requirement_id, comment, attachment_path)
+        SELECT t.requirement_id, t.comment,
+               CASE WHEN t.attachment_path IS NOT m.attachment_path THEN t.attachment_path END
+        FROM requirement_texts t
+        JOIN requirement_body_map m ON m.requirement_id = t.requirement_id
+        WHERE t.comment IS NOT NULL OR t.attachment_path IS NOT m.attachment_path
+    ''')
+    conn.execute("DROP TABLE requirement_texts")
+    conn.execute("ALTER TABLE requirement_texts_shared RENAME TO requirement_texts")
+
+    conn.execute('''
+        CREATE TABLE requirement_items_shared (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            body_id INTEGER NOT NULL,
+            assigner_id INTEGER NOT NULL,
+            assignee_id INTEGER NOT NULL,
+            status INTEGER NOT NULL DEFAULT 1,
+            priority INTEGER NOT NULL DEFAULT 0,
+            is_dispatched INTEGER NOT NULL DEFAULT 1,
+            is_deleted INTEGER NOT NULL DEFAULT 0,
+            created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            scheduled_time INTEGER,
+            completed_at INTEGER,
+            deleted_at INTEGER,
+            dispatched_by TEXT,
+            FOREIGN KEY (body_id) REFERENCES requirement_bodies (id),
+            FOREIGN KEY (assigner_id) REFERENCES users (id),
+            FOREIGN KEY (assignee_id) REFERENCES users (id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO requirement_items_shared
+            (id, body_id, assigner_id, assignee_id, status, priority, is_dispatched, is_deleted,
+             created_at, scheduled_time, completed_at, deleted_at, dispatched_by)
+        SELECT r.id, m.body_id, r.assigner_id, r.assignee_id, r.status, r.priority, r.is_dispatched,
+               r.is_deleted, r.created_at, r.scheduled_time, r.completed_at, r.deleted_at, r.dispatched_by
+        FROM requirement_items r
+        JOIN requirement_body_map m ON m.requirement_id = r.id
+    ''')
+    _copy_autoincrement(conn, 'requirement_items', 'requirement_items_shared')
+    conn.execute("DROP TABLE requirement_items")
+    conn.execute("ALTER TABLE requirement_items_shared RENAME TO requirement_items")
+    conn.execute("DROP TABLE requirement_body_map")
+
+    _create_requirement_item_indexes(conn)
+    conn.execute("CREATE INDEX idx_requirement_items_body ON requirement_items (body_id)")
+    _create_change_triggers(conn, 'requirement_items')
+    _create_requirements_view(conn, **_SHARED_BODY_VIEW_SOURCE)
+
+def _migrate_full_text_search(conn):
+    """版本 9：需求單標題、內容與完成說明的全文索引 (FTS5)
+
+    - requirement_body_search: 需求單本體的標題與內容，rowid 為 body_id
+    - requirement_comment_search: 完成說明，rowid 為需求單ID
+    兩者都是外部內容 (external content) 的索引，本身不再存一份文字；內容由
+    *_search_source 檢視表以 search_text() 轉換 (解壓縮、中日韓文字逐字分詞)。
+    索引由觸發器隨新增、修改與刪除逐筆更新；壓縮等不改變文字的更新不會重建索引。
+    prefix = '1' 另外索引每個詞的第一個字，單字查詢 (前綴比對) 不必合併所有以該字開頭的詞。
+    """
+    # 這個版本的觸發器與內容檢視表呼叫 search_text()；連接不再註冊這個函式
+    # (外部工具無法註冊，寫入需求單就會失敗)，只在遷移時註冊，版本 11 再移除這些物件
+    conn.create_function("search_text", 1, search_text, deterministic=True)
+    conn.execute('''
+        CREATE VIEW requirement_body_search_source AS
+        SELECT b.id AS id, search_text(b.title) AS title, search_text(t.description) AS description
+        FROM requirement_bodies b
+        JOIN requirement_texts t ON t.body_id = b.id
+    ''')
+    conn.execute('''
+        CREATE VIRTUAL TABLE requirement_body_search USING fts5 (
+            title, description,
+            content = 'requirement_body_search_source', content_rowid = 'id', prefix = '1'
+        )
+    ''')
+    conn.execute('''
+        CREATE VIEW requirement_comment_search_source AS
+        SELECT requirement_id AS id, search_text(comment) AS comment
+        FROM requirement_comments
+    ''')
+    conn.execute('''
+        CREATE VIRTUAL TABLE requirement_comment_search USING fts5 (
+            comment,
+            content = 'requirement_comment_search_source', content_rowid = 'id', prefix = '1'
+        )
+    ''')
+    conn.execute("INSERT INTO requirement_body_search (requirement_body_search) VALUES ('rebuild')")
+    conn.execute("INSERT INTO requirement_comment_search (requirement_comment_search) VALUES ('rebuild')")
+
+    # 本體先寫入標題 (requirement_bodies) 再寫入內容 (requirement_texts)，
+    # 所以在內容寫入時才建立索引；刪除時以 'delete' 命令帶入當初索引的文字
+    body_title = "search_text((SELECT title FROM requirement_bodies WHERE id = {row}.body_id))"
+    title_and_description = "search_text({row}.title), (SELECT search_text(description) FROM requirement_texts WHERE body_id = {row}.id)"
+    index_body = ("INSERT INTO requirement_body_search (rowid, title, description) "
+                  "VALUES ({row}.body_id, " + body_title + ", search_text({row}.description));")
+    unindex_body = ("INSERT INTO requirement_body_search (requirement_body_search, rowid, title, description) "
+                    "VALUES ('delete', {row}.body_id, " + body_title + ", search_text({row}.description));")
+    index_title = ("INSERT INTO requirement_body_search (rowid, title, description) "
+                   "SELECT {row}.id, " + title_and_description + " WHERE EXISTS "
+                   "(SELECT 1 FROM requirement_texts WHERE body_id = {row}.id);")
+    unindex_title = ("INSERT INTO requirement_body_search (requirement_body_search, rowid, title, description) "
+                     "SELECT 'delete', {row}.id, " + title_and_description + " WHERE EXISTS "
+                     "(SELECT 1 FROM requirement_texts WHERE body_id = {row}.id);")
+    index_comment = ("INSERT INTO requirement_comment_search (rowid, comment) "
+                     "VALUES ({row}.requirement_id, search_text({row}.comment));")
+    unindex_comment = ("INSERT INTO requirement_comment_search (requirement_comment_search, rowid, comment) "
+                       "VALUES ('delete', {row}.requirement_id, search_text({row}.comment));")
+    search_triggers = [
+        ('trg_requirement_texts_search_insert', 'AFTER INSERT ON requirement_texts', None,
+         [index_body.format(row='NEW')]),
+        ('trg_requirement_texts_search_update', 'AFTER UPDATE OF description ON requirement_texts',
+         'search_text(OLD.description) IS NOT search_text(NEW.description)',
+         [unindex_body.format(row='OLD'), index_body.format(row='NEW')]),
+        ('trg_requirement_texts_search_delete', 'AFTER DELETE ON requirement_texts', None,
+         [unindex_body.format(row='OLD')]),
+        # 標題目前不會被修改，仍保持索引與資料一致
+        ('trg_requirement_bodies_search_update', 'AFTER UPDATE OF title ON requirement_bodies',
+         'OLD.title IS NOT NEW.title',
+         [unindex_title.format(row='OLD'), index_title.format(row='NEW')]),
+        ('trg_requirement_comments_search_insert', 'AFTER INSERT ON requirement_comments', None,
+         [index_comment.format(row='NEW')]),
+        ('trg_requirement_comments_search_update', 'AFTER UPDATE OF comment ON requirement_comments',
+         'search_text(OLD.comment) IS NOT search_text(NEW.comment)',
+         [unindex_comment.format(row='OLD'), index_comment.format(row='NEW')]),
+        ('trg_requirement_comments_search_delete', 'AFTER DELETE ON requirement_comments', None,
+         [unindex_comment.format(row='OLD')]),
+    ]
+    for name, event, condition, statements in search_triggers:
+        when = f"\nWHEN {condition}" if condition else ""
+        body = "\n".join(f"    {statement}" for statement in statements)
+        conn.execute(f"CREATE TRIGGER {name} {event}{when}\nBEGIN\n{body}\nEND")
+
+def _migrate_compressed_text_view(conn):
+    """版本 10：相容檢視表不再回傳壓縮過的內容與完成說明
+
+    壓縮儲存的文字 (BLOB) 在檢視表中改為 NULL，並以 description_compressed /
+    comment_compressed 欄位標示，外部工具不會讀到 zlib 資料。
+    """
+    _create_requirements_view(conn, **_SHARED_BODY_VIEW_SOURCE, mark_compressed=True)
+
+def _migrate_contentless_search_index(conn):
+    """版本 11：全文索引改由寫入需求單的函式更新，不再使用觸發器
+
+    - requirement_body_search: 需求單本體的標題與內容，rowid 為 body_id
+    - requirement_comment_search: 完成說明，rowid 為需求單ID
+    兩者都是不保存文字的 (contentless) 索引，寫入的是 search_text() 轉換後的文字
+    (解壓縮、中日韓文字拆成兩字一組)。這個轉換只能在 Python 中進行，所以索引不由
+    觸發器維護 (觸發器得呼叫每個連接各自註冊的函式，外部工具寫入需求單就會失敗)，
+    而是由寫入文字的函式在同一個交易中更新；壓縮等不改變文字的更新不需要更新索引。
+    prefix = '1' 另外索引每個詞的第一個字，單字查詢 (前綴比對) 不必合併所有以該字開頭的詞。
+    版本 9 的觸發器、內容檢視表與外部內容索引在此移除，再以現有資料重建索引。
+    """
+    search_triggers = [
+        'trg_requirement_texts_search_insert', 'trg_requirement_texts_search_update',
+        'trg_requirement_texts_search_delete', 'trg_requirement_bodies_search_update',
+        'trg_requirement_comments_search_insert', 'trg_requirement_comments_search_update',
+        'trg_requirement_comments_search_delete',
+    ]
+    for name in search_triggers:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for table in ('requirement_body_search', 'requirement_comment_search'):
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"DROP VIEW IF EXISTS {table}_source")
+    conn.execute('''
+        CREATE VIRTUAL TABLE requirement_body_search USING fts5 (
+            title, description, content = '', prefix = '1'
+        )
+    ''')
+    conn.execute('''
+        CREATE VIRTUAL TABLE requirement_comment_search USING fts5 (
+            comment, content = '', prefix = '1'
+        )
+    ''')
+    _fill_search_index(conn)
+
+# 依序執行的資料庫遷移；(版本號, 遷移函式)，版本號記錄在 PRAGMA user_version
+# 已發布的遷移 (包括它們呼叫的輔助函式) 產生的結構不可再改變，否則在修改前後
+# 升級的資料庫會在相同版本號下有不同的結構；結構變更一律新增遷移。
+MIGRATIONS = [
+    (1, _migrate_base_tables),
+    (2, _migrate_requirement_indexes),
+    (3, _migrate_status_indexes),
+    (4, _migrate_dispatch_claim),
+    (5, _migrate_change_counters),
+    (6, _migrate_compact_encoding),
+    (7, _migrate_hot_cold_split),
+    (8, _migrate_shared_bodies),
+    (9, _migrate_full_text_search),
+    (10, _migrate_compressed_text_view),
+    (11, _migrate_contentless_search_index),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    """讀取資料庫目前的結構版本"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate_database(conn, target_version=None):
+    """將資料庫升級到最新結構版本，每個遷移在獨立交易中執行
+
+    Args:
+        target_version: 只升級到指定版本 (效能測試用來建立舊版結構)；預設為最新版本
+    """
+    current_version = get_schema_version(conn)
+    for version, migration in MIGRATIONS:
+        if version <= current_version:
+            continue
+        if target_version is not None and version > target_version:
+            break
+        try:
+            conn.execute("BEGIN")
+            migration(conn)
+            # PRAGMA 不接受參數綁定；version 為程式內常數
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            current_version = version
+            print(f"資料庫結構已升級至版本 {version}")
+        except Error as e:
+            conn.rollback()
+            print(f"資料庫遷移至版本 {version} 時發生錯誤: {e}")
+            raise
+    return current_version
+
+def create_tables(conn):
+    """建立所有需要的表格 (執行尚未套用的資料庫遷移)"""
+    try:
+        migrate_database(conn)
+        conn.execute("PRAGMA optimize")
     except Error as e:
         print(f"建立或更新表格時發生錯誤: {e}")
 
@@ -106,7 +1043,7 @@ def initialize_database():
         except Error as e:
             print(f"初始化資料庫時發生錯誤: {e}")
         finally:
-            conn.close()
+            release_connection(conn)
 
 def add_user(username, password, name, email, role='staff'):
     """添加新使用者"""
@@ -124,182 +1061,647 @@ def add_user(username, password, name, email, role='staff'):
             "INSERT INTO users (username, password, name, email, role) VALUES (?, ?, ?, ?, ?)",
             (username, password, name, email, role)
         )
+        user_id = cursor.lastrowid
+        # 提交前仍持有寫入鎖，讀到的計數器正好是這次新增之後的值
+        users_version = get_change_version(conn, 'users')
         conn.commit()
-        print(f"成功添加使用者 '{username}' (ID: {cursor.lastrowid})")
+        print(f"成功添加使用者 '{username}' (ID: {user_id})")
+        _notify_user_added((user_id, username, name, email, role), users_version)
         return True
     except Error as e:
         print(f"添加使用者時發生錯誤: {e}")
         return False
     finally:
-        if conn: 
-            conn.close()
+        release_connection(conn)
+
+def _insert_requirement_body(conn, title, description, attachment_path):
+    """寫入需求單本體 (標題、內容、附件)，回傳 body_id；呼叫者負責交易"""
+    cursor = conn.execute("INSERT INTO requirement_bodies (title) VALUES (?)", (title,))
+    conn.execute(
+        "INSERT INTO requirement_texts (body_id, description, attachment_path) VALUES (?, ?, ?)",
+        (cursor.lastrowid, encode_text(description), attachment_path)
+    )
+    _index_requirement_body(conn, cursor.lastrowid, title, description)
+    return cursor.lastrowid
 
 def create_requirement(conn, title, description, assigner_id, assignee_id, priority='normal', scheduled_time=None, attachment_path=None):
     """建立新的需求單"""
     try:
         cursor = conn.cursor()
+        scheduled_time = encode_timestamp(scheduled_time)
         is_dispatched = 0 if scheduled_time else 1
-        status = 'not_dispatched' if scheduled_time else 'pending'
+        status = encode_status('not_dispatched' if scheduled_time else 'pending')
         
-        cursor.execute(
-            """INSERT INTO requirements 
-               (title, description, assigner_id, assignee_id, priority, scheduled_time, is_dispatched, status, attachment_path) 
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (title, description, assigner_id, assignee_id, priority, scheduled_time, is_dispatched, status, attachment_path)
-        )
-        conn.commit()
+        with conn:  # 本體、內容與指派在同一個交易中寫入
+            body_id = _insert_requirement_body(conn, title, description, attachment_path)
+            cursor.execute(
+                """INSERT INTO requirement_items 
+                   (body_id, assigner_id, assignee_id, priority, scheduled_time, is_dispatched, status) 
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (body_id, assigner_id, assignee_id, encode_priority(priority), scheduled_time,
+                 is_dispatched, status)
+            )
+        _invalidate_owner_caches([(assigner_id, assignee_id)])
+        if scheduled_time:
+            _notify_schedule_changed(decode_timestamp(scheduled_time))
         return cursor.lastrowid
     except Error as e:
         print(f"建立需求單時發生錯誤: {e}")
         return None
 
+def create_requirements_bulk(conn, title, description, assigner_id, assignee_ids, priority='normal', scheduled_time=None, attachment_path=None):
+    """將同一份需求單一次派發給多位員工 (單一交易)，回傳建立的筆數
+
+    標題、內容與附件只寫入一份本體，每位員工只新增一列精簡的指派。
+    """
+    try:
+        scheduled_time = encode_timestamp(scheduled_time)
+        is_dispatched = 0 if scheduled_time else 1
+        status = encode_status('not_dispatched' if scheduled_time else 'pending')
+        priority = encode_priority(priority)
+        assignee_ids = list(dict.fromkeys(assignee_ids))  # 去除重複且保留順序
+        if not assignee_ids:
+            return 0
+        with conn:  # 全部成功才提交，任何一筆失敗則整批回滾
+            body_id = _insert_requirement_body(conn, title, description, attachment_path)
+            cursor = conn.executemany(
+                """INSERT INTO requirement_items 
+                   (body_id, assigner_id, assignee_id, priority, scheduled_time, is_dispatched, status) 
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [(body_id, assigner_id, assignee_id, priority, scheduled_time, is_dispatched, status)
+                 for assignee_id in assignee_ids]
+            )
+        _invalidate_owner_caches([(assigner_id, assignee_id) for assignee_id in assignee_ids])
+        if scheduled_time:
+            _notify_schedule_changed(decode_timestamp(scheduled_time))
+        return cursor.rowcount
+    except Error as e:
+        print(f"批次建立需求單時發生錯誤: {e}")
+        return 0
+
 def get_all_staff(conn):
-    """獲取所有員工列表 (排除管理員)"""
+    """獲取所有員工列表 (排除管理員)，依ID排序"""
     cursor = conn.cursor()
-    cursor.execute("SELECT id, name FROM users WHERE role = 'staff'")
+    cursor.execute("SELECT id, name FROM users WHERE role = 'staff' ORDER BY id")
+    return cursor.fetchall()
+
+def get_staff_profiles(conn):
+    """獲取所有員工的 (id, name, username, email)，依ID排序 (供員工名錄與搜尋使用)"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, name, username, email FROM users WHERE role = 'staff' ORDER BY id")
     return cursor.fetchall()
 
 # Helper to construct SELECT query for requirements for consistency
+# (詳情查詢：標題來自本體 b，內容來自 requirement_texts t，完成說明來自 requirement_comments c；
+#  員工提交時上傳的附件優先於派發時的附件)
 def _get_requirement_select_fields():
     return """
-        r.id, r.title, r.description, r.status, r.priority, r.created_at, 
+        r.id, b.title, t.description, r.status, r.priority, r.created_at, 
         assigner_user.name as assigner_name, assigner_user.id as assigner_id, 
         assignee_user.name as assignee_name, assignee_user.id as assignee_id,
-        r.scheduled_time, r.comment, r.completed_at, r.attachment_path, r.deleted_at
+        r.scheduled_time, c.comment, r.completed_at,
+        COALESCE(c.attachment_path, t.attachment_path) as attachment_path, r.deleted_at
+    """
+
+# 列表只需要畫面上顯示的欄位；description、comment、attachment_path 等大欄位
+# 留待開啟詳情視窗時再以 get_requirement_by_id 讀取。
+# 發派者與接收者只讀ID，姓名由 get_user_names() 的對照表補上，不需要 JOIN users；
+# 標題以 body_id 主鍵 JOIN 窄小的 requirement_bodies b 取得
+def _get_requirement_list_fields():
+    return """
+        r.id, b.title, r.status, r.priority, r.created_at,
+        r.assigner_id, r.assignee_id,
+        r.scheduled_time, r.deleted_at
     """
 
 def _get_requirement_joins():
     return """
         JOIN users assigner_user ON r.assigner_id = assigner_user.id
         JOIN users assignee_user ON r.assignee_id = assignee_user.id
+        JOIN requirement_bodies b ON b.id = r.body_id
+        LEFT JOIN requirement_texts t ON t.body_id = r.body_id
+        LEFT JOIN requirement_comments c ON c.requirement_id = r.id
+    """
+
+# 依姓名排序時 ORDER BY 與分頁條件需要姓名，只在這時 JOIN 對應的一次 users
+_SORT_JOINS = {
+    'assigner': "JOIN users assigner_user ON r.assigner_id = assigner_user.id",
+    'assignee': "JOIN users assignee_user ON r.assignee_id = assignee_user.id",
+}
+
+def get_user_names(conn):
+    """取得使用者ID -> 姓名的對照表
+
+    以 users 的變更計數器 (一次主鍵查詢) 判斷是否需要重新載入。查詢快取的
+    有效性也包含 users 的計數器，因此使用者改名後快取中的舊姓名不會再被讀到。
+    """
+    global _user_names, _user_names_version
+    version = get_change_version(conn, 'users')
+    if version is not None and version == _user_names_version:
+        return _user_names
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, name FROM users")
+    names = dict(cursor.fetchall())
+    # 以新的字典整個替換，其他線程讀到的永遠是完整的對照表
+    _user_names, _user_names_version = names, version
+    return names
+
+# 列表可排序的欄位：排序鍵 -> (SQL 運算式, 在 _query_requirements 回傳列中的索引)
+# 這些欄位在各自的列表中都不會是 NULL，因此可以直接用於 keyset 分頁比較
+REQUIREMENT_SORT_COLUMNS = {
+    'id': ('r.id', 0),
+    'title': ('b.title', 1),
+    'status': ('r.status', 2),
+    'priority': ('r.priority', 3),
+    'created_at': ('r.created_at', 4),
+    'assigner': ('assigner_user.name', 5),
+    'assignee': ('assignee_user.name', 6),
+    'scheduled_time': ('r.scheduled_time', 7),
+    'deleted_at': ('r.deleted_at', 8),
+}
+
+def _requirement_summary_factory(names):
+    """產生列表查詢的 row factory：以姓名對照表補上姓名，代碼與時間欄位只解碼一次
+
+    列表可能有數萬列，因此直接以 tuple.__new__ 建立物件，狀態與緊急程度以
+    元組索引解碼，時間以 fromtimestamp 轉換；遇到不符預期的值才改用
+    decode_* 函式逐欄處理。
     """
+    new = tuple.__new__
+    fromtimestamp = datetime.datetime.fromtimestamp
+    get_name = names.get
+    status_names = STATUS_NAMES
+    priority_names = PRIORITY_NAMES
 
-def get_user_requirements(conn, user_id):
-    """獲取指定用戶收到的需求單 (只顯示已發派且未刪除的)"""
+    def factory(cursor, row):
+        (req_id, title, status, priority, created_at,
+         assigner_id, assignee_id, scheduled_time, deleted_at) = row
+        try:
+            return new(RequirementSummary, (
+                req_id, title, status_names[status], priority_names[priority],
+                fromtimestamp(created_at) if created_at is not None else None,
+                get_name(assigner_id, ''), get_name(assignee_id, ''),
+                fromtimestamp(scheduled_time) if scheduled_time is not None else None,
+                fromtimestamp(deleted_at) if deleted_at is not None else None))
+        except (TypeError, ValueError, IndexError, OverflowError, OSError):
+            return RequirementSummary(
+                req_id, title, decode_status(status), decode_priority(priority),
+                decode_timestamp(created_at),
+                get_name(assigner_id, ''), get_name(assignee_id, ''),
+                decode_timestamp(scheduled_time), decode_timestamp(deleted_at))
+    return factory
+
+def _requirement_factory(cursor, row):
+    """get_requirement_by_id 的 row factory；壓縮過的內容與完成說明只在這裡 (開啟詳情時) 解壓縮"""
+    (req_id, title, description, status, priority, created_at,
+     assigner_name, assigner_id, assignee_name, assignee_id,
+     scheduled_time, comment, completed_at, attachment_path, deleted_at) = row
+    return Requirement(
+        req_id, title, decode_text(description), decode_status(status), decode_priority(priority),
+        decode_timestamp(created_at), assigner_name, assigner_id, assignee_name, assignee_id,
+        decode_timestamp(scheduled_time), decode_text(comment), decode_timestamp(completed_at),
+        attachment_path, decode_timestamp(deleted_at))
+
+def _sort_value_to_db(sort_by, value):
+    """把模型中已解碼的排序值轉回資料庫中的值，供 keyset 分頁比較"""
+    if sort_by == 'status':
+        return STATUS_CODES.get(value, value)
+    if sort_by == 'priority':
+        return encode_priority(value)
+    if isinstance(value, datetime.datetime):
+        return encode_timestamp(value)
+    return value
+
+def encode_page_cursor(sort_by, descending, row):
+    """以某一列的排序值與 ID 產生不透明的分頁游標"""
+    _, index = REQUIREMENT_SORT_COLUMNS[sort_by]
+    payload = json.dumps([sort_by, bool(descending), _sort_value_to_db(sort_by, row[index]), row[0]])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def _decode_page_cursor(cursor, sort_by, descending):
+    """解析分頁游標，回傳 (最後一列的排序值, 最後一列的 ID)"""
     try:
-        cursor = conn.cursor()
-        sql = f'''
-            SELECT {_get_requirement_select_fields()}
-            FROM requirements r
-            {_get_requirement_joins()}
-            WHERE r.assignee_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0
-            ORDER BY r.created_at DESC
-        '''
-        cursor.execute(sql, (user_id,))
-        return cursor.fetchall()
+        cursor_sort_by, cursor_descending, last_value, last_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"無效的分頁游標: {cursor}") from e
+    if cursor_sort_by != sort_by or cursor_descending != bool(descending):
+        raise ValueError("分頁游標與目前的排序方式不符")
+    return last_value, last_id
+
+def next_page_cursor(rows, page_size, sort_by, descending):
+    """根據本頁結果產生下一頁的游標；已無下一頁時回傳 None"""
+    if not page_size or len(rows) < page_size:
+        return None
+    return encode_page_cursor(sort_by, descending, rows[-1])
+
+def _filter_sql(statuses=None, staff_id=None):
+    """產生狀態與員工篩選條件，回傳 (SQL 片段, 參數)"""
+    sql = ""
+    params = []
+    if staff_id is not None:
+        sql += " AND r.assignee_id = ?"
+        params.append(staff_id)
+    if statuses:
+        codes = [encode_status(status) for status in statuses]
+        sql += f" AND r.status IN ({', '.join('?' * len(codes))})"
+        params.extend(codes)
+    return sql, params
+
+def _query_requirements(conn, where_sql, params, sort_by, descending,
+                        page_size=None, cursor=None):
+    """依條件查詢需求單列表 (精簡欄位)，排序與 keyset 分頁都在 SQL 中完成
+
+    回傳 RequirementSummary 列表 (SQL 只讀發派者與接收者ID，姓名由對照表補上)
+    """
+    if sort_by not in REQUIREMENT_SORT_COLUMNS:
+        raise ValueError(f"不支援的排序欄位: {sort_by}")
+    sort_expr, _ = REQUIREMENT_SORT_COLUMNS[sort_by]
+    direction = 'DESC' if descending else 'ASC'
+    params = list(params)
+
+    if cursor:
+        last_value, last_id = _decode_page_cursor(cursor, sort_by, descending)
+        comparison = '<' if descending else '>'
+        where_sql += f" AND ({sort_expr}, r.id) {comparison} (?, ?)"
+        params.extend([last_value, last_id])
+
+    sql = f'''
+        SELECT {_get_requirement_list_fields()}
+        FROM requirement_items r
+        JOIN requirement_bodies b ON b.id = r.body_id
+        {_SORT_JOINS.get(sort_by, '')}
+        WHERE {where_sql}
+        ORDER BY {sort_expr} {direction}, r.id {direction}
+    '''
+    if page_size:
+        sql += " LIMIT ?"
+        params.append(page_size)
+
+    cursor_obj = conn.cursor()
+    cursor_obj.row_factory = _requirement_summary_factory(get_user_names(conn))
+    cursor_obj.execute(sql, params)
+    return cursor_obj.fetchall()
+
+def _statuses_key(statuses):
+    """把狀態篩選轉成可做為快取鍵的值"""
+    return tuple(statuses) if statuses else None
+
+def _count_requirements(conn, where_sql, params):
+    """計算符合條件的需求單筆數；條件都在 requirement_items 的索引欄位上，不需要 JOIN"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM requirement_items r WHERE {where_sql}", list(params))
+    return cursor.fetchone()[0]
+
+def get_user_requirements(conn, user_id, statuses=None, sort_by='created_at', descending=True,
+                          page_size=None, cursor=None):
+    """獲取指定用戶收到的需求單 (只顯示已發派且未刪除的)，可依狀態篩選"""
+    try:
+        filter_sql, filter_params = _filter_sql(statuses)
+        return _cached_query(
+            conn,
+            ('user_requirements', user_id, _statuses_key(statuses), sort_by, bool(descending),
+             page_size, cursor),
+            ('assignee', user_id),
+            lambda: _query_requirements(
+                conn,
+                "r.assignee_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0" + filter_sql,
+                [user_id] + filter_params, sort_by, descending, page_size, cursor))
     except Error as e:
         print(f"獲取使用者需求單時發生錯誤: {e}")
         return []
 
-def get_admin_dispatched_requirements(conn, admin_id):
-    """獲取管理員已發派的需求單 (未刪除)"""
+def count_user_requirements(conn, user_id, statuses=None):
+    """計算指定用戶收到的需求單筆數 (條件與 get_user_requirements 相同)"""
     try:
-        cursor = conn.cursor()
-        sql = f'''
-            SELECT {_get_requirement_select_fields()}
-            FROM requirements r
-            {_get_requirement_joins()}
-            WHERE r.assigner_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0
-            ORDER BY r.created_at DESC
-        '''
-        cursor.execute(sql, (admin_id,))
-        return cursor.fetchall()
+        filter_sql, filter_params = _filter_sql(statuses)
+        return _cached_query(
+            conn,
+            ('count_user_requirements', user_id, _statuses_key(statuses)),
+            ('assignee', user_id),
+            lambda: _count_requirements(
+                conn,
+                "r.assignee_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0" + filter_sql,
+                [user_id] + filter_params))
+    except Error as e:
+        print(f"計算使用者需求單數量時發生錯誤: {e}")
+        return None
+
+def get_admin_dispatched_requirements(conn, admin_id, statuses=None, staff_id=None,
+                                      sort_by='created_at', descending=True,
+                                      page_size=None, cursor=None):
+    """獲取管理員已發派的需求單 (未刪除)，可依狀態與接收員工篩選"""
+    try:
+        filter_sql, filter_params = _filter_sql(statuses, staff_id)
+        return _cached_query(
+            conn,
+            ('admin_dispatched', admin_id, _statuses_key(statuses), staff_id, sort_by,
+             bool(descending), page_size, cursor),
+            ('assigner', admin_id),
+            lambda: _query_requirements(
+                conn,
+                "r.assigner_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0" + filter_sql,
+                [admin_id] + filter_params, sort_by, descending, page_size, cursor))
     except Error as e:
         print(f"獲取管理員已發派需求單時發生錯誤: {e}")
         return []
 
-def get_admin_requirements_by_staff(conn, admin_id, staff_id):
-    """獲取管理員發派給特定員工的需求單 (已發派且未刪除)"""
+def count_admin_dispatched_requirements(conn, admin_id, statuses=None, staff_id=None):
+    """計算管理員已發派的需求單筆數 (條件與 get_admin_dispatched_requirements 相同)"""
     try:
-        cursor = conn.cursor()
-        sql = f'''
-            SELECT {_get_requirement_select_fields()}
-            FROM requirements r
-            {_get_requirement_joins()}
-            WHERE r.assigner_id = ? AND r.assignee_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0
-            ORDER BY r.created_at DESC
-        '''
-        cursor.execute(sql, (admin_id, staff_id))
-        return cursor.fetchall()
+        filter_sql, filter_params = _filter_sql(statuses, staff_id)
+        return _cached_query(
+            conn,
+            ('count_admin_dispatched', admin_id, _statuses_key(statuses), staff_id),
+            ('assigner', admin_id),
+            lambda: _count_requirements(
+                conn,
+                "r.assigner_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0" + filter_sql,
+                [admin_id] + filter_params))
     except Error as e:
-        print(f"依員工篩選管理員需求單時發生錯誤: {e}")
-        return []
+        print(f"計算管理員已發派需求單數量時發生錯誤: {e}")
+        return None
 
-def get_admin_scheduled_requirements(conn, admin_id):
-    """獲取管理員預約發派的需求單 (未發派且未刪除)"""
+def get_admin_requirements_by_staff(conn, admin_id, staff_id, statuses=None, sort_by='created_at',
+                                    descending=True, page_size=None, cursor=None):
+    """獲取管理員發派給特定員工的需求單 (已發派且未刪除)"""
+    return get_admin_dispatched_requirements(conn, admin_id, statuses, staff_id,
+                                             sort_by, descending, page_size, cursor)
+
+def get_admin_scheduled_requirements(conn, admin_id, staff_id=None, sort_by='scheduled_time',
+                                     descending=False, page_size=None, cursor=None):
+    """獲取管理員預約發派的需求單 (未發派且未刪除)，可依接收員工篩選"""
     try:
-        cursor = conn.cursor()
-        sql = f'''
-            SELECT {_get_requirement_select_fields()}
-            FROM requirements r
-            {_get_requirement_joins()}
-            WHERE r.assigner_id = ? AND r.is_dispatched = 0 AND r.is_deleted = 0
-            ORDER BY r.scheduled_time ASC
-        '''
-        cursor.execute(sql, (admin_id,))
-        return cursor.fetchall()
+        filter_sql, filter_params = _filter_sql(staff_id=staff_id)
+        return _cached_query(
+            conn,
+            ('admin_scheduled', admin_id, staff_id, sort_by, bool(descending), page_size, cursor),
+            ('assigner', admin_id),
+            lambda: _query_requirements(
+                conn,
+                "r.assigner_id = ? AND r.is_dispatched = 0 AND r.is_deleted = 0" + filter_sql,
+                [admin_id] + filter_params, sort_by, descending, page_size, cursor))
     except Error as e:
         print(f"獲取管理員預約需求單時發生錯誤: {e}")
         return []
 
-def get_admin_scheduled_by_staff(conn, admin_id, staff_id):
+def get_admin_scheduled_by_staff(conn, admin_id, staff_id, sort_by='scheduled_time', descending=False,
+                                 page_size=None, cursor=None):
     """獲取管理員預約給特定員工的需求單 (未發派且未刪除)"""
+    return get_admin_scheduled_requirements(conn, admin_id, staff_id,
+                                            sort_by, descending, page_size, cursor)
+
+def get_requirement_by_id(conn, req_id, assigner_id=None, assignee_id=None):
+    """以主鍵獲取單一需求單
+
+    assigner_id / assignee_id 用來限定存取範圍：管理員只能取得自己發派的，
+    員工只能取得已發派給自己且未刪除的；找不到或不在範圍內時回傳 None。
+    """
     try:
-        cursor = conn.cursor()
         sql = f'''
             SELECT {_get_requirement_select_fields()}
-            FROM requirements r
+            FROM requirement_items r
             {_get_requirement_joins()}
-            WHERE r.assigner_id = ? AND r.assignee_id = ? AND r.is_dispatched = 0 AND r.is_deleted = 0
-            ORDER BY r.scheduled_time ASC
+            WHERE r.id = ?
         '''
-        cursor.execute(sql, (admin_id, staff_id))
-        return cursor.fetchall()
+        params = [req_id]
+        if assigner_id is not None:
+            sql += " AND r.assigner_id = ?"
+            params.append(assigner_id)
+        if assignee_id is not None:
+            sql += " AND r.assignee_id = ? AND r.is_dispatched = 1 AND r.is_deleted = 0"
+            params.append(assignee_id)
+
+        def load():
+            cursor = conn.cursor()
+            cursor.row_factory = _requirement_factory
+            cursor.execute(sql, params)
+            return cursor.fetchone()
+
+        if assigner_id is not None:
+            scope = ('assigner', assigner_id)
+        elif assignee_id is not None:
+            scope = ('assignee', assignee_id)
+        else:
+            # 沒有限定範圍時無法以變更計數器確認快取是否有效，直接查詢
+            return load()
+        # 寫入時以需求單ID清除；變更計數器另外確認這個範圍沒有被其他程序修改
+        return _cached_query(conn, ('requirement', req_id, assigner_id, assignee_id), scope, load,
+                             tags=[('requirement', req_id)])
     except Error as e:
-        print(f"依員工篩選管理員預約需求單時發生錯誤: {e}")
+        print(f"獲取需求單 #{req_id} 時發生錯誤: {e}")
+        return None
+
+def _fts_query(query):
+    """把使用者輸入的搜尋字串轉成 FTS5 查詢；無可搜尋的字詞時回傳 None
+
+    以空白分隔的每個詞都必須出現 (AND)，各自以片語比對，使用者輸入的
+    運算子與引號都當成一般文字。詞中的中日韓文字與索引一樣拆成兩字一組，
+    後面還接著其他文字的段落才加上最後一個單字詞 (文件中該段落同樣在此結束)。
+    以單一個中日韓文字結尾的詞以前綴比對 (文件中這個字通常是某個兩字詞的開頭)；
+    最後一個詞以英數字結尾時也以前綴比對 (輸入到一半也找得到)。
+    """
+    phrases = []
+    terms = query.split()
+    for index, term in enumerate(terms):
+        tokens = _CJK_RUN.sub(
+            lambda m: f' {_cjk_bigrams(m.group(), m.end() < len(term))} ', term).strip()
+        if not any(char.isalnum() for char in tokens):
+            continue
+        phrase = '"' + tokens.replace('"', '""') + '"'
+        cjk_tail = re.search(f'[{_CJK_CHARS}]+$', term)
+        if cjk_tail is not None and len(cjk_tail.group()) == 1:
+            phrase += ' *'
+        elif cjk_tail is None and index == len(terms) - 1 and term[-1].isalnum():
+            phrase += ' *'
+        phrases.append(phrase)
+    return ' '.join(phrases) if phrases else None
+
+def _search_snippet(texts, terms, highlight):
+    """在 texts 中依序找第一段含有搜尋詞的文字，取命中處前後的文字並以 highlight 標記命中的詞
+
+    都沒有找到 (例如只有標題命中，或以標點分隔的詞) 時取第一段文字的開頭。
+    """
+    pattern = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)),
+                         re.IGNORECASE)
+    texts = [' '.join(text.split()) for text in texts if text]
+    if not texts:
+        return ''
+    for text in texts:
+        match = pattern.search(text)
+        if match:
+            break
+    else:
+        text = texts[0]
+        return text[:SEARCH_SNIPPET_CONTEXT * 2] + ('…' if len(text) > SEARCH_SNIPPET_CONTEXT * 2 else '')
+    start = max(0, match.start() - SEARCH_SNIPPET_CONTEXT)
+    end = min(len(text), match.end() + SEARCH_SNIPPET_CONTEXT)
+    snippet = pattern.sub(lambda m: f"{highlight[0]}{m.group()}{highlight[1]}", text[start:end])
+    return ('…' if start > 0 else '') + snippet + ('…' if end < len(text) else '')
+
+def _search_hits_sql(table, item_column, scope_sql, use_scope_set, ranked):
+    """在一個全文索引中找出搜尋範圍內符合的需求單的 SQL，欄位為 (需求單ID, bm25 分數或 NULL)
+
+    table 的 rowid 對應 requirement_items 的 item_column (本體ID或需求單ID)。
+    參數依序為 MATCH 查詢、範圍的使用者ID與筆數上限 (使用範圍集合時範圍的使用者ID再一次)；
+    ranked 為 False 時不計算 bm25，上限即為範圍內最新的幾筆 (計算 bm25 時上限為 -1，不限筆數)。
+    """
+    score = f"bm25({table}, 5.0, 1.0)" if table == 'requirement_body_search' else f"bm25({table})"
+    score = score if ranked else "NULL"
+    # 兩種方式都以全文索引為外層迴圈 (CROSS JOIN 固定順序)，依 rowid 由新到舊逐筆比對；
+    # 需求單以本體ID或主鍵查詢，不走搜尋範圍的索引 (否則會對範圍內每一列各查一次全文索引)
+    index_hint = "INDEXED BY idx_requirement_items_body" if item_column == 'body_id' else ""
+    if use_scope_set:
+        # rowid 前的 + 讓 IN 不交給全文索引逐一查詢，而是對範圍內的ID集合逐筆比對；
+        # 子查詢有 LIMIT 才不會被展開合併到外層
+        return f'''
+            SELECT r.id AS id, hits.score AS score FROM (
+                SELECT rowid AS item_key, {score} AS score
+                FROM {table}
+                WHERE {table} MATCH ?
+                  AND +rowid IN (SELECT r.{item_column} FROM requirement_items r WHERE {scope_sql})
+                ORDER BY rowid DESC
+                LIMIT ?
+            ) hits
+            CROSS JOIN requirement_items r {index_hint} ON r.{item_column} = hits.item_key
+            WHERE {scope_sql}
+        '''
+    return f'''
+        SELECT * FROM (
+            SELECT r.id AS id, {score} AS score
+            FROM {table}
+            CROSS JOIN requirement_items r {index_hint} ON r.{item_column} = {table}.rowid
+            WHERE {table} MATCH ? AND {scope_sql}
+            ORDER BY {table}.rowid DESC
+            LIMIT ?
+        )
+    '''
+
+def search_requirements(conn, query, assigner_id=None, assignee_id=None, limit=50,
+                        highlight=('[', ']')):
+    """全文搜尋需求單的標題、內容與完成說明
+
+    搜尋範圍與列表相同：指定 assigner_id 時為該管理員已發派的需求單，
+    指定 assignee_id 時為已發派給該員工的需求單 (兩者擇一)。
+    結果依相關程度 (bm25，標題的權重高於內容) 排序；符合的需求單太多
+    (超過 SEARCH_RANK_LIMIT) 時改為回傳最新的結果，分數為 None。
+    回傳 RequirementSearchResult 列表，摘要中命中的詞以 highlight 的兩個字串括起。
+    """
+    if (assigner_id is None) == (assignee_id is None):
+        raise ValueError("搜尋需求單時必須指定 assigner_id 或 assignee_id 其中之一")
+    match = _fts_query(query)
+    if match is None:
+        return []
+    if assigner_id is not None:
+        scope_sql, owner_id = "r.assigner_id = ?", assigner_id
+    else:
+        scope_sql, owner_id = "r.assignee_id = ?", assignee_id
+    scope_sql += " AND r.is_dispatched = 1 AND r.is_deleted = 0"
+    sources = (('requirement_body_search', 'body_id'), ('requirement_comment_search', 'id'))
+    try:
+        # 先以有上限的計數判斷搜尋範圍與符合筆數的大小，決定查詢方式
+        use_scope_set = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM requirement_items r WHERE {scope_sql} LIMIT ?)",
+            (owner_id, SEARCH_SCOPE_SET_LIMIT)).fetchone()[0] < SEARCH_SCOPE_SET_LIMIT
+        ranked = all(conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} WHERE {table} MATCH ? LIMIT ?)",
+            (match, SEARCH_RANK_LIMIT)).fetchone()[0] < SEARCH_RANK_LIMIT for table, _ in sources)
+
+        # 每筆需求單取本體 (標題、內容) 與完成說明中較相關的分數
+        hits_sql = " UNION ALL ".join(
+            _search_hits_sql(table, item_column, scope_sql, use_scope_set, ranked)
+            for table, item_column in sources)
+        source_params = [match, owner_id, -1 if ranked else limit]
+        if use_scope_set:
+            source_params.append(owner_id)
+        hits = conn.execute(f'''
+            SELECT id, MIN(score) AS score FROM ({hits_sql})
+            GROUP BY id
+            ORDER BY {"score, id DESC" if ranked else "id DESC"}
+            LIMIT ?
+        ''', source_params * len(sources) + [limit]).fetchall()
+        if not hits:
+            return []
+
+        # 只為要回傳的結果讀取文字並產生摘要
+        req_ids = [req_id for req_id, _ in hits]
+        placeholders = ', '.join('?' * len(req_ids))
+        summaries = {row.id: row for row in _query_requirements(
+            conn, f"r.id IN ({placeholders})", req_ids, 'id', True)}
+        texts = {req_id: (decode_text(description), decode_text(comment))
+                 for req_id, description, comment in conn.execute(f'''
+                     SELECT r.id, t.description, c.comment
+                     FROM requirement_items r
+                     LEFT JOIN requirement_texts t ON t.body_id = r.body_id
+                     LEFT JOIN requirement_comments c ON c.requirement_id = r.id
+                     WHERE r.id IN ({placeholders})
+                 ''', req_ids)}
+        terms = query.split()
+        return [RequirementSearchResult(summaries[req_id],
+                                        _search_snippet(texts.get(req_id, ()), terms, highlight),
+                                        score)
+                for req_id, score in hits if req_id in summaries]
+    except Error as e:
+        print(f"搜尋需求單時發生錯誤: {e}")
         return []
 
-def dispatch_scheduled_requirements(conn):
-    """檢查並發派到期的預約需求單"""
+def claim_due_requirements(conn, claimed_by=None):
+    """認領並發派到期的預約需求單，回傳本次認領的需求單ID列表；資料庫錯誤時拋出 sqlite3.Error
+
+    認領與狀態轉換在同一個 UPDATE 中完成：WHERE 條件在寫入鎖下重新判斷
+    is_dispatched = 0，因此多個調度器同時執行時每一筆只會被其中一個認領，
+    認領者記錄在 dispatched_by。調度器以例外判斷這次發派失敗 (例如寫入鎖被
+    佔用超過 busy_timeout)，稍後重試同一批到期的預約。
+    """
+    current_time = _now_timestamp()
+    claimed_by = claimed_by or SCHEDULER_ID
+    due_condition = "is_dispatched = 0 AND scheduled_time <= ? AND is_deleted = 0"
+    # Use current time for created_at when dispatched
+    update_sql = f'''
+        UPDATE requirement_items 
+        SET is_dispatched = 1, created_at = ?, status = {STATUS_CODES['pending']}, dispatched_by = ?
+        WHERE {due_condition}
+    '''
+    params = (current_time, claimed_by, current_time)
+
+    with conn:
+        if _HAS_RETURNING:
+            cursor = conn.execute(update_sql + " RETURNING id, assigner_id, assignee_id", params)
+            claimed = cursor.fetchall()
+        else:
+            # 舊版 SQLite：先取得寫入鎖，再讀出到期ID並以相同條件更新
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                f"SELECT id, assigner_id, assignee_id FROM requirement_items WHERE {due_condition}",
+                (current_time,))
+            claimed = cursor.fetchall()
+            if claimed:
+                conn.execute(update_sql, params)
+    req_ids = [row[0] for row in claimed]
+    if claimed:
+        _invalidate_owner_caches([row[1:] for row in claimed], req_ids)
+    return req_ids
+
+def dispatch_scheduled_requirements(conn, claimed_by=None):
+    """檢查並發派到期的預約需求單，回傳本次認領並發派的需求單ID列表 (錯誤時回傳空列表)"""
     try:
-        current_time_dt = datetime.datetime.now()
-        current_time_str = current_time_dt.strftime("%Y-%m-%d %H:%M:%S")
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id FROM requirements 
-            WHERE is_dispatched = 0 AND scheduled_time <= ? AND is_deleted = 0
-        ''', (current_time_str,))
-        
-        req_ids = [row[0] for row in cursor.fetchall()]
-        
-        if req_ids:
-            for req_id in req_ids:
-                cursor.execute('''
-                    UPDATE requirements 
-                    SET is_dispatched = 1, created_at = ?, status = 'pending'
-                    WHERE id = ?
-                ''', (current_time_str, req_id)) # Use current_time_str for created_at when dispatched
-            conn.commit()
-            return len(req_ids)
-        return 0
+        return claim_due_requirements(conn, claimed_by)
     except Error as e:
         print(f"自動發派預約需求單時發生錯誤: {e}")
-        return 0
+        return []
 
 def has_upcoming_scheduled_requirements(conn, minutes_ahead=2):
     """檢查是否有即將到期的預約需求單（預設檢查未來2分鐘內）"""
     try:
-        current_time_dt = datetime.datetime.now()
-        future_time_dt = current_time_dt + datetime.timedelta(minutes=minutes_ahead)
-        future_time_str = future_time_dt.strftime("%Y-%m-%d %H:%M:%S")
-        current_time_str = current_time_dt.strftime("%Y-%m-%d %H:%M:%S")
+        current_time = _now_timestamp()
+        future_time = current_time + minutes_ahead * 60
         
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT COUNT(*) FROM requirements 
+            SELECT COUNT(*) FROM requirement_items 
             WHERE is_dispatched = 0 AND scheduled_time > ? AND scheduled_time <= ? AND is_deleted = 0
-        ''', (current_time_str, future_time_str))
+        ''', (current_time, future_time))
         
         count = cursor.fetchone()[0]
         return count > 0
@@ -307,19 +1709,57 @@ def has_upcoming_scheduled_requirements(conn, minutes_ahead=2):
         print(f"檢查即將到期預約需求單時發生錯誤: {e}")
         return False
 
+def get_upcoming_schedule(conn, limit=1000):
+    """依預約時間順序獲取尚未發派的預約需求單，回傳 [(預約時間 datetime, id), ...]"""
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = lambda cursor, row: (decode_timestamp(row[0]), row[1])
+        cursor.execute('''
+            SELECT scheduled_time, id FROM requirement_items
+            WHERE is_dispatched = 0 AND is_deleted = 0 AND scheduled_time IS NOT NULL
+            ORDER BY scheduled_time ASC
+            LIMIT ?
+        ''', (limit,))
+        return cursor.fetchall()
+    except Error as e:
+        print(f"獲取預約排程時發生錯誤: {e}")
+        return []
+
+def get_change_version(conn, scope, owner_id=0):
+    """讀取變更計數器 (主鍵查詢)；數值改變代表相關資料已被修改
+
+    Args:
+        scope: 'assigner'、'assignee' 或 'users'
+        owner_id: 使用者ID ('users' 時為 0)
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT version FROM change_counters WHERE scope = ? AND owner_id = ?",
+            (scope, owner_id)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    except Error as e:
+        print(f"讀取變更計數器時發生錯誤: {e}")
+        return None
+
 def cancel_scheduled_requirement(conn, req_id):
     """取消預約發派的需求單 (軟刪除)"""
     try:
         cursor = conn.cursor()
-        current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        current_time = _now_timestamp()
         # Instead of deleting, mark as deleted and set status to 'cancelled' or similar
         # For now, just soft delete as per existing delete_requirement logic
         cursor.execute('''
-            UPDATE requirements
-            SET is_deleted = 1, deleted_at = ?, status = 'cancelled' 
+            UPDATE requirement_items
+            SET is_deleted = 1, deleted_at = ?, status = ? 
             WHERE id = ? AND is_dispatched = 0 AND is_deleted = 0
-        ''', (current_time, req_id))
+        ''', (current_time, STATUS_CODES['cancelled'], req_id))
         conn.commit()
+        if cursor.rowcount > 0:
+            _invalidate_requirement_caches(conn, req_id)
+            _notify_schedule_changed()
         return cursor.rowcount > 0
     except Error as e:
         print(f"取消預約需求單時發生錯誤: {e}")
@@ -329,23 +1769,32 @@ def submit_requirement(conn, req_id, comment, attachment_path=None):
     """員工提交需求單完成情況"""
     try:
         cursor = conn.cursor()
-        current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        current_time = _now_timestamp()
+        reviewing, pending = STATUS_CODES['reviewing'], STATUS_CODES['pending']
         
-        if attachment_path:
-            cursor.execute('''
-                UPDATE requirements
-                SET status = 'reviewing', comment = ?, completed_at = ?, attachment_path = ?
-                WHERE id = ? AND status = 'pending' AND is_deleted = 0
-            ''', (comment, current_time, attachment_path, req_id))
-        else:
+        with conn:  # 狀態與完成說明在同一個交易中更新
             cursor.execute('''
-                UPDATE requirements
-                SET status = 'reviewing', comment = ?, completed_at = ?
-                WHERE id = ? AND status = 'pending' AND is_deleted = 0
-            ''', (comment, current_time, req_id))
+                UPDATE requirement_items
+                SET status = ?, completed_at = ?
+                WHERE id = ? AND status = ? AND is_deleted = 0
+            ''', (reviewing, current_time, req_id, pending))
+            submitted = cursor.rowcount > 0
+            if submitted:
+                previous = conn.execute(
+                    "SELECT comment FROM requirement_comments WHERE requirement_id = ?", (req_id,)).fetchone()
+                _index_requirement_comment(conn, req_id, previous and previous[0], comment)
+                # 沒有附上新附件時保留先前提交的附件
+                conn.execute('''
+                    INSERT INTO requirement_comments (requirement_id, comment, attachment_path)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (requirement_id) DO UPDATE
+                    SET comment = excluded.comment,
+                        attachment_path = COALESCE(excluded.attachment_path, attachment_path)
+                ''', (req_id, encode_text(comment), attachment_path or None))
         
-        conn.commit()
-        return cursor.rowcount > 0
+        if submitted:
+            _invalidate_requirement_caches(conn, req_id)
+        return submitted
     except Error as e:
         print(f"提交需求單時發生錯誤: {e}")
         return False
@@ -355,11 +1804,13 @@ def approve_requirement(conn, req_id):
     try:
         cursor = conn.cursor()
         cursor.execute('''
-            UPDATE requirements
-            SET status = 'completed'
-            WHERE id = ? AND status = 'reviewing' AND is_deleted = 0
-        ''', (req_id,))
+            UPDATE requirement_items
+            SET status = ?
+            WHERE id = ? AND status = ? AND is_deleted = 0
+        ''', (STATUS_CODES['completed'], req_id, STATUS_CODES['reviewing']))
         conn.commit()
+        if cursor.rowcount > 0:
+            _invalidate_requirement_caches(conn, req_id)
         return cursor.rowcount > 0
     except Error as e:
         print(f"審核通過需求單時發生錯誤: {e}")
@@ -370,13 +1821,22 @@ def reject_requirement(conn, req_id):
     try:
         cursor = conn.cursor()
         # Clear previous comment and completion time when rejecting
-        cursor.execute('''
-            UPDATE requirements
-            SET status = 'pending', comment = NULL, completed_at = NULL
-            WHERE id = ? AND status = 'reviewing' AND is_deleted = 0
-        ''', (req_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+        with conn:
+            cursor.execute('''
+                UPDATE requirement_items
+                SET status = ?, completed_at = NULL
+                WHERE id = ? AND status = ? AND is_deleted = 0
+            ''', (STATUS_CODES['pending'], req_id, STATUS_CODES['reviewing']))
+            rejected = cursor.rowcount > 0
+            if rejected:
+                previous = conn.execute(
+                    "SELECT comment FROM requirement_comments WHERE requirement_id = ?", (req_id,)).fetchone()
+                if previous:
+                    _index_requirement_comment(conn, req_id, previous[0], None)
+                conn.execute("UPDATE requirement_comments SET comment = NULL WHERE requirement_id = ?", (req_id,))
+        if rejected:
+            _invalidate_requirement_caches(conn, req_id)
+        return rejected
     except Error as e:
         print(f"退回需求單時發生錯誤: {e}")
         return False
@@ -386,11 +1846,13 @@ def invalidate_requirement(conn, req_id):
     try:
         cursor = conn.cursor()
         cursor.execute('''
-            UPDATE requirements
-            SET status = 'invalid'
+            UPDATE requirement_items
+            SET status = ?
             WHERE id = ? AND is_deleted = 0
-        ''', (req_id,))
+        ''', (STATUS_CODES['invalid'], req_id))
         conn.commit()
+        if cursor.rowcount > 0:
+            _invalidate_requirement_caches(conn, req_id)
         return cursor.rowcount > 0
     except Error as e:
         print(f"使需求單失效時發生錯誤: {e}")
@@ -400,13 +1862,15 @@ def delete_requirement(conn, req_id):
     """刪除需求單（軟刪除）"""
     try:
         cursor = conn.cursor()
-        current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        current_time = _now_timestamp()
         cursor.execute('''
-            UPDATE requirements
+            UPDATE requirement_items
             SET is_deleted = 1, deleted_at = ?
             WHERE id = ? AND is_deleted = 0
         ''', (current_time, req_id))
         conn.commit()
+        if cursor.rowcount > 0:
+            _invalidate_requirement_caches(conn, req_id)
         return cursor.rowcount > 0
     except Error as e:
         print(f"刪除需求單時發生錯誤: {e}")
@@ -421,44 +1885,132 @@ def restore_requirement(conn, req_id):
         # For now, a simple approach: set to 'pending' if it was soft-deleted.
         # Consider more nuanced logic if needed, e.g., checking scheduled_time.
         cursor.execute('''
-            UPDATE requirements
+            UPDATE requirement_items
             SET is_deleted = 0, deleted_at = NULL, status = 
                 CASE 
-                    WHEN scheduled_time IS NOT NULL AND is_dispatched = 0 THEN 'not_dispatched'
-                    ELSE 'pending'
+                    WHEN scheduled_time IS NOT NULL AND is_dispatched = 0 THEN ?
+                    ELSE ?
                 END
             WHERE id = ? AND is_deleted = 1
-        ''', (req_id,))
+        ''', (STATUS_CODES['not_dispatched'], STATUS_CODES['pending'], req_id))
         conn.commit()
+        if cursor.rowcount > 0:
+            _invalidate_requirement_caches(conn, req_id)
+            # 恢復的可能是尚未發派的預約需求單
+            _notify_schedule_changed()
         return cursor.rowcount > 0
     except Error as e:
         print(f"恢復需求單時發生錯誤: {e}")
         return False
 
-def get_deleted_requirements(conn, admin_id):
+def get_deleted_requirements(conn, admin_id, sort_by='deleted_at', descending=True,
+                             page_size=None, cursor=None):
     """獲取管理員已刪除的需求單"""
     try:
-        cursor = conn.cursor()
-        sql = f'''
-            SELECT {_get_requirement_select_fields()}
-            FROM requirements r
-            {_get_requirement_joins()}
-            WHERE r.assigner_id = ? AND r.is_deleted = 1
-            ORDER BY r.deleted_at DESC
-        '''
-        cursor.execute(sql, (admin_id,))
-        return cursor.fetchall()
+        return _cached_query(
+            conn,
+            ('deleted', admin_id, sort_by, bool(descending), page_size, cursor),
+            ('assigner', admin_id),
+            lambda: _query_requirements(
+                conn,
+                "r.assigner_id = ? AND r.is_deleted = 1",
+                (admin_id,), sort_by, descending, page_size, cursor))
     except Error as e:
         print(f"獲取已刪除需求單時發生錯誤: {e}")
         return [] 
 
+def count_deleted_requirements(conn, admin_id):
+    """計算管理員已刪除的需求單筆數"""
+    try:
+        return _cached_query(
+            conn,
+            ('count_deleted', admin_id),
+            ('assigner', admin_id),
+            lambda: _count_requirements(conn, "r.assigner_id = ? AND r.is_deleted = 1", (admin_id,)))
+    except Error as e:
+        print(f"計算已刪除需求單數量時發生錯誤: {e}")
+        return None
+
+# 可能壓縮儲存的大文字欄位: (表格, 主鍵, 欄位)
+_COMPRESSIBLE_TEXT_COLUMNS = (
+    ('requirement_texts', 'body_id', 'description'),
+    ('requirement_comments', 'requirement_id', 'comment'),
+)
+
+def get_text_storage_stats(conn):
+    """統計需求單內容與完成說明的儲存大小 (維護命令用)
+
+    Returns:
+        dict: fields (非空欄位數)、compressed (壓縮儲存的欄位數)、raw_bytes (原文 UTF-8 大小)、
+        stored_bytes (實際儲存大小)；讀取失敗時回傳 None
+    """
+    try:
+        stats = {'fields': 0, 'compressed': 0, 'raw_bytes': 0, 'stored_bytes': 0}
+        for table, _, column in _COMPRESSIBLE_TEXT_COLUMNS:
+            fields, stored_bytes = conn.execute(
+                f"SELECT COUNT({column}), COALESCE(SUM(length(CAST({column} AS BLOB))), 0) "
+                f"FROM {table}").fetchone()
+            stats['fields'] += fields
+            stats['stored_bytes'] += stored_bytes
+            stats['raw_bytes'] += stored_bytes
+            # 壓縮過的欄位要解壓縮才知道原文大小
+            for (value,) in conn.execute(f"SELECT {column} FROM {table} WHERE typeof({column}) = 'blob'"):
+                stats['compressed'] += 1
+                stats['raw_bytes'] += len(zlib.decompress(value)) - len(value)
+        return stats
+    except (Error, zlib.error) as e:
+        print(f"統計需求單文字大小時發生錯誤: {e}")
+        return None
+
+def compress_requirement_texts(conn, threshold=TEXT_COMPRESSION_THRESHOLD, batch_size=1000):
+    """把尚未壓縮且超過門檻的內容與完成說明改為壓縮儲存 (升級前建立的資料由維護命令處理)
+
+    依主鍵分批處理並逐批提交，不會長時間佔用寫入鎖。
+    只改變儲存格式，讀出的內容不變，因此不需要清除查詢快取。
+
+    Returns:
+        int: 改為壓縮儲存的欄位數；發生錯誤時回傳 None
+    """
+    compressed = 0
+    try:
+        for table, key, column in _COMPRESSIBLE_TEXT_COLUMNS:
+            last_key = 0
+            while True:
+                rows = conn.execute(f'''
+                    SELECT {key}, {column} FROM {table}
+                    WHERE {key} > ? AND typeof({column}) = 'text' AND length(CAST({column} AS BLOB)) > ?
+                    ORDER BY {key}
+                    LIMIT ?
+                ''', (last_key, threshold, batch_size)).fetchall()
+                if not rows:
+                    break
+                updates = []
+                for row_key, value in rows:
+                    encoded = encode_text(value, threshold)
+                    if encoded is not value:
+                        updates.append((encoded, row_key))
+                with conn:
+                    conn.executemany(f"UPDATE {table} SET {column} = ? WHERE {key} = ?", updates)
+                compressed += len(updates)
+                last_key = rows[-1][0]
+        return compressed
+    except Error as e:
+        print(f"壓縮需求單文字時發生錯誤: {e}")
+        return None
+
 # Example of how to clear all requirements (for testing, use with caution)
 def clear_all_requirements_DANGEROUS(conn):
     """(危險操作) 清空所有需求單"""
     try:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM requirements")
-        conn.commit()
+        with conn:
+            cursor.execute("DELETE FROM requirement_comments")
+            cursor.execute("DELETE FROM requirement_items")
+            cursor.execute("DELETE FROM requirement_texts")
+            cursor.execute("DELETE FROM requirement_bodies")
+            cursor.execute("INSERT INTO requirement_body_search (requirement_body_search) VALUES ('delete-all')")
+            cursor.execute("INSERT INTO requirement_comment_search (requirement_comment_search) VALUES ('delete-all')")
+        _query_cache.clear()
         print(f"已清空資料庫中的所有需求單")
         return True
     except Error as e:
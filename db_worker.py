@@ -0,0 +1,158 @@
+import itertools
+import queue
+import threading
+
+from database import create_connection, release_connection, close_connection
+
+
+class DatabaseWorker:
+    """在背景線程執行資料庫操作，完成後回到 Tk 主線程呼叫回呼
+
+    工作線程各自持有 database 模組的線程連接；結果放入佇列，
+    由主線程以 root.after 取出並呼叫回呼，因此回呼中可以直接操作 Tk 元件。
+    同一個 key 的新請求會取代舊請求：舊請求若還在排隊就不執行，正在執行的
+    查詢會以 Connection.interrupt() 中斷，結果也會被丟棄。
+    因此帶 key 的請求應該只做讀取。
+    """
+
+    # 主線程檢查結果佇列的間隔 (毫秒)，只在有未完成的請求時才會檢查
+    POLL_INTERVAL = 15
+
+    def __init__(self, root, max_workers=2):
+        """初始化背景資料庫工作者
+
+        Args:
+            root: 用來排程回呼的 Tk 元件
+            max_workers: 工作線程數量
+        """
+        self.root = root
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._job_ids = itertools.count(1)
+        # key -> 最新請求的編號
+        self._latest = {}
+        # key -> (正在執行的請求編號, 連接)，用來中斷被取代的查詢
+        self._active = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._poll_id = None
+        self._running = True
+        self._threads = []
+        for index in range(max_workers):
+            thread = threading.Thread(target=self._work, name=f"db-worker-{index + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, func, *args, callback=None, key=None, **kwargs):
+        """提交資料庫操作 (必須在主線程呼叫)
+
+        Args:
+            func: 資料庫函式，第一個參數為連接
+            callback: 完成後在主線程呼叫 callback(result)；發生錯誤時 result 為 None
+            key: 請求的識別名稱；同一 key 有更新的請求時，舊請求的結果不會回呼
+
+        Returns:
+            int: 請求編號
+        """
+        if not self._running:
+            return None
+        job_id = next(self._job_ids)
+        if key is not None:
+            with self._lock:
+                self._latest[key] = job_id
+                self._interrupt_active(key)
+        self._pending += 1
+        self._jobs.put((job_id, key, func, args, kwargs, callback))
+        self._schedule_poll()
+        return job_id
+
+    def cancel(self, key):
+        """取消 key 尚未完成的請求：排隊中的不執行，執行中的查詢被中斷"""
+        with self._lock:
+            if key in self._latest:
+                self._latest[key] = next(self._job_ids)
+            self._interrupt_active(key)
+
+    def _interrupt_active(self, key):
+        """中斷 key 正在執行的查詢 (呼叫時需持有 self._lock)"""
+        active = self._active.get(key)
+        if active:
+            active[1].interrupt()
+
+    def is_current(self, key, job_id):
+        """判斷請求是否仍是該 key 最新的請求"""
+        if key is None:
+            return True
+        with self._lock:
+            return self._latest.get(key) == job_id
+
+    def shutdown(self):
+        """停止工作線程，未完成請求的結果都會被丟棄"""
+        if not self._running:
+            return
+        self._running = False
+        if self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+        for _ in self._threads:
+            self._jobs.put(None)
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            job_id, key, func, args, kwargs, callback = job
+            result = None
+            conn = create_connection() if self._running else None
+            if conn:
+                if key is not None:
+                    with self._lock:
+                        # 排隊期間已被更新的請求取代時不必執行
+                        superseded = self._latest.get(key) != job_id
+                        if not superseded:
+                            self._active[key] = (job_id, conn)
+                    if superseded:
+                        release_connection(conn)
+                        self._results.put((job_id, key, None, None))
+                        continue
+                try:
+                    result = func(conn, *args, **kwargs)
+                except Exception as e:
+                    print(f"資料庫操作錯誤: {e}")
+                    result = None
+                finally:
+                    if key is not None:
+                        # 先取消登記再釋放連接，避免中斷到同一連接上的下一個請求
+                        with self._lock:
+                            if self._active.get(key, (None,))[0] == job_id:
+                                del self._active[key]
+                    release_connection(conn)
+            self._results.put((job_id, key, callback, result))
+        # 工作線程結束時關閉其專屬連接
+        close_connection()
+
+    def _schedule_poll(self):
+        if self._poll_id is None and self._running:
+            self._poll_id = self.root.after(self.POLL_INTERVAL, self._poll)
+
+    def _poll(self):
+        """在主線程取出已完成的結果並呼叫回呼"""
+        self._poll_id = None
+        while True:
+            try:
+                job_id, key, callback, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if not self._running or callback is None or not self.is_current(key, job_id):
+                continue
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"處理資料庫結果時發生錯誤: {e}")
+        if self._pending > 0:
+            self._schedule_poll()
@@ -7,19 +7,18 @@ sys.dont_write_bytecode = True
 import tkinter as tk
 from tkinter import ttk, messagebox
 from auth import login
-from database import create_connection, initialize_database, dispatch_scheduled_requirements, has_upcoming_scheduled_requirements
+from database import DB_PATH, close_connection, open_connection, initialize_database
 from requirement_manager import RequirementManager
+from scheduler import DispatchScheduler
+from scheduler_daemon import RESYNC_INTERVAL as DAEMON_CHECK_INTERVAL, default_status_path, is_daemon_alive
 from registration import show_registration_form
 import datetime
-import time
-import threading
-import sqlite3
 
 # 檢查資料庫是否存在，如果不存在則從 schema.sql 創建
 def initialize_database_from_schema():
     """從 schema.sql 初始化資料庫"""
-    db_path = os.path.join(os.path.dirname(__file__), 'users.db')
-    schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
+    db_path = DB_PATH
+    schema_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
     
     # 如果資料庫已存在，直接返回
     if os.path.exists(db_path):
@@ -37,7 +36,7 @@ def initialize_database_from_schema():
         
     # 創建資料庫和表格
     try:
-        conn = sqlite3.connect(db_path)
+        conn = open_connection(db_path)
         conn.executescript(schema_sql)
         conn.close()
         print("成功創建資料庫！")
@@ -59,62 +58,41 @@ root.resizable(True, True)
 
 
 # 定義全局變數
-scheduler_running = False
-scheduler_thread = None
+dispatch_scheduler = None
+daemon_detected = False
 
 
 # 啓動定時任務，檢查並發派預約需求單
 def start_global_scheduler():
-    """啟動全局定時任務，每10秒檢查一次是否有到期的需求單需要發派"""
-    global scheduler_running, scheduler_thread
+    """啟動全局預約發派調度器，睡到下一筆預約到期時才檢查資料庫
+
+    伺服器上已有常駐調度器 (scheduler_daemon.py) 時不另外啟動，而是定期
+    檢查它的心跳；常駐調度器停止 (心跳過期) 後由本用戶端接手發派。
+    """
+    global dispatch_scheduler, daemon_detected
     
-    if scheduler_running:
+    if dispatch_scheduler and dispatch_scheduler.running:
         return
-        
-    scheduler_running = True
     
-    def check_scheduled_requirements():
-        retry_interval = 10  # 正常情況下每10秒檢查一次
-        
-        while scheduler_running:
-            try:
-                # 檢查並發派到期的需求單
-                conn = create_connection()
-                if conn:
-                    dispatched_count = dispatch_scheduled_requirements(conn)
-                    
-                    # 檢查是否有即將到期的需求單，如果有則更頻繁檢查
-                    has_upcoming = has_upcoming_scheduled_requirements(conn)
-                    conn.close()
-                    
-                    if dispatched_count > 0:
-                        # 使用主線程安全的方式顯示消息（僅當有管理員登入時）
-                        root.after(0, lambda: show_dispatch_notification(dispatched_count))
-                        
-                    # 根據是否有即將到期的需求單動態調整檢查頻率
-                    if has_upcoming:
-                        retry_interval = 5  # 有即將到期的需求單時，每5秒檢查一次
-                    else:
-                        retry_interval = 10  # 沒有即將到期的需求單時，每10秒檢查一次
-                else:
-                    # 無法創建連接時增加重試間隔
-                    print("無法創建資料庫連接，稍後重試")
-                    retry_interval = min(retry_interval * 2, 60)  # 最多等待1分鐘
-            except Exception as e:
-                # 發生錯誤時增加重試間隔
-                print(f"定時任務執行錯誤: {e}")
-                retry_interval = min(retry_interval * 2, 60)  # 最多等待1分鐘
-                
-            # 等待指定的時間後再次檢查
-            for _ in range(retry_interval):
-                if not scheduler_running:
-                    break
-                time.sleep(1)  # 每秒檢查一次是否需要退出
+    if is_daemon_alive(default_status_path(DB_PATH)):
+        if not daemon_detected:
+            daemon_detected = True
+            print("偵測到常駐預約發派調度器，本用戶端不啟動調度線程")
+        root.after(int(DAEMON_CHECK_INTERVAL * 1000), start_global_scheduler)
+        return
+    if daemon_detected:
+        daemon_detected = False
+        print("常駐預約發派調度器的心跳已過期，改由本用戶端發派")
+    
+    def on_dispatched(dispatched_ids):
+        # 使用主線程安全的方式顯示消息（僅當有管理員登入時）
+        count = len(dispatched_ids)
+        root.after(0, lambda: show_dispatch_notification(count))
     
-    # 在後台線程運行定時任務
-    scheduler_thread = threading.Thread(target=check_scheduled_requirements, daemon=True)
-    scheduler_thread.start()
-    print("全局預約發派調度器已啟動（動態檢查頻率：正常10秒，即將到期時5秒）")
+    # 在後台線程運行調度器
+    dispatch_scheduler = DispatchScheduler(on_dispatched=on_dispatched)
+    dispatch_scheduler.start()
+    print("全局預約發派調度器已啟動（事件驅動：於下一筆預約到期時發派）")
 
 
 # 顯示發派通知（只有在有管理員登入時才會彈出）
@@ -123,19 +101,12 @@ def show_dispatch_notification(count):
     global current_app
     if current_app and hasattr(current_app, 'current_user') and current_app.current_user.role == 'admin':
         messagebox.showinfo("自動發派通知", f"已有 {count} 個預約需求單到期並自動發派！")
-        # 如果管理員正在查看需求單列表，刷新列表
+        # 由變更計數器判斷，只刷新目前顯示且已過期的列表
         if current_app.requirement_manager:
             try:
-                # 刷新已發派、預約發派和待審核的需求單列表
-                if hasattr(current_app.requirement_manager, 'load_admin_dispatched_requirements'):
-                    current_app.requirement_manager.load_admin_dispatched_requirements()
-                if hasattr(current_app.requirement_manager, 'load_admin_scheduled_requirements'):
-                    current_app.requirement_manager.load_admin_scheduled_requirements()
-                if hasattr(current_app.requirement_manager, 'load_admin_reviewing_requirements'):
-                    current_app.requirement_manager.load_admin_reviewing_requirements()
+                current_app.requirement_manager.check_for_changes()
             except Exception as e:
                 print(f"刷新需求單列表錯誤: {e}")
-                pass
 
 
 # 時間顯示框架
@@ -423,13 +394,8 @@ update_time()
 # 在應用關閉時停止定時任務
 def on_closing():
     """應用關閉時的處理"""
-    global scheduler_running, scheduler_thread
-    
     # 詢問用戶是否確認關閉應用
     if messagebox.askokcancel("關閉程式", "確定要關閉需求管理系統嗎?"):
-        # 停止全局調度器
-        scheduler_running = False
-        
         # 如果當前有用戶登入，則先登出
         global current_app
         if current_app:
@@ -438,13 +404,16 @@ def on_closing():
                 current_app.requirement_manager.close()
             current_app = None
             
-        # 等待調度器線程結束
-        if scheduler_thread and scheduler_thread.is_alive():
+        # 停止全局調度器並等待線程結束
+        if dispatch_scheduler:
             try:
-                scheduler_thread.join(timeout=1)  # 最多等待1秒
+                dispatch_scheduler.stop(timeout=1)  # 最多等待1秒
             except:
                 pass
                 
+        # 關閉 UI 線程的資料庫連接
+        close_connection()
+
         # 關閉應用
         root.destroy()
 
@@ -0,0 +1,125 @@
+"""資料庫維護命令 (不需要 GUI)
+
+用法:
+    python maintenance.py text-stats [--db users.db]
+    python maintenance.py compress-texts [--db users.db] [--threshold 1024] [--no-vacuum]
+    python maintenance.py rebuild-search [--db users.db]
+
+text-stats      顯示需求單內容與完成說明的原文大小、實際儲存大小與壓縮率 (只讀取，
+                資料庫必須已是最新結構版本)
+compress-texts  先把資料庫升級到最新結構版本，再把尚未壓縮且超過門檻的內容與完成說明
+                改為壓縮儲存，以 VACUUM 回收空間，並顯示壓縮率與資料庫檔案縮小的大小
+rebuild-search  先把資料庫升級到最新結構版本，再由需求單文字重新建立全文索引
+                (以 sqlite3 命令列工具等外部工具修改過需求單文字之後執行)
+"""
+import argparse
+import os
+import sys
+import time
+
+import database
+
+
+def database_file_size(db_path):
+    """資料庫檔案與 WAL 檔案的總大小 (位元組)"""
+    return sum(os.path.getsize(path) for path in (db_path, db_path + "-wal") if os.path.exists(path))
+
+
+def format_size(size):
+    return f"{size / 1024 / 1024:.2f} MiB"
+
+
+def print_text_stats(stats):
+    ratio = stats['stored_bytes'] / stats['raw_bytes'] if stats['raw_bytes'] else 1.0
+    print(f"文字欄位 {stats['fields']} 個，壓縮儲存 {stats['compressed']} 個")
+    print(f"原文 {format_size(stats['raw_bytes'])}，實際儲存 {format_size(stats['stored_bytes'])} "
+          f"(壓縮率 {ratio:.1%})")
+
+
+def text_stats(conn, args):
+    stats = database.get_text_storage_stats(conn)
+    if stats is None:
+        return 1
+    print_text_stats(stats)
+    print(f"資料庫檔案 {format_size(database_file_size(args.db))}")
+    return 0
+
+
+def compress_texts(conn, args):
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size_before = database_file_size(args.db)
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+    compressed = database.compress_requirement_texts(conn, args.threshold)
+    if compressed is None:
+        return 1
+    print(f"本次壓縮 {compressed} 個欄位 (門檻 {args.threshold} 位元組)")
+    if not args.no_vacuum:
+        print("正在以 VACUUM 回收空間...")
+        conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size_after = database_file_size(args.db)
+
+    stats = database.get_text_storage_stats(conn)
+    if stats is not None:
+        print_text_stats(stats)
+    reduction = size_before - size_after
+    percent = reduction / size_before if size_before else 0.0
+    print(f"資料庫檔案 {format_size(size_before)} -> {format_size(size_after)} "
+          f"(減少 {format_size(reduction)}，{percent:.1%})")
+    if free_before and not args.no_vacuum:
+        # 壓縮前就已存在的空白頁 (例如刪除資料或遷移留下的) 也會被 VACUUM 一併回收
+        print(f"  其中 {format_size(free_before)} 為壓縮前已存在的空白頁")
+    return 0
+
+
+def rebuild_search(conn, args):
+    start = time.perf_counter()
+    counts = database.rebuild_search_index(conn)
+    if counts is None:
+        return 1
+    print(f"已重建全文索引：需求單本體 {counts[0]} 份，完成說明 {counts[1]} 筆 "
+          f"({time.perf_counter() - start:.1f} 秒)")
+    return 0
+
+
+COMMANDS = {
+    "text-stats": text_stats,
+    "compress-texts": compress_texts,
+    "rebuild-search": rebuild_search,
+}
+
+# 會寫入資料庫的命令，執行前先升級資料庫結構；其他命令只讀取，不改變使用者的資料庫
+MIGRATING_COMMANDS = {"compress-texts", "rebuild-search"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求管理系統 - 資料庫維護")
+    parser.add_argument("command", choices=sorted(COMMANDS), help="要執行的維護命令")
+    parser.add_argument("--db", default=database.DB_PATH, help="資料庫檔案路徑 (預設: %(default)s)")
+    parser.add_argument("--threshold", type=int, default=database.TEXT_COMPRESSION_THRESHOLD,
+                        help="超過此大小 (UTF-8 位元組) 的文字才壓縮 (預設: %(default)s)")
+    parser.add_argument("--no-vacuum", action="store_true", help="壓縮後不執行 VACUUM")
+    args = parser.parse_args(argv)
+    args.db = os.path.abspath(args.db)
+
+    if not os.path.exists(args.db):
+        print(f"找不到資料庫檔案: {args.db}")
+        return 1
+    conn = database.open_connection(args.db)
+    try:
+        if args.command in MIGRATING_COMMANDS:
+            database.create_tables(conn)
+        else:
+            version = database.get_schema_version(conn)
+            if version != database.SCHEMA_VERSION:
+                print(f"資料庫結構版本為 {version}，此命令需要版本 {database.SCHEMA_VERSION}；"
+                      f"請先啟動程式升級資料庫")
+                return 1
+        return COMMANDS[args.command](conn, args)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
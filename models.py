@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
+from typing import NamedTuple, Optional
 
 @dataclass
 class User:
@@ -9,16 +10,81 @@ class User:
     email: str
     role: str
 
-@dataclass
-class Requirement:
+# 狀態與緊急程度的顯示文字 (資料庫中以整數代碼儲存，row factory 解碼為下列名稱)
+STATUS_TEXT = {
+    'not_dispatched': '未發派',
+    'pending': '未完成',
+    'reviewing': '待審核',
+    'completed': '已完成',
+    'invalid': '已失效',
+    'cancelled': '已取消',
+}
+
+PRIORITY_TEXT = {
+    'normal': '普通',
+    'urgent': '緊急',
+}
+
+def status_display_text(status):
+    """狀態名稱的顯示文字；未知的狀態原樣顯示"""
+    return STATUS_TEXT.get(status, status)
+
+def priority_display_text(priority):
+    """緊急程度的顯示文字"""
+    return PRIORITY_TEXT['urgent'] if priority == 'urgent' else PRIORITY_TEXT['normal']
+
+# 需求單模型以 NamedTuple 儲存：沒有 __dict__，每筆的記憶體與一般 tuple 相同，
+# 可以用屬性名稱取值，也可以放進查詢快取 (不可變)。
+# 由 database 模組的 row factory 產生，時間欄位已解析為 datetime。
+
+class RequirementSummary(NamedTuple):
+    """需求單列表的一列 (列表查詢只讀取畫面需要的欄位)"""
+    id: int
+    title: str
+    status: str
+    priority: str
+    created_at: datetime
+    assigner_name: str
+    assignee_name: str
+    scheduled_time: Optional[datetime]  # 預約發派時間，None表示立即發派
+    deleted_at: Optional[datetime]
+
+    @property
+    def status_text(self):
+        return status_display_text(self.status)
+
+    @property
+    def priority_text(self):
+        return priority_display_text(self.priority)
+
+class Requirement(NamedTuple):
+    """單一需求單的完整資料 (詳情視窗使用)"""
     id: int
     title: str
     description: str
-    assigner_id: int
-    assignee_id: int
     status: str
     priority: str
     created_at: datetime
-    scheduled_time: datetime = None  # 預約發派時間，None表示立即發派 
-    comment: str = None  # 員工提交的完成情況說明
-    completed_at: datetime = None  # 員工提交完成的時間 
\ No newline at end of file
+    assigner_name: str
+    assigner_id: int
+    assignee_name: str
+    assignee_id: int
+    scheduled_time: Optional[datetime] = None  # 預約發派時間，None表示立即發派
+    comment: Optional[str] = None  # 員工提交的完成情況說明
+    completed_at: Optional[datetime] = None  # 員工提交完成的時間
+    attachment_path: Optional[str] = None
+    deleted_at: Optional[datetime] = None
+
+    @property
+    def status_text(self):
+        return status_display_text(self.status)
+
+    @property
+    def priority_text(self):
+        return priority_display_text(self.priority)
+
+class RequirementSearchResult(NamedTuple):
+    """全文搜尋的一筆結果"""
+    requirement: RequirementSummary
+    snippet: str  # 命中處前後的文字，命中的詞以標記括起
+    score: float  # bm25 相關程度，越小越相關
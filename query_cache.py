@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+
+
+class QueryCache:
+    """查詢結果的 LRU 快取 (可跨線程使用)
+
+    每筆快取以「查詢名稱 + 參數」為鍵，並記錄：
+    - tags: 這筆結果依賴的資料範圍，例如 ('assigner', 管理員ID)；寫入時以
+      invalidate(tags) 只清除受影響的結果
+    - version: 存入時的資料版本 (變更計數器)；讀取時版本不同就視為過期，
+      因此其他程序寫入的資料也不會讀到舊結果
+
+    記憶體以筆數上限 (max_entries) 與總列數上限 (max_rows) 限制，超過時淘汰
+    最久未使用的結果；單一結果超過 max_rows 時不放入快取。
+    """
+
+    def __init__(self, max_entries=256, max_rows=20000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        # key -> (value, weight, tags, version)，順序即使用先後
+        self._entries = OrderedDict()
+        # tag -> 依賴該範圍的 key 集合
+        self._tag_keys = {}
+        # tag -> 被清除的次數；用來丟棄查詢期間已被寫入影響的結果
+        self._generations = {}
+        self._epoch = 0
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        """讀取快取，回傳 (是否命中, 結果)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[3] != version:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def snapshot(self, tags):
+        """在執行查詢前取得範圍的狀態，交給 put() 判斷查詢期間是否有寫入"""
+        with self._lock:
+            return self._snapshot(tags)
+
+    def put(self, key, value, tags, version, token):
+        """存入查詢結果；查詢期間範圍已被清除過時不存入，回傳是否存入"""
+        weight = len(value) if isinstance(value, list) else 1
+        if weight > self.max_rows:
+            return False
+        with self._lock:
+            if token != self._snapshot(tags):
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, weight, tuple(tags), version)
+            self._rows += weight
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate(self, tags):
+        """清除依賴任一範圍的快取"""
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in self._tag_keys.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        """清除全部快取 (統計數字保留)"""
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._tag_keys.clear()
+            self._generations.clear()
+            self._rows = 0
+
+    def stats(self):
+        """回傳命中、未命中等統計數字"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'rows': self._rows,
+            }
+
+    def _snapshot(self, tags):
+        return (self._epoch, tuple(self._generations.get(tag, 0) for tag in tags))
+
+    def _remove(self, key):
+        """移除一筆快取 (呼叫時需持有 self._lock)"""
+        _, weight, tags, _ = self._entries.pop(key)
+        self._rows -= weight
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
@@ -1,13 +1,21 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import shutil
-from database import (create_connection, get_all_staff, create_requirement, 
+from database import (create_connection, release_connection, create_requirement,
+                    create_requirements_bulk,
                     get_user_requirements, get_admin_dispatched_requirements,
                     get_admin_scheduled_requirements, dispatch_scheduled_requirements,
                     cancel_scheduled_requirement, submit_requirement, approve_requirement,
-                    reject_requirement, invalidate_requirement, get_admin_requirements_by_staff,
-                    get_admin_scheduled_by_staff, delete_requirement, restore_requirement,
-                    get_deleted_requirements)
+                    reject_requirement, invalidate_requirement,
+                    delete_requirement, restore_requirement,
+                    get_deleted_requirements, get_requirement_by_id, next_page_cursor,
+                    get_change_version, count_user_requirements,
+                    count_admin_dispatched_requirements, count_deleted_requirements,
+                    search_requirements)
+from db_worker import DatabaseWorker
+from models import priority_display_text
+from virtual_list import VirtualTreeview
+from staff_directory import get_staff_directory, ALL_STAFF_LABEL
 import datetime
 import threading
 import time
@@ -16,6 +24,26 @@ import os
 
 class RequirementManager:
     """需求單管理類"""
+
+    # 列表每次向資料庫讀取的筆數，捲動到底部時再載入下一頁
+    PAGE_SIZE = 100
+    # 篩選條件或標籤頁變更後，等待這段時間 (毫秒) 沒有新的變更才重新載入列表
+    RELOAD_DELAY = 200
+    # 檢查資料變更計數器的間隔 (毫秒)
+    CHANGE_POLL_INTERVAL = 2000
+    # 員工過濾選單每次搜尋顯示的員工數，以及發派清單最多顯示的員工數
+    STAFF_SEARCH_LIMIT = 20
+    DISPATCH_STAFF_LIMIT = 100
+    # 全文搜尋最多顯示的結果數
+    SEARCH_RESULT_LIMIT = 50
+    # 標籤頁名稱 -> 該頁的列表狀態 key
+    TAB_LISTS = {
+        "dispatched": 'admin_dispatched',
+        "reviewing": 'admin_reviewing',
+        "scheduled": 'admin_scheduled',
+        "trash": 'trash',
+        "requirements": 'user',
+    }
     
     def __init__(self, root, current_user):
         """初始化需求單管理界面
@@ -45,15 +73,36 @@ class RequirementManager:
         if self.user_id is None:
             print(f"警告: 無法獲取用戶ID! 用戶對象: {current_user}")
         
-        # 不再保持長期連接，改為每次操作時創建新連接
+        # 連接由 database 模組按線程維護，這裡不直接持有
         self.conn = None
+        # 列表載入與寫入操作在背景線程執行，避免資料庫忙碌時凍結視窗
+        self.db_worker = DatabaseWorker(root)
         self.admin_frame = None
         self.admin_notebook = None
         self.staff_frame = None
         self.staff_req_treeview = None
+
+        # 程序共用的員工名錄；所有員工選單都由它填入，名錄版本改變時才更新選單
+        self.staff_directory = get_staff_directory()
+        self.staff_listbox = None
+        # [(員工過濾下拉選單, 其 StringVar), ...]
+        self.staff_filter_comboboxes = []
+        self._staff_widgets_version = None
         
         # 追蹤打開的 Toplevel 視窗
         self.open_windows = []
+
+        # 各列表的排序與分頁狀態 (key -> dict)
+        self.list_states = {}
+        # 各 Treeview 目前顯示的列內容 (treeview -> {iid: (values, tags)})
+        self._treeview_rows = {}
+        # 各列表尚未執行的延遲重新載入 (key -> after id)
+        self._reload_after_ids = {}
+        # 目前界面對應的變更計數器 (scope, owner_id) 與最後讀到的版本
+        self.change_scope = None
+        self._data_version = None
+        self._change_poll_id = None
+        self.current_tab = None
         
         # 附件路徑變數 (for dispatch tab)
         self.attachment_path_var = tk.StringVar()
@@ -68,11 +117,11 @@ class RequirementManager:
         # self.start_scheduler()
     
     def get_connection(self):
-        """獲取新的資料庫連接"""
+        """獲取目前線程的資料庫連接"""
         return create_connection()
     
     def execute_with_connection(self, func, *args, **kwargs):
-        """使用新連接執行資料庫操作"""
+        """使用線程連接執行資料庫操作"""
         conn = self.get_connection()
         if not conn:
             return None
@@ -83,10 +132,29 @@ class RequirementManager:
             print(f"資料庫操作錯誤: {e}")
             return None
         finally:
-            try:
-                conn.close()
-            except:
-                pass
+            release_connection(conn)
+
+    def run_in_background(self, func, *args, callback=None, key=None, **kwargs):
+        """在背景線程執行資料庫操作，完成後於主線程呼叫 callback(result)
+
+        同一個 key 有更新的請求時，舊請求的結果會被丟棄。
+        """
+        return self.db_worker.submit(func, *args, callback=callback, key=key, **kwargs)
+
+    def _load_requirement_details(self, req_id, show, not_found_message=None, **scope):
+        """在背景線程以主鍵讀取需求單 (含解壓縮內容與完成說明)，完成後於主線程呼叫 show(requirement)
+
+        Args:
+            scope: assigner_id 或 assignee_id，只能讀取自己發派或被指派的需求單
+        """
+        def on_loaded(requirement):
+            if not requirement:
+                messagebox.showerror("錯誤", not_found_message or f"找不到ID為 {req_id} 的需求單詳情。")
+                return
+            show(requirement)
+
+        self.run_in_background(get_requirement_by_id, req_id, callback=on_loaded,
+                               key='requirement_details', **scope)
     
     def create_toplevel_window(self, title, geometry="600x500"):
         """創建並追蹤 Toplevel 視窗"""
@@ -110,6 +178,311 @@ class RequirementManager:
         
         window.protocol("WM_DELETE_WINDOW", on_window_close)
         return window
+
+    def _bind_paged_treeview(self, key, treeview, scrollbar, sort_columns, loader, sort_by, descending):
+        """讓 Treeview 支援捲動到底部時載入下一頁，以及點擊欄位標題在資料庫端排序
+
+        Args:
+            key: 列表狀態的識別名稱
+            treeview: 要綁定的 Treeview
+            scrollbar: Treeview 的垂直滾動條
+            sort_columns: Treeview 欄位 -> 資料庫排序鍵
+            loader: 載入函式，接受 append 參數
+            sort_by: 預設排序鍵
+            descending: 預設是否遞減排序
+        """
+        state = {
+            'sort_by': sort_by,
+            'descending': descending,
+            'cursor': None,
+            'has_more': False,
+            'loading': False,
+            'treeview': treeview,
+            'sort_columns': sort_columns,
+            'headings': {column: treeview.heading(column, 'text') for column in sort_columns},
+            'loader': loader,
+            # 列表目前內容對應的變更計數器版本，None 表示尚未載入或已過期
+            'loaded_version': None,
+        }
+        self.list_states[key] = state
+
+        def load_more():
+            if state['has_more'] and not state['loading']:
+                state['loading'] = True
+                treeview.after_idle(lambda: loader(append=True))
+
+        def on_yscroll(first, last):
+            scrollbar.set(first, last)
+            if float(last) >= 0.95:
+                load_more()
+
+        treeview.configure(yscrollcommand=on_yscroll)
+        if isinstance(treeview, VirtualTreeview):
+            # 虛擬列表捲動到尚未載入的位置時 (例如直接拖曳捲軸) 補齊資料
+            treeview.need_rows = load_more
+        treeview.tag_configure('loading', foreground='gray')
+        for column, column_sort_key in sort_columns.items():
+            treeview.heading(column, command=lambda k=column_sort_key: self._sort_list(key, k, loader))
+        self._update_sort_headings(key)
+
+    def _sort_list(self, key, sort_by, loader):
+        """點擊欄位標題：同一欄位切換升降冪，不同欄位則從升冪開始"""
+        state = self.list_states[key]
+        if state['sort_by'] == sort_by:
+            state['descending'] = not state['descending']
+        else:
+            state['sort_by'] = sort_by
+            state['descending'] = False
+        self._update_sort_headings(key)
+        loader()
+
+    def _update_sort_headings(self, key):
+        """在目前排序欄位的標題上顯示排序方向"""
+        state = self.list_states[key]
+        for column, column_sort_key in state['sort_columns'].items():
+            text = state['headings'][column]
+            if column_sort_key == state['sort_by']:
+                text += " ▼" if state['descending'] else " ▲"
+            state['treeview'].heading(column, text=text)
+
+    def _fetch_list_page(self, key, func, *args, append=False, callback=None, count_func=None, **kwargs):
+        """在背景線程讀取列表的一頁資料，完成後於主線程以 callback(rows, append) 更新列表
+
+        重新載入第一頁時，尚未完成的舊請求 (包含下一頁) 的結果會被丟棄。
+        count_func 以相同的篩選參數計算總筆數，供虛擬列表的捲軸使用。
+        """
+        state = self.list_states[key]
+        if append and not state['cursor']:
+            # 已經沒有下一頁
+            state['loading'] = False
+            return
+        if not append:
+            state['cursor'] = None
+            state['has_more'] = False
+            state['loaded_version'] = None
+        state['loading'] = True
+        sort_by = state['sort_by']
+        descending = state['descending']
+        treeview = state['treeview']
+        self._show_loading(treeview)
+        change_scope = self.change_scope
+        page_size = self.PAGE_SIZE
+        if isinstance(treeview, VirtualTreeview):
+            # 虛擬列表：重新載入到目前視窗為止，接續載入時一次補齊視窗需要的列
+            needed = treeview.missing_rows() if append else treeview.window_end()
+            page_size = max(page_size, needed)
+        elif not append:
+            # 重新載入時讀回目前已顯示的筆數，比對更新後不會丟失已捲動載入的列
+            page_size = max(page_size, len(self._treeview_rows.get(treeview, ())))
+        page_kwargs = dict(kwargs, sort_by=sort_by, descending=descending,
+                           page_size=page_size, cursor=state['cursor'])
+
+        def load(conn):
+            # 重新載入時先讀取變更計數器，之後的變更會讓版本不同而再次刷新
+            version = None
+            total = None
+            if not append and change_scope:
+                version = get_change_version(conn, *change_scope)
+            if not append and count_func:
+                total = count_func(conn, *args, **kwargs)
+            return version, total, func(conn, *args, **page_kwargs)
+
+        def on_result(result):
+            version, total, rows = result or (None, None, None)
+            rows = rows or []
+            if not append:
+                state['total'] = total
+                state['loaded_version'] = version
+                if version is not None and (self._data_version is None or version > self._data_version):
+                    self._data_version = version
+            # 先更新分頁狀態與列資料，最後才移除載入提示，重繪時才不會依舊的狀態要求下一頁
+            state['cursor'] = next_page_cursor(rows, page_size, sort_by, descending)
+            state['has_more'] = state['cursor'] is not None
+            if isinstance(treeview, VirtualTreeview):
+                treeview.set_total(state.get('total'), state['has_more'])
+            try:
+                if callback:
+                    callback(rows, append)
+            finally:
+                state['loading'] = False
+                self._hide_loading(treeview)
+
+        self.run_in_background(load, callback=on_result, key=key)
+
+    def schedule_reload(self, key, loader):
+        """延遲重新載入列表
+
+        在 RELOAD_DELAY 內連續變更篩選條件時只會執行最後一次，
+        正在執行的舊查詢也會被中斷，只有最後要求的畫面會被計算。
+        """
+        self.cancel_reload(key)
+        state = self.list_states.get(key)
+        if state:
+            state['loading'] = True
+            state['loaded_version'] = None
+            self._show_loading(state['treeview'])
+
+        def run():
+            self._reload_after_ids.pop(key, None)
+            loader()
+
+        self._reload_after_ids[key] = self.root.after(self.RELOAD_DELAY, run)
+
+    def cancel_reload(self, key):
+        """取消列表尚未執行的重新載入，並中斷正在執行的查詢"""
+        after_id = self._reload_after_ids.pop(key, None)
+        if after_id:
+            self.root.after_cancel(after_id)
+        self.db_worker.cancel(key)
+        state = self.list_states.get(key)
+        if state:
+            state['loading'] = False
+            self._hide_loading(state['treeview'])
+
+    def _cancel_other_reloads(self, keep_key=None):
+        """切換畫面時取消其他列表的載入"""
+        for key in list(self.list_states):
+            if key != keep_key:
+                self.cancel_reload(key)
+
+    def is_list_stale(self, key):
+        """判斷列表內容是否落後於最後讀到的變更計數器 (不查詢資料庫)"""
+        state = self.list_states.get(key)
+        if not state:
+            return False
+        return state['loaded_version'] is None or state['loaded_version'] != self._data_version
+
+    def start_change_polling(self, scope, owner_id):
+        """開始定期檢查變更計數器，有變更時只刷新目前顯示的列表"""
+        self.change_scope = (scope, owner_id)
+        self._schedule_change_poll()
+
+    def _schedule_change_poll(self):
+        if self._change_poll_id is None:
+            self._change_poll_id = self.root.after(self.CHANGE_POLL_INTERVAL, self.check_for_changes)
+
+    def check_for_changes(self):
+        """讀取變更計數器 (主鍵查詢)，目前顯示的列表過期時重新載入"""
+        if self._change_poll_id is not None:
+            self.root.after_cancel(self._change_poll_id)
+            self._change_poll_id = None
+        if not self.change_scope:
+            return
+
+        scope = self.change_scope
+
+        def poll(conn):
+            # 管理員介面同時檢查員工名錄 (例如其他用戶端註冊了新員工)
+            if scope[0] == 'assigner':
+                self.staff_directory.refresh(conn)
+            return get_change_version(conn, *scope)
+
+        def on_version(version):
+            self._sync_staff_widgets()
+            if version is not None and (self._data_version is None or version > self._data_version):
+                self._data_version = version
+            key = self.TAB_LISTS.get(self.current_tab)
+            state = self.list_states.get(key)
+            if state and not state['loading'] and self.is_list_stale(key):
+                state['loader']()
+            self._schedule_change_poll()
+
+        self.run_in_background(poll, callback=on_version, key='change_poll')
+
+    def stop_change_polling(self):
+        """停止檢查變更計數器"""
+        if self._change_poll_id is not None:
+            try:
+                self.root.after_cancel(self._change_poll_id)
+            except tk.TclError:
+                pass
+            self._change_poll_id = None
+        self.change_scope = None
+
+    def _reconcile_treeview(self, treeview, rows, append=False):
+        """依需求單ID比對列表內容，只新增、更新、移動或移除有變動的列
+
+        保留既有項目可以維持選取與捲動位置，也避免整個列表重繪。
+
+        Args:
+            treeview: 要更新的 Treeview
+            rows: [(需求單ID, values, tags), ...]，依顯示順序排列
+            append: True 表示接在現有項目之後 (下一頁)，False 表示以 rows 取代全部內容
+        """
+        if isinstance(treeview, VirtualTreeview):
+            # 虛擬列表自行保存全部資料，只重繪可見範圍
+            treeview.set_rows(rows, append)
+            return
+
+        # 上次寫入的 values / tags，用來判斷是否需要更新 (Tk 回傳的值會被轉型，不適合直接比較)
+        snapshot = self._treeview_rows.setdefault(treeview, {})
+        rows = [(str(iid), tuple(values), tuple(tags)) for iid, values, tags in rows]
+
+        if append:
+            start = len(treeview.get_children())
+        else:
+            start = 0
+            wanted = {iid for iid, _, _ in rows}
+            removed = [iid for iid in treeview.get_children() if iid not in wanted]
+            if removed:
+                treeview.delete(*removed)
+                for iid in removed:
+                    snapshot.pop(iid, None)
+
+        current = list(treeview.get_children())
+        for offset, (iid, values, tags) in enumerate(rows):
+            index = start + offset
+            if iid in snapshot and treeview.exists(iid):
+                if snapshot[iid] != (values, tags):
+                    treeview.item(iid, values=values, tags=tags)
+                    snapshot[iid] = (values, tags)
+                if index >= len(current) or current[index] != iid:
+                    treeview.move(iid, "", index)
+                    current.remove(iid)
+                    current.insert(index, iid)
+            else:
+                if treeview.exists(iid):
+                    # 同一ID已由其他程式碼插入，直接覆寫內容
+                    treeview.item(iid, values=values, tags=tags)
+                    treeview.move(iid, "", index)
+                    current.remove(iid)
+                else:
+                    treeview.insert("", index, iid=iid, values=values, tags=tags)
+                current.insert(index, iid)
+                snapshot[iid] = (values, tags)
+
+    def _format_list_time(self, value, fmt="%Y-%m-%d %H:%M"):
+        """將時間格式化為顯示用文字 (預設「年-月-日 時:分」)
+
+        資料層的 row factory 已將時間解析為 datetime；無法解析的原始字串原樣顯示。
+        """
+        if isinstance(value, datetime.datetime):
+            return value.strftime(fmt)
+        return value
+
+    def _show_loading(self, treeview):
+        """在列表末端顯示「載入中」的提示列"""
+        if isinstance(treeview, VirtualTreeview):
+            treeview.set_loading(True)
+            return
+        self._hide_loading(treeview)
+        columns = treeview['columns']
+        values = [""] * len(columns)
+        if len(values) > 1:
+            values[1] = "載入中..."
+        treeview.insert("", tk.END, values=values, tags=('loading',))
+
+    def _hide_loading(self, treeview):
+        """移除「載入中」的提示列"""
+        try:
+            if isinstance(treeview, VirtualTreeview):
+                treeview.set_loading(False)
+                return
+            for item in treeview.tag_has('loading'):
+                treeview.delete(item)
+        except tk.TclError:
+            # 列表已被銷毀 (例如已登出)
+            pass
     
     def setup_admin_interface(self):
         """設置管理員派發需求單介面"""
@@ -182,6 +555,11 @@ class RequirementManager:
         )
         self.btn_profile.pack(pady=5, fill=tk.X)
         
+        # 員工名錄只在程序第一次登入時載入，之後各標籤頁共用；
+        # 在背景線程載入，完成後才填入發派清單與員工過濾選單
+        self.run_in_background(self.staff_directory.ensure_loaded,
+                               callback=lambda loaded: self._sync_staff_widgets(), key='staff_list')
+        
         # 創建各個標籤頁的內容框架
         self.dispatch_tab = ttk.Frame(self.content_frame)
         self.dispatched_tab = ttk.Frame(self.content_frame)
@@ -197,10 +575,14 @@ class RequirementManager:
         self.setup_scheduled_tab(self.scheduled_tab)
         self.setup_trash_tab(self.trash_tab)
         self.setup_profile_tab(self.profile_tab)
+        self._sync_staff_widgets()
         
-        # 預設顯示發派需求單
+        # 預設顯示發派需求單；各列表在切換到該標籤頁時才載入
         self.switch_tab("dispatch")
         
+        # 定期檢查管理員發派的需求單是否有變更 (包含調度器與其他用戶端)
+        self.start_change_polling('assigner', self.user_id)
+        
         return main_container
     
     def switch_tab(self, tab_name):
@@ -213,6 +595,10 @@ class RequirementManager:
         for btn in [self.btn_dispatch, self.btn_dispatched, self.btn_reviewing, self.btn_scheduled, self.btn_trash, self.btn_profile]:
             btn.state(['!pressed'])
         
+        # 只保留目前標籤頁的列表載入，快速切換時不會在背景計算其他列表
+        list_key = self.TAB_LISTS.get(tab_name)
+        self._cancel_other_reloads(list_key)
+        
         # 顯示選中的標籤頁並設置按鈕狀態
         if tab_name == "dispatch":
             self.dispatch_tab.pack(fill=tk.BOTH, expand=True)
@@ -220,23 +606,23 @@ class RequirementManager:
         elif tab_name == "dispatched":
             self.dispatched_tab.pack(fill=tk.BOTH, expand=True)
             self.btn_dispatched.state(['pressed'])
-            self.load_admin_dispatched_requirements()
         elif tab_name == "reviewing":
             self.reviewing_tab.pack(fill=tk.BOTH, expand=True)
             self.btn_reviewing.state(['pressed'])
-            self.load_admin_reviewing_requirements()
         elif tab_name == "scheduled":
             self.scheduled_tab.pack(fill=tk.BOTH, expand=True)
             self.btn_scheduled.state(['pressed'])
-            self.load_admin_scheduled_requirements()
         elif tab_name == "trash":
             self.trash_tab.pack(fill=tk.BOTH, expand=True)
             self.btn_trash.state(['pressed'])
-            self.load_deleted_requirements()
         elif tab_name == "profile":
             self.profile_tab.pack(fill=tk.BOTH, expand=True)
             self.btn_profile.state(['pressed'])
         
+        # 列表內容沒有過期時直接沿用，不重新查詢
+        if list_key and self.is_list_stale(list_key):
+            self.schedule_reload(list_key, self.list_states[list_key]['loader'])
+        
         self.current_tab = tab_name
         
     def setup_dispatch_tab(self, parent):
@@ -246,29 +632,62 @@ class RequirementManager:
         self.admin_frame.pack(fill=tk.BOTH, expand=True)
 
         # 員工選擇標籤
-        ttk.Label(self.admin_frame, text="指派給:").grid(row=0, column=0, sticky=tk.W)
+        ttk.Label(self.admin_frame, text="指派給:").grid(row=0, column=0, sticky=tk.NW)
         
-        # 員工選擇框架（包含下拉選單和刷新按鈕）
+        # 員工選擇框架（包含多選清單和操作按鈕）
         staff_selection_frame = ttk.Frame(self.admin_frame)
         staff_selection_frame.grid(row=0, column=1, sticky=tk.W, pady=5)
         
-        # 員工下拉選單
-        self.staff_var = tk.StringVar()
-        staffs = self.execute_with_connection(get_all_staff) or []
-        self.staff_combobox = ttk.Combobox(
-            staff_selection_frame,
-            textvariable=self.staff_var,
-            values=[f"{staff[1]} (ID:{staff[0]})" for staff in staffs],
+        # 員工多選清單 (可用 Ctrl/Shift 一次選擇多位員工)
+        staff_list_frame = ttk.Frame(staff_selection_frame)
+        staff_list_frame.pack(side=tk.LEFT, padx=(0, 5))
+        
+        # 搜尋框：輸入姓名、帳號或 Email 的任一部分，清單只顯示符合的員工
+        self.dispatch_staff_search_var = tk.StringVar()
+        ttk.Entry(staff_list_frame, textvariable=self.dispatch_staff_search_var).pack(side=tk.TOP, fill=tk.X, pady=(0, 2))
+        self.dispatch_staff_search_var.trace_add("write", lambda *args: self._filter_dispatch_staff_list())
+        self.dispatch_selection_var = tk.StringVar(value="已選擇 0 位員工")
+        ttk.Label(staff_list_frame, textvariable=self.dispatch_selection_var).pack(side=tk.BOTTOM, anchor=tk.W)
+        
+        self.staff_listbox = tk.Listbox(
+            staff_list_frame,
+            selectmode=tk.EXTENDED,
+            exportselection=False,
+            height=5,
             width=30
         )
-        self.staff_combobox.pack(side=tk.LEFT, padx=(0, 5))
+        staff_list_scrollbar = ttk.Scrollbar(staff_list_frame, orient=tk.VERTICAL, command=self.staff_listbox.yview)
+        self.staff_listbox.configure(yscrollcommand=staff_list_scrollbar.set)
+        staff_list_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.staff_listbox.pack(side=tk.LEFT)
+        self.staff_listbox.bind("<<ListboxSelect>>", lambda event: self._on_dispatch_staff_select())
+        
+        # 清單中每一列對應的員工ID，避免從顯示文字反解析 (由 _sync_staff_widgets 填入)
+        self.dispatch_staff_ids = []
+        # 選取的員工ID；搜尋條件改變而不在清單中的員工仍保持選取
+        self.dispatch_selected_ids = set()
+        
+        staff_button_frame = ttk.Frame(staff_selection_frame)
+        staff_button_frame.pack(side=tk.LEFT, anchor=tk.N)
+        
+        ttk.Button(
+            staff_button_frame,
+            text="全選",
+            command=self._select_all_dispatch_staff
+        ).pack(fill=tk.X, pady=(0, 2))
+        
+        ttk.Button(
+            staff_button_frame,
+            text="清除選擇",
+            command=self._clear_dispatch_staff_selection
+        ).pack(fill=tk.X, pady=(0, 2))
         
         # 添加刷新按鈕
         ttk.Button(
-            staff_selection_frame,
+            staff_button_frame,
             text="刷新列表",
             command=self.refresh_staff_list
-        ).pack(side=tk.LEFT)
+        ).pack(fill=tk.X)
 
         # 需求單標題
         ttk.Label(self.admin_frame, text="標題:").grid(row=1, column=0, sticky=tk.W)
@@ -419,11 +838,12 @@ class RequirementManager:
         self.attachment_display_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
         # 派發按鈕 (Adjusted - Row 7, previously Row 6)
-        ttk.Button(
+        self.create_button = ttk.Button(
             self.admin_frame,
             text="派發需求單",
             command=self.create_requirement
-        ).grid(row=7, column=1, pady=10, sticky=tk.E) # Changed row from 6 to 7
+        )
+        self.create_button.grid(row=7, column=1, pady=10, sticky=tk.E) # Changed row from 6 to 7
         
     def setup_dispatched_tab(self, parent):
         """設置已發派需求單標籤頁"""
@@ -461,7 +881,7 @@ class RequirementManager:
                 text=text,
                 value=value,
                 variable=self.status_filter_var,
-                command=self.load_admin_dispatched_requirements
+                command=lambda: self.schedule_reload('admin_dispatched', self.load_admin_dispatched_requirements)
             ).pack(side=tk.LEFT, padx=5)
         
         # 員工過濾
@@ -470,29 +890,27 @@ class RequirementManager:
         
         ttk.Label(staff_filter_frame, text="員工過濾:").pack(side=tk.LEFT, padx=(0, 10))
         
-        # 獲取所有員工
-        staffs = self.execute_with_connection(get_all_staff) or []
-        staff_options = [("全部員工", "all")] + [(staff[1], str(staff[0])) for staff in staffs]
-        
-        # 建立員工過濾下拉選單
-        self.staff_filter_var = tk.StringVar(value="all")
+        # 建立員工過濾下拉選單 (選項由員工名錄填入)
+        self.staff_filter_var = tk.StringVar(value=ALL_STAFF_LABEL)
         self.staff_filter_combobox = ttk.Combobox(
             staff_filter_frame,
             textvariable=self.staff_filter_var,
-            values=[f"{name} ({id})" for name, id in staff_options],
+            values=[ALL_STAFF_LABEL],
             width=20
         )
         self.staff_filter_combobox.pack(side=tk.LEFT, padx=5)
-        self.staff_filter_combobox.current(0)
         
-        # 綁定事件
-        self.staff_filter_combobox.bind("<<ComboboxSelected>>", 
-                                         lambda event: self.load_admin_dispatched_requirements())
+        # 綁定事件 (可直接輸入搜尋，選擇或按 Enter 後才重新載入)
+        self._bind_staff_search(self.staff_filter_combobox, self.staff_filter_var,
+                                lambda: self.schedule_reload('admin_dispatched', self.load_admin_dispatched_requirements))
         
-        # 創建已發派需求單列表
+        # 全文搜尋自己發派的需求單
+        self._create_search_bar(frame, 'assigner_id', self.open_dispatched_details)
+        
+        # 創建已發派需求單列表 (只建立可見範圍的列，支援大量資料)
         columns = ("id", "title", "assignee", "status", "priority", "created_at")
         
-        self.admin_dispatched_treeview = ttk.Treeview(
+        self.admin_dispatched_treeview = VirtualTreeview(
             frame, 
             columns=columns,
             show="headings", 
@@ -520,7 +938,16 @@ class RequirementManager:
         
         # 添加滾動條
         scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.admin_dispatched_treeview.yview)
-        self.admin_dispatched_treeview.configure(yscrollcommand=scrollbar.set)
+        self._bind_paged_treeview(
+            'admin_dispatched', self.admin_dispatched_treeview, scrollbar,
+            {"id": "id", "title": "title", "assignee": "assignee",
+             "status": "status", "priority": "priority", "created_at": "created_at"},
+            self.load_admin_dispatched_requirements, 'created_at', True
+        )
+        # 列的顏色標籤只需設定一次
+        self.admin_dispatched_treeview.tag_configure('reviewing', background='#d4edff')
+        self.admin_dispatched_treeview.tag_configure('completed', background='#e6ffe6')
+        self.admin_dispatched_treeview.tag_configure('invalid', background='#f0f0f0')
         
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.admin_dispatched_treeview.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -532,8 +959,6 @@ class RequirementManager:
             command=self.load_admin_dispatched_requirements
         ).pack(side=tk.BOTTOM, pady=10)
         
-        # 載入數據
-        self.load_admin_dispatched_requirements()
         
     def setup_reviewing_tab(self, parent):
         """設置待審核需求單標籤頁"""
@@ -583,64 +1008,19 @@ class RequirementManager:
         
         # 添加垂直滾動條
         scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.admin_reviewing_treeview.yview)
-        self.admin_reviewing_treeview.configure(yscrollcommand=scrollbar.set)
+        self._bind_paged_treeview(
+            'admin_reviewing', self.admin_reviewing_treeview, scrollbar,
+            {"id": "id", "title": "title", "assignee": "assignee",
+             "priority": "priority", "created_at": "created_at"},
+            self.load_admin_reviewing_requirements, 'created_at', True
+        )
+        # 列的顏色標籤只需設定一次
+        self.admin_reviewing_treeview.tag_configure('urgent', background='#ffecec')
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         # 綁定雙擊事件
         self.admin_reviewing_treeview.bind("<Double-1>", self.show_reviewing_requirement_details)
         
-        # 載入數據
-        self.load_admin_reviewing_requirements()
-        
-    def load_admin_reviewing_requirements(self):
-        """載入管理員待審核的需求單數據"""
-        # 清空現有數據
-        for item in self.admin_reviewing_treeview.get_children():
-            self.admin_reviewing_treeview.delete(item)
-            
-        # 獲取所有已發派的需求單 (這些應包含完整的15個欄位)
-        requirements = self.execute_with_connection(get_admin_dispatched_requirements, self.user_id) or []
-        
-        # 篩選狀態為「待審核」的需求單
-        reviewing_requirements = [req for req in requirements if len(req) == 15 and req[3] == 'reviewing']
-        
-        # 添加數據到表格
-        for req in reviewing_requirements:
-            try:
-                # 解包完整的15個欄位
-                (req_id, title, description, status, priority, created_at, 
-                 assigner_name, assigner_id, assignee_name, assignee_id,
-                 scheduled_time, comment, completed_at, attachment_path, deleted_at) = req
-                
-                # 格式化緊急程度
-                priority_text = "緊急" if priority == "urgent" else "普通"
-                
-                # 格式化時間
-                date_text = created_at # Default
-                if isinstance(created_at, str):
-                    try:
-                        date_obj = datetime.datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                        date_text = date_obj.strftime("%Y-%m-%d %H:%M")
-                    except ValueError:
-                        pass # date_text remains original created_at
-                
-                # Treeview columns: ("id", "title", "assignee", "priority", "created_at")
-                item_id_val = self.admin_reviewing_treeview.insert(
-                    "", tk.END, 
-                    values=(req_id, title, assignee_name, priority_text, date_text)
-                )
-                
-                # 根據優先級設置行顏色
-                if priority == 'urgent':
-                    self.admin_reviewing_treeview.item(item_id_val, tags=('urgent',))
-                
-            except Exception as e:
-                print(f"處理待審核需求單時發生錯誤: {e}, 數據: {req}")
-                import traceback
-                print(traceback.format_exc())
-                    
-        # 設置標籤顏色
-        self.admin_reviewing_treeview.tag_configure('urgent', background='#ffecec')
         
     def setup_scheduled_tab(self, parent):
         """設置預約發派需求單標籤頁"""
@@ -661,24 +1041,19 @@ class RequirementManager:
         
         ttk.Label(staff_filter_frame, text="員工過濾:").pack(side=tk.LEFT, padx=(0, 10))
         
-        # 獲取所有員工
-        staffs = self.execute_with_connection(get_all_staff) or []
-        staff_options = [("全部員工", "all")] + [(staff[1], str(staff[0])) for staff in staffs]
-        
-        # 建立員工過濾下拉選單
-        self.scheduled_staff_filter_var = tk.StringVar(value="all")
+        # 建立員工過濾下拉選單 (選項由員工名錄填入)
+        self.scheduled_staff_filter_var = tk.StringVar(value=ALL_STAFF_LABEL)
         self.scheduled_staff_filter_combobox = ttk.Combobox(
             staff_filter_frame,
             textvariable=self.scheduled_staff_filter_var,
-            values=[f"{name} ({id})" for name, id in staff_options],
+            values=[ALL_STAFF_LABEL],
             width=20
         )
         self.scheduled_staff_filter_combobox.pack(side=tk.LEFT, padx=5)
-        self.scheduled_staff_filter_combobox.current(0)
         
-        # 綁定事件
-        self.scheduled_staff_filter_combobox.bind("<<ComboboxSelected>>", 
-                                          lambda event: self.load_admin_scheduled_requirements())
+        # 綁定事件 (可直接輸入搜尋，選擇或按 Enter 後才重新載入)
+        self._bind_staff_search(self.scheduled_staff_filter_combobox, self.scheduled_staff_filter_var,
+                                lambda: self.schedule_reload('admin_scheduled', self.load_admin_scheduled_requirements))
         
         # 創建預約發派需求單列表
         columns = ("id", "title", "assignee", "priority", "scheduled_time")
@@ -709,7 +1084,12 @@ class RequirementManager:
         
         # 添加滾動條
         scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.admin_scheduled_treeview.yview)
-        self.admin_scheduled_treeview.configure(yscrollcommand=scrollbar.set)
+        self._bind_paged_treeview(
+            'admin_scheduled', self.admin_scheduled_treeview, scrollbar,
+            {"id": "id", "title": "title", "assignee": "assignee",
+             "priority": "priority", "scheduled_time": "scheduled_time"},
+            self.load_admin_scheduled_requirements, 'scheduled_time', False
+        )
         
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.admin_scheduled_treeview.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -732,8 +1112,6 @@ class RequirementManager:
             command=self.load_admin_scheduled_requirements
         ).pack(side=tk.RIGHT, padx=5)
         
-        # 載入數據
-        self.load_admin_scheduled_requirements()
 
     def setup_staff_interface(self):
         """設置員工查看需求單介面"""
@@ -781,6 +1159,9 @@ class RequirementManager:
         # 預設顯示需求單列表
         self.switch_staff_tab("requirements")
         
+        # 定期檢查收到的需求單是否有變更，有新需求單時自動刷新
+        self.start_change_polling('assignee', self.user_id)
+        
         return main_container
     
     def switch_staff_tab(self, tab_name):
@@ -797,10 +1178,12 @@ class RequirementManager:
         if tab_name == "requirements":
             self.requirements_tab.pack(fill=tk.BOTH, expand=True)
             self.btn_requirements.state(['pressed'])
-            self.load_user_requirements()
+            if self.is_list_stale('user'):
+                self.schedule_reload('user', self.load_user_requirements)
         elif tab_name == "profile":
             self.staff_profile_tab.pack(fill=tk.BOTH, expand=True)
             self.btn_staff_profile.state(['pressed'])
+            self.cancel_reload('user')
         
         self.current_tab = tab_name
     
@@ -832,12 +1215,15 @@ class RequirementManager:
                 text=text,
                 value=value,
                 variable=self.staff_status_filter_var,
-                command=self.load_user_requirements
+                command=lambda: self.schedule_reload('user', self.load_user_requirements)
             ).pack(side=tk.LEFT, padx=5)
         
-        # 創建需求單列表
+        # 全文搜尋發派給自己的需求單
+        self._create_search_bar(self.staff_frame, 'assignee_id', self.open_requirement_details)
+        
+        # 創建需求單列表 (只建立可見範圍的列，支援大量資料)
         columns = ("id", "title", "assigner", "status", "priority", "date")
-        self.staff_req_treeview = ttk.Treeview(
+        self.staff_req_treeview = VirtualTreeview(
             self.staff_frame, 
             columns=columns,
             show="headings",
@@ -862,15 +1248,21 @@ class RequirementManager:
         
         # 添加滾動條
         scrollbar = ttk.Scrollbar(self.staff_frame, orient=tk.VERTICAL, command=self.staff_req_treeview.yview)
-        self.staff_req_treeview.configure(yscrollcommand=scrollbar.set)
+        self._bind_paged_treeview(
+            'user', self.staff_req_treeview, scrollbar,
+            {"id": "id", "title": "title", "assigner": "assigner",
+             "status": "status", "priority": "priority", "date": "created_at"},
+            self.load_user_requirements, 'created_at', True
+        )
+        # 列的顏色標籤只需設定一次
+        self.staff_req_treeview.tag_configure('reviewing', background='#d4edff')
+        self.staff_req_treeview.tag_configure('empty', foreground='gray')
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.staff_req_treeview.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # 綁定雙擊事件以查看詳情
         self.staff_req_treeview.bind("<Double-1>", self.show_requirement_details)
         
-        # 載入需求單數據
-        self.load_user_requirements()
         
         # 按鈕框架
         button_frame = ttk.Frame(self.staff_frame)
@@ -890,69 +1282,39 @@ class RequirementManager:
             command=self.load_user_requirements
         ).pack(side=tk.RIGHT, padx=5)
     
-    def load_user_requirements(self):
-        """載入用戶收到的需求單到列表"""
-        # 清空現有數據
-        for item in self.staff_req_treeview.get_children():
-            self.staff_req_treeview.delete(item)
-        
+    def load_user_requirements(self, append=False):
+        """載入用戶收到的需求單到列表
+
+        Args:
+            append: True 表示接續載入下一頁，False 表示重新載入第一頁
+        """
         # 檢查用戶ID是否有效
         if self.user_id is None:
             messagebox.showerror("錯誤", "無法獲取用戶ID，請重新登錄")
             return
             
-        # 獲取數據
-        requirements = self.execute_with_connection(get_user_requirements, self.user_id) or []
-        
-        # 獲取狀態過濾條件
+        # 獲取狀態過濾條件，並直接在資料庫中篩選
         status_filter = self.staff_status_filter_var.get()
+        statuses = None if status_filter == "all" else (status_filter,)
         
-        if not requirements:
-            empty_id = self.staff_req_treeview.insert("", tk.END, values=("", "目前沒有收到任何需求單", "", "", "", ""))
-            self.staff_req_treeview.item(empty_id, tags=('empty',))
-            self.staff_req_treeview.tag_configure('empty', foreground='gray')
-            return
-        
-        # 添加數據到表格
+        # 在背景線程獲取數據，完成後再填入表格
+        self._fetch_list_page('user', get_user_requirements, self.user_id,
+                              statuses=statuses, append=append, count_func=count_user_requirements,
+                              callback=self._render_user_requirements)
+
+    def _render_user_requirements(self, requirements, append):
+        """將查詢到的需求單更新到員工的需求單列表"""
+        rows = []
         for req in requirements:
-            if len(req) < 15:
-                print(f"警告: 員工需求單資料不完整，跳過: {req}")
-                continue
-
-            # Unpack all 15 fields from _get_requirement_select_fields
-            (req_id, title, description, status, priority, created_at, 
-             assigner_name, assigner_id, 
-             assignee_name, assignee_id, 
-             scheduled_time, comment, completed_at, attachment_path, deleted_at) = req
-            
-            if status_filter != "all" and status != status_filter:
-                continue
-                
-            status_text = self.get_status_display_text(status)
-            priority_text = "緊急" if priority == "urgent" else "普通"
-            
-            if isinstance(created_at, str):
-                try:
-                    date_obj = datetime.datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                    date_text = date_obj.strftime("%Y-%m-%d %H:%M")
-                except ValueError:
-                    date_text = created_at
-            else:
-                date_text = created_at
-                
-            item_id = self.staff_req_treeview.insert(
-                "", tk.END, 
-                values=(req_id, title, assigner_name, status_text, priority_text, date_text)
-            )
-            
-            if status == 'reviewing':
-                self.staff_req_treeview.item(item_id, tags=('reviewing',))
-            elif status == 'completed':
-                self.staff_req_treeview.item(item_id, tags=('completed',))
-            elif status == 'invalid':
-                self.staff_req_treeview.item(item_id, tags=('invalid',))
-                
-        self.staff_req_treeview.tag_configure('reviewing', background='#d4edff')
+            # 列表查詢只回傳畫面需要的精簡欄位 (RequirementSummary)
+            status = req.status
+            date_text = self._format_list_time(req.created_at)
+            tags = (status,) if status in ('reviewing', 'completed', 'invalid') else ()
+            rows.append((req.id, (req.id, req.title, req.assigner_name, req.status_text, req.priority_text, date_text), tags))
+        
+        if not rows and not append:
+            rows.append(("empty", ("", "目前沒有收到任何需求單", "", "", "", ""), ('empty',)))
+        self._reconcile_treeview(self.staff_req_treeview, rows, append)
 
     def show_requirement_details(self, event):
         """顯示需求單詳情"""
@@ -962,51 +1324,32 @@ class RequirementManager:
             return
             
         item = self.staff_req_treeview.item(selected_item)
-        req_id = item['values'][0]
-        
-        # 獲取需求單詳情
-        # IMPORTANT: Ensure get_user_requirements returns all fields from _get_requirement_select_fields
-        # Fields: id, title, desc, status, priority, created_at, 
-        #         assigner_name, assigner_id, assignee_name, assignee_id, 
-        #         scheduled_time, comment, completed_at, attachment_path, deleted_at
-        requirements_data = self.execute_with_connection(get_user_requirements, self.user_id) or []
-        requirement = None
-        
-        for req_data in requirements_data:
-            if req_data[0] == req_id: # Compare by ID
-                requirement = req_data
-                break
-        
-        if not requirement:
-            messagebox.showerror("錯誤", f"找不到ID為 {req_id} 的需求單詳情。")
-            return
+        self.open_requirement_details(item['values'][0])
 
-        if len(requirement) < 14: # Should be 15 fields, attachment_path is 13, deleted_at is 14
-            messagebox.showerror("錯誤", "需求單資料不完整，無法顯示詳情 (欄位數量不足)。")
-            return
-            
-        # Unpack all 15 fields
-        (req_id, title, description, status, priority, created_at, 
-         assigner_name, assigner_id, assignee_name, assignee_id, 
-         scheduled_time, comment, completed_at, attachment_path, deleted_at) = requirement
-        
-        detail_window = self.create_toplevel_window(f"需求單詳情 #{req_id}", "550x600") # Adjusted size for potential attachment
+    def open_requirement_details(self, req_id):
+        """開啟員工的需求單詳情視窗 (列表與搜尋結果共用)"""
+        # 獲取需求單詳情 (只能取得指派給自己的需求單)
+        self._load_requirement_details(req_id, self._show_requirement_details_window, assignee_id=self.user_id)
+
+    def _show_requirement_details_window(self, requirement):
+        """以讀取到的需求單建立員工的詳情視窗"""
+        detail_window = self.create_toplevel_window(f"需求單詳情 #{requirement.id}", "550x600") # Adjusted size for potential attachment
         
         # 標題
         ttk.Label(
             detail_window, 
-            text=f"標題: {title}", 
+            text=f"標題: {requirement.title}", 
             font=('Arial', 12, 'bold')
         ).pack(pady=(20, 10), padx=20, anchor=tk.W)
         
         # 發派人
         ttk.Label(
             detail_window, 
-            text=f"發派人: {assigner_name}"
+            text=f"發派人: {requirement.assigner_name}"
         ).pack(pady=5, padx=20, anchor=tk.W)
         
         # 狀態
-        status_text = self.get_status_display_text(status)
+        status_text = requirement.status_text
         status_label = ttk.Label(
             detail_window, 
             text=f"狀態: {status_text}"
@@ -1014,34 +1357,27 @@ class RequirementManager:
         status_label.pack(pady=5, padx=20, anchor=tk.W)
         
         # 根據狀態設置顏色
-        if status == 'reviewing':
+        if requirement.status == 'reviewing':
             status_label.configure(foreground="blue")
-        elif status == 'completed':
+        elif requirement.status == 'completed':
             status_label.configure(foreground="green")
-        elif status == 'invalid':
+        elif requirement.status == 'invalid':
             status_label.configure(foreground="gray")
         
         # 緊急程度
-        priority_text = "緊急" if priority == "urgent" else "普通"
+        priority_text = requirement.priority_text
         priority_label = ttk.Label(
             detail_window, 
             text=f"緊急程度: {priority_text}"
         )
         priority_label.pack(pady=5, padx=20, anchor=tk.W)
         
-        if priority == "urgent":
+        if requirement.priority == "urgent":
             priority_label.configure(foreground="red")
         
         # 發派時間（實際發派時間）
-        if isinstance(created_at, str):
-            try:
-                date_obj = datetime.datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                date_text = date_obj.strftime("%Y-%m-%d %H:%M")
-            except ValueError:
-                date_text = created_at
-        else:
-            date_text = created_at
-            
+        date_text = self._format_list_time(requirement.created_at)
+
         ttk.Label(
             detail_window, 
             text=f"實際發派時間: {date_text}",
@@ -1049,16 +1385,8 @@ class RequirementManager:
         ).pack(pady=5, padx=20, anchor=tk.W)
         
         # 如果有預約時間，顯示預約時間
-        if scheduled_time:
-            if isinstance(scheduled_time, str):
-                try:
-                    date_obj = datetime.datetime.strptime(scheduled_time, "%Y-%m-%d %H:%M:%S")
-                    scheduled_text = date_obj.strftime("%Y-%m-%d %H:%M")
-                except ValueError:
-                    scheduled_text = scheduled_time
-            else:
-                scheduled_text = scheduled_time
-                
+        if requirement.scheduled_time:
+            scheduled_text = self._format_list_time(requirement.scheduled_time)
             ttk.Label(
                 detail_window, 
                 text=f"預約發派時間: {scheduled_text}",
@@ -1077,7 +1405,7 @@ class RequirementManager:
         content_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
         
         content_text = tk.Text(content_frame, wrap=tk.WORD, height=8)
-        content_text.insert(tk.END, description)
+        content_text.insert(tk.END, requirement.description)
         content_text.config(state=tk.DISABLED)  # 設為只讀
         
         scrollbar = ttk.Scrollbar(content_frame, command=content_text.yview)
@@ -1087,7 +1415,7 @@ class RequirementManager:
         content_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # 如果有完成說明，顯示完成說明
-        if comment and (status == 'reviewing' or status == 'completed'):
+        if requirement.comment and (requirement.status == 'reviewing' or requirement.status == 'completed'):
             ttk.Label(
                 detail_window, 
                 text="完成情況:", 
@@ -1098,7 +1426,7 @@ class RequirementManager:
             comment_frame.pack(fill=tk.X, padx=20, pady=5)
             
             comment_text_widget = tk.Text(comment_frame, wrap=tk.WORD, height=4) # Renamed to avoid conflict
-            comment_text_widget.insert(tk.END, comment)
+            comment_text_widget.insert(tk.END, requirement.comment)
             comment_text_widget.config(state=tk.DISABLED)  # 設為只讀
             
             comment_scroll = ttk.Scrollbar(comment_frame, command=comment_text_widget.yview)
@@ -1108,17 +1436,17 @@ class RequirementManager:
             comment_text_widget.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
         # 顯示附件 (New)
-        if attachment_path:
+        if requirement.attachment_path:
             ttk.Label(detail_window, text="附件:", font=('Arial', 10, 'bold')).pack(pady=(10,0), padx=20, anchor=tk.W)
             
             attachment_display_frame = ttk.Frame(detail_window)
             attachment_display_frame.pack(fill=tk.X, padx=20, pady=(0,5))
 
-            filename = os.path.basename(attachment_path)
+            filename = os.path.basename(requirement.attachment_path)
             attach_label = ttk.Label(attachment_display_frame, text=filename, foreground="blue", cursor="hand2")
             attach_label.pack(side=tk.LEFT, padx=(0,10))
             # Pass the relative path from DB directly to _open_attachment
-            attach_label.bind("<Button-1>", lambda e, ap=attachment_path: self._open_attachment(ap, detail_window))
+            attach_label.bind("<Button-1>", lambda e, ap=requirement.attachment_path: self._open_attachment(ap, detail_window))
         
         # 按鈕框架
         button_frame = ttk.Frame(detail_window)
@@ -1129,7 +1457,7 @@ class RequirementManager:
         left_button_frame.pack(side=tk.LEFT, fill=tk.X, padx=20)
         
         # 如果需求單狀態是「未完成」，顯示提交按鈕
-        if status == 'pending':
+        if requirement.status == 'pending':
             ttk.Button(
                 left_button_frame, 
                 text="提交完成情況", 
@@ -1160,18 +1488,186 @@ class RequirementManager:
             self.selected_attachment_source_path = None
             self.attachment_path_var.set("")
 
-    def create_requirement(self):
-        """建立新的需求單"""
-        staff_str = self.staff_combobox.get()
-        if not staff_str:
-            messagebox.showerror("錯誤", "請選擇要指派的員工")
+    def _fill_dispatch_staff_list(self, staffs):
+        """填入發派用的員工多選清單，並恢復先前選取的員工"""
+        self.staff_listbox.delete(0, tk.END)
+        self.dispatch_staff_ids = []
+        for staff_id, staff_name in staffs:
+            self.staff_listbox.insert(tk.END, self.staff_directory.format_label(staff_id, staff_name))
+            self.dispatch_staff_ids.append(staff_id)
+            if staff_id in self.dispatch_selected_ids:
+                self.staff_listbox.selection_set(tk.END)
+
+    def _filter_dispatch_staff_list(self):
+        """依搜尋框內容只列出最符合的員工"""
+        query = self.dispatch_staff_search_var.get()
+        self._fill_dispatch_staff_list(self.staff_directory.search(query, self.DISPATCH_STAFF_LIMIT))
+
+    def _on_dispatch_staff_select(self):
+        """清單選取改變時更新選取的員工 (不在清單中的員工維持原狀)"""
+        selected = {self.dispatch_staff_ids[index] for index in self.staff_listbox.curselection()}
+        self.dispatch_selected_ids = (self.dispatch_selected_ids - set(self.dispatch_staff_ids)) | selected
+        self.dispatch_selection_var.set(f"已選擇 {len(self.get_selected_dispatch_staff_ids())} 位員工")
+
+    def _select_all_dispatch_staff(self):
+        """選取清單中目前列出的所有員工"""
+        self.staff_listbox.selection_set(0, tk.END)
+        self._on_dispatch_staff_select()
+
+    def _clear_dispatch_staff_selection(self):
+        """清除所有選取的員工 (包含不在目前清單中的)"""
+        self.dispatch_selected_ids = set()
+        self.staff_listbox.selection_clear(0, tk.END)
+        self._on_dispatch_staff_select()
+
+    def _bind_staff_search(self, combobox, variable, on_change):
+        """讓員工過濾下拉選單可以直接輸入姓名、帳號或 Email 搜尋
+
+        每次按鍵只把最符合的員工放進選項，選項數量不隨員工人數增加；
+        選擇選項或按 Enter 後才呼叫 on_change() 重新載入列表。
+        """
+        self.staff_filter_comboboxes.append((combobox, variable))
+
+        def on_key(event):
+            if event.keysym in ('Return', 'KP_Enter', 'Up', 'Down', 'Escape', 'Tab'):
+                return
+            self._update_staff_search_values(combobox, variable)
+
+        def on_enter(event):
+            text = variable.get()
+            if text != ALL_STAFF_LABEL and self.staff_directory.id_for_label(text) is None:
+                # 輸入的是搜尋文字時選擇最符合的員工；空白或找不到時顯示全部員工
+                matches = self.staff_directory.search_labels(text, 1) if text.strip() else []
+                variable.set(matches[0] if matches else ALL_STAFF_LABEL)
+            self._update_staff_search_values(combobox, variable)
+            on_change()
+
+        combobox.bind("<KeyRelease>", on_key, add="+")
+        combobox.bind("<Return>", on_enter, add="+")
+        combobox.bind("<KP_Enter>", on_enter, add="+")
+        combobox.bind("<<ComboboxSelected>>", lambda event: on_change(), add="+")
+
+    def _update_staff_search_values(self, combobox, variable):
+        """以目前輸入的文字搜尋員工，更新下拉選單的選項"""
+        text = variable.get()
+        # 已選定員工或全部員工時不當作搜尋文字
+        if text == ALL_STAFF_LABEL or self.staff_directory.id_for_label(text) is not None:
+            text = ""
+        combobox.configure(values=[ALL_STAFF_LABEL] + self.staff_directory.search_labels(text, self.STAFF_SEARCH_LIMIT))
+
+    def _create_search_bar(self, parent, scope_key, open_details):
+        """在列表上方建立全文搜尋框 (標題、內容與完成說明)
+
+        Args:
+            parent: 搜尋框所在的框架
+            scope_key: 搜尋範圍，'assigner_id' (自己發派的) 或 'assignee_id' (發派給自己的)
+            open_details: 以需求單ID開啟詳情視窗的函式
+        """
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(search_frame, text="全文搜尋:").pack(side=tk.LEFT, padx=(0, 10))
+
+        search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=search_var, width=30)
+        search_entry.pack(side=tk.LEFT, padx=5)
+
+        def search(event=None):
+            self.run_requirement_search(search_var.get(), scope_key, open_details)
+
+        search_entry.bind("<Return>", search)
+        search_entry.bind("<KP_Enter>", search)
+        ttk.Button(search_frame, text="搜尋", command=search).pack(side=tk.LEFT, padx=5)
+
+    def run_requirement_search(self, query, scope_key, open_details):
+        """在背景線程執行全文搜尋，完成後以視窗顯示結果"""
+        query = query.strip()
+        if not query:
+            return
+        if self.user_id is None:
+            messagebox.showerror("錯誤", "無法獲取用戶ID，請重新登錄")
             return
 
-        # 從下拉框中提取員工ID
-        try:
-            staff_id = int(staff_str.split("ID:")[1].rstrip(")"))
-        except (IndexError, ValueError) as e:
-            messagebox.showerror("錯誤", f"提取員工ID時發生錯誤: {e}")
+        def on_result(results):
+            if results is None:
+                messagebox.showerror("錯誤", "搜尋需求單失敗")
+                return
+            self.show_search_results(query, results, scope_key, open_details)
+
+        # 同一個範圍的新搜尋會取代尚未完成的舊搜尋
+        self.run_in_background(search_requirements, query, limit=self.SEARCH_RESULT_LIMIT,
+                               highlight=('【', '】'), callback=on_result, key=f'search_{scope_key}',
+                               **{scope_key: self.user_id})
+
+    def show_search_results(self, query, results, scope_key, open_details):
+        """以視窗顯示全文搜尋結果，雙擊開啟需求單詳情"""
+        window = self.create_toplevel_window(f"搜尋結果: {query}", "850x450")
+
+        if not results:
+            summary = f"找不到符合「{query}」的需求單"
+        elif results[0].score is None:
+            # 符合的需求單太多時資料庫不計算相關程度，只回傳最新的結果
+            summary = f"符合「{query}」的需求單很多，以下為最新的 {len(results)} 筆"
+        else:
+            summary = f"符合「{query}」的需求單 {len(results)} 筆 (依相關程度排序)"
+        ttk.Label(window, text=summary, font=('Arial', 10, 'bold')).pack(anchor=tk.W, padx=10, pady=(10, 5))
+
+        list_frame = ttk.Frame(window)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+
+        # 管理員看到的是接收人，員工看到的是指派人
+        person_heading = "指派給" if scope_key == 'assigner_id' else "指派人"
+        columns = ("id", "title", "person", "status", "snippet")
+        result_treeview = ttk.Treeview(list_frame, columns=columns, show="headings", selectmode="browse")
+        result_treeview.heading("id", text="ID")
+        result_treeview.heading("title", text="標題")
+        result_treeview.heading("person", text=person_heading)
+        result_treeview.heading("status", text="狀態")
+        result_treeview.heading("snippet", text="內容摘要")
+        result_treeview.column("id", width=50)
+        result_treeview.column("title", width=180)
+        result_treeview.column("person", width=90)
+        result_treeview.column("status", width=70)
+        result_treeview.column("snippet", width=420)
+
+        for result in results:
+            req = result.requirement
+            person = req.assignee_name if scope_key == 'assigner_id' else req.assigner_name
+            result_treeview.insert("", tk.END, iid=str(req.id),
+                                   values=(req.id, req.title, person, req.status_text, result.snippet))
+
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=result_treeview.yview)
+        result_treeview.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        result_treeview.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        def on_double_click(event):
+            selected_item = result_treeview.selection()
+            if selected_item:
+                open_details(int(selected_item[0]))
+
+        result_treeview.bind("<Double-1>", on_double_click)
+
+    def _sync_staff_widgets(self):
+        """員工名錄改變時更新所有員工選單 (發派清單與員工過濾)，回傳是否有更新"""
+        directory = self.staff_directory
+        if directory.version == self._staff_widgets_version:
+            return False
+        self._staff_widgets_version = directory.version
+        if self.staff_listbox is not None:
+            self._filter_dispatch_staff_list()
+        for combobox, variable in self.staff_filter_comboboxes:
+            self._update_staff_search_values(combobox, variable)
+        return True
+
+    def get_selected_dispatch_staff_ids(self):
+        """獲取發派清單中選取的員工ID (依員工ID排序)"""
+        return [staff_id for staff_id, _ in self.staff_directory.staff() if staff_id in self.dispatch_selected_ids]
+
+    def create_requirement(self):
+        """建立新的需求單 (可同時派發給多位員工)"""
+        staff_ids = self.get_selected_dispatch_staff_ids()
+        if not staff_ids:
+            messagebox.showerror("錯誤", "請選擇要指派的員工")
             return
 
         title = self.title_entry.get()
@@ -1227,24 +1723,51 @@ class RequirementManager:
                 messagebox.showerror("錯誤", f"日期時間格式不正確: {e}")
                 return
 
-        req_id = self.execute_with_connection(
-            create_requirement,
-            title,
-            description,
-            self.user_id,
-            staff_id,
-            priority,
-            scheduled_time,
-            attachment_db_path
-        )
+        if len(staff_ids) == 1:
+            func = create_requirement
+            args = (
+                title,
+                description,
+                self.user_id,
+                staff_ids[0],
+                priority,
+                scheduled_time,
+                attachment_db_path
+            )
+        else:
+            # 多位員工：同一份內容與附件在單一交易中批次建立
+            func = create_requirements_bulk
+            args = (
+                title,
+                description,
+                self.user_id,
+                staff_ids,
+                priority,
+                scheduled_time,
+                attachment_db_path
+            )
 
-        if req_id:
-            priority_text = "緊急" if priority == "urgent" else "普通"
+        def on_created(result):
+            self._on_requirement_created(result, len(staff_ids), priority, scheduled_time, attachment_db_path)
+
+        self.create_button.config(state=tk.DISABLED)
+        self.run_in_background(func, *args, callback=on_created)
+
+    def _on_requirement_created(self, result, staff_count, priority, scheduled_time, attachment_db_path):
+        """需求單建立完成後更新發派頁面"""
+        self.create_button.config(state=tk.NORMAL)
+        if staff_count == 1:
+            target_text = f"需求單 #{result}"
+        else:
+            target_text = f"{result} 份需求單"
+
+        if result:
+            priority_text = priority_display_text(priority)
             
             if scheduled_time:
-                message = f"需求單 #{req_id} (緊急程度: {priority_text}) 已設定於 {scheduled_time} 發派"
+                message = f"{target_text} (緊急程度: {priority_text}) 已設定於 {scheduled_time} 發派"
             else:
-                message = f"需求單 #{req_id} (緊急程度: {priority_text}) 已成功派發"
+                message = f"{target_text} (緊急程度: {priority_text}) 已成功派發"
             
             if attachment_db_path:
                 message += f"\n附件: {os.path.basename(attachment_db_path)}"
@@ -1263,6 +1786,10 @@ class RequirementManager:
 
     def close(self):
         """關閉需求單管理界面"""
+        # 停止背景資料庫工作者與延遲的重新載入，尚未完成的結果不再更新已關閉的界面
+        self.stop_change_polling()
+        self._cancel_other_reloads()
+        self.db_worker.shutdown()
         try:
             # 關閉可能打開的詳情視窗
             for widget in self.root.winfo_children():
@@ -1315,129 +1842,56 @@ class RequirementManager:
             except:
                 pass
 
-    def load_admin_dispatched_requirements(self):
-        """載入管理員已發派的需求單數據"""
-        for item in self.admin_dispatched_treeview.get_children():
-            self.admin_dispatched_treeview.delete(item)
-            
+    def load_admin_dispatched_requirements(self, append=False):
+        """載入管理員已發派的需求單數據
+
+        Args:
+            append: True 表示接續載入下一頁，False 表示重新載入第一頁
+        """
         status_filter = self.status_filter_var.get()
-        staff_filter = self.staff_filter_var.get()
-        
-        staff_id = None
-        if staff_filter != "all" and "(" in staff_filter and ")" in staff_filter:
-            try:
-                # Values are like "員工名 (ID)"
-                staff_id_str = staff_filter.split("(")[1].split(")")[0]
-                staff_id = int(staff_id_str)
-            except (ValueError, IndexError) as e:
-                print(f"解析員工ID錯誤 (dispatched_tab): {e}, 原始字串: {staff_filter}")
-                staff_id = None 
-        
-        requirements = []
-        if staff_id is not None: 
-            requirements = self.execute_with_connection(get_admin_requirements_by_staff, self.user_id, staff_id) or []
-        else:
-            requirements = self.execute_with_connection(get_admin_dispatched_requirements, self.user_id) or []
-        
+        # 「全部員工」或名錄中沒有的文字都視為不篩選員工
+        staff_id = self.staff_directory.id_for_label(self.staff_filter_var.get())
+        
+        # 狀態與員工篩選都交給資料庫處理
+        statuses = None if status_filter == "all" else (status_filter,)
+        self._fetch_list_page('admin_dispatched', get_admin_dispatched_requirements,
+                              self.user_id, statuses=statuses, staff_id=staff_id,
+                              append=append, count_func=count_admin_dispatched_requirements,
+                              callback=self._render_admin_dispatched_requirements)
+
+    def _render_admin_dispatched_requirements(self, requirements, append):
+        """將查詢到的需求單更新到已發派列表"""
+        rows = []
         for req in requirements:
-            try:
-                if len(req) < 15:
-                    print(f"跳過不完整的管理員已發派需求單記錄 (欄位數 {len(req)}): {req}")
-                    continue
-                
-                (req_id, title, description, status, priority, created_at, 
-                 assigner_name, assigner_id, assignee_name, assignee_id,
-                 scheduled_time, comment, completed_at, attachment_path, deleted_at) = req
+            status = req.status
+            created_at_display = self._format_list_time(req.created_at)
+            tags = (status,) if status in ('reviewing', 'completed', 'invalid') else ()
+            rows.append((req.id, (req.id, req.title, req.assignee_name, req.status_text, req.priority_text, created_at_display), tags))
+        
+        self._reconcile_treeview(self.admin_dispatched_treeview, rows, append)
 
-                if status_filter != "all" and status != status_filter:
-                    continue
-                    
-                status_text = self.get_status_display_text(status)
-                priority_text = "緊急" if priority == "urgent" else "普通"
-                
-                created_at_display = created_at
-                if isinstance(created_at, str):
-                    try:
-                        date_obj = datetime.datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                        created_at_display = date_obj.strftime("%Y-%m-%d %H:%M")
-                    except ValueError:
-                        pass 
-                
-                item_id_val = self.admin_dispatched_treeview.insert(
-                    "", tk.END, 
-                    values=(req_id, title, assignee_name, status_text, priority_text, created_at_display)
-                )
-                
-                if status == 'reviewing':
-                    self.admin_dispatched_treeview.item(item_id_val, tags=('reviewing',))
-                elif status == 'completed':
-                    self.admin_dispatched_treeview.item(item_id_val, tags=('completed',))
-                elif status == 'invalid':
-                    self.admin_dispatched_treeview.item(item_id_val, tags=('invalid',))
-            except Exception as e:
-                print(f"載入管理員已發派需求單列表時發生錯誤: {e}, 數據: {req}")
-                import traceback
-                print(traceback.format_exc())
-                    
-        self.admin_dispatched_treeview.tag_configure('reviewing', background='#d4edff')
-        self.admin_dispatched_treeview.tag_configure('completed', background='#e6ffe6')
-        self.admin_dispatched_treeview.tag_configure('invalid', background='#f0f0f0')
+    def load_admin_scheduled_requirements(self, append=False):
+        """載入管理員預約發派的需求單數據
 
-    def load_admin_scheduled_requirements(self):
-        """載入管理員預約發派的需求單數據"""
-        # 清空現有數據
-        for item in self.admin_scheduled_treeview.get_children():
-            self.admin_scheduled_treeview.delete(item)
-            
-        # 獲取員工過濾條件
-        staff_filter = self.scheduled_staff_filter_var.get()
-        
-        # 解析員工ID（如果選擇了特定員工）
-        staff_id = None
-        if staff_filter != "all" and "(" in staff_filter and ")" in staff_filter:
-            try:
-                staff_id = int(staff_filter.split("(")[1].split(")")[0])
-            except (ValueError, IndexError):
-                pass
+        Args:
+            append: True 表示接續載入下一頁，False 表示重新載入第一頁
+        """
+        # 獲取員工過濾條件 (由名錄對照員工ID)
+        staff_id = self.staff_directory.id_for_label(self.scheduled_staff_filter_var.get())
             
-        # 獲取數據
-        if staff_id:
-            # 按特定員工篩選
-            requirements = self.execute_with_connection(get_admin_scheduled_by_staff, self.user_id, staff_id) or []
-        else:
-            # 獲取所有需求單
-            requirements = self.execute_with_connection(get_admin_scheduled_requirements, self.user_id) or []
-        
-        # 添加數據到表格
+        # 在背景線程獲取數據，完成後再填入表格
+        self._fetch_list_page('admin_scheduled', get_admin_scheduled_requirements,
+                              self.user_id, staff_id=staff_id, append=append,
+                              callback=self._render_admin_scheduled_requirements)
+
+    def _render_admin_scheduled_requirements(self, requirements, append):
+        """將查詢到的需求單更新到預約發派列表"""
+        rows = []
         for req in requirements:
-            try:
-                # 正確解析所有15個欄位
-                (req_id, title, description, status, priority, created_at, 
-                 assigner_name, assigner_id, assignee_name, assignee_id,
-                 scheduled_time, comment, completed_at, attachment_path, deleted_at) = req
-                
-                # 格式化緊急程度
-                priority_text = "緊急" if priority == "urgent" else "普通"
-                
-                # 格式化時間
-                if isinstance(scheduled_time, str):
-                    try:
-                        date_obj = datetime.datetime.strptime(scheduled_time, "%Y-%m-%d %H:%M:%S")
-                        scheduled_text = date_obj.strftime("%Y-%m-%d %H:%M")
-                    except ValueError:
-                        scheduled_text = scheduled_time
-                else:
-                    scheduled_text = scheduled_time
-                    
-                # 插入數據
-                self.admin_scheduled_treeview.insert(
-                    "", tk.END, 
-                    values=(req_id, title, assignee_name, priority_text, scheduled_text)
-                )
-            except Exception as e:
-                print(f"載入預約發派需求單時發生錯誤: {e}, 數據: {req}")
-                import traceback
-                print(traceback.format_exc())
+            scheduled_text = self._format_list_time(req.scheduled_time)
+            rows.append((req.id, (req.id, req.title, req.assignee_name, req.priority_text, scheduled_text), ()))
+        
+        self._reconcile_treeview(self.admin_scheduled_treeview, rows, append)
 
     def show_dispatched_details(self, event):
         """顯示已發派需求單詳情"""
@@ -1445,89 +1899,76 @@ class RequirementManager:
         if not selected_item:
             return
         item = self.admin_dispatched_treeview.item(selected_item)
-        req_id = item['values'][0]
-        
-        requirements_data = self.execute_with_connection(get_admin_dispatched_requirements, self.user_id) or []
-        requirement = None
-        for req_data in requirements_data:
-            if req_data[0] == req_id:
-                requirement = req_data
-                break
-        
-        if not requirement:
-            messagebox.showerror("錯誤", f"找不到ID為 {req_id} 的需求單詳情。")
-            return
+        self.open_dispatched_details(item['values'][0])
 
-        if len(requirement) < 15:
-            messagebox.showerror("錯誤", "需求單資料不完整 (欄位不足)。")
-            return
-        
-        (req_id, title, description, status, priority, created_at, 
-         assigner_name, assigner_id, assignee_name, assignee_id,
-         scheduled_time, comment, completed_at, attachment_path, deleted_at) = requirement
-        
-        status_text = self.get_status_display_text(status)
-        priority_text = "緊急" if priority == "urgent" else "普通"
+    def open_dispatched_details(self, req_id):
+        """開啟管理員的已發派需求單詳情視窗 (列表與搜尋結果共用)"""
+        self._load_requirement_details(req_id, self._show_dispatched_details_window, assigner_id=self.user_id)
+
+    def _show_dispatched_details_window(self, requirement):
+        """以讀取到的需求單建立管理員的已發派需求單詳情視窗"""
+        status_text = requirement.status_text
+        priority_text = requirement.priority_text
     
-        detail_window = self.create_toplevel_window(f"需求單詳情 #{req_id}", "600x600") # Adjusted size
+        detail_window = self.create_toplevel_window(f"需求單詳情 #{requirement.id}", "600x600") # Adjusted size
         
-        ttk.Label(detail_window, text=title, font=('Arial', 14, 'bold')).pack(pady=(20, 10), padx=20, anchor=tk.W)
+        ttk.Label(detail_window, text=requirement.title, font=('Arial', 14, 'bold')).pack(pady=(20, 10), padx=20, anchor=tk.W)
         details_frame = ttk.Frame(detail_window)
         details_frame.pack(fill=tk.X, padx=20, pady=5)
         left_details = ttk.Frame(details_frame)
         left_details.pack(side=tk.LEFT, fill=tk.X, expand=True)
         ttk.Label(left_details, text=f"狀態: {status_text}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
-        ttk.Label(left_details, text=f"緊急程度: {priority_text}", font=('Arial', 10), foreground="red" if priority == "urgent" else "black").pack(pady=2, anchor=tk.W)
-        ttk.Label(left_details, text=f"發派時間: {created_at}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
+        ttk.Label(left_details, text=f"緊急程度: {priority_text}", font=('Arial', 10), foreground="red" if requirement.priority == "urgent" else "black").pack(pady=2, anchor=tk.W)
+        ttk.Label(left_details, text=f"發派時間: {self._format_list_time(requirement.created_at, '%Y-%m-%d %H:%M:%S')}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
         right_details = ttk.Frame(details_frame)
         right_details.pack(side=tk.RIGHT, fill=tk.X, expand=True)
-        ttk.Label(right_details, text=f"指派給: {assignee_name}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
-        if completed_at and status in ["reviewing", "completed"]: # Ensure completed_at is not None
-            ttk.Label(right_details, text=f"完成時間: {completed_at}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
+        ttk.Label(right_details, text=f"指派給: {requirement.assignee_name}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
+        if requirement.completed_at and requirement.status in ["reviewing", "completed"]: # Ensure completed_at is not None
+            ttk.Label(right_details, text=f"完成時間: {self._format_list_time(requirement.completed_at, '%Y-%m-%d %H:%M:%S')}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
         
         ttk.Separator(detail_window, orient='horizontal').pack(fill=tk.X, padx=20, pady=10)
         ttk.Label(detail_window, text="需求內容:", font=('Arial', 10, 'bold')).pack(pady=(5, 5), padx=20, anchor=tk.W)
         content_frame = ttk.Frame(detail_window)
         content_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
         content_text = tk.Text(content_frame, wrap=tk.WORD, height=6) # Adjusted height
-        content_text.insert(tk.END, description)
+        content_text.insert(tk.END, requirement.description)
         content_text.config(state=tk.DISABLED)
         scrollbar = ttk.Scrollbar(content_frame, command=content_text.yview)
         content_text.configure(yscrollcommand=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         content_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        if comment:
+        if requirement.comment:
             ttk.Label(detail_window, text="完成情況說明:", font=('Arial', 10, 'bold')).pack(pady=(10, 5), padx=20, anchor=tk.W)
             comment_frame = ttk.Frame(detail_window)
             comment_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5) # Allow expansion
             comment_text_widget = tk.Text(comment_frame, wrap=tk.WORD, height=3) # Adjusted height
-            comment_text_widget.insert(tk.END, comment)
+            comment_text_widget.insert(tk.END, requirement.comment)
             comment_text_widget.config(state=tk.DISABLED)
             comment_scrollbar = ttk.Scrollbar(comment_frame, command=comment_text_widget.yview)
             comment_text_widget.configure(yscrollcommand=comment_scrollbar.set)
             comment_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
             comment_text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        if attachment_path:
+        if requirement.attachment_path:
             ttk.Label(detail_window, text="附件:", font=('Arial', 10, 'bold')).pack(pady=(10,0), padx=20, anchor=tk.W)
             attachment_display_frame = ttk.Frame(detail_window)
             attachment_display_frame.pack(fill=tk.X, padx=20, pady=(0,5))
-            filename = os.path.basename(attachment_path)
+            filename = os.path.basename(requirement.attachment_path)
             attach_label = ttk.Label(attachment_display_frame, text=filename, foreground="blue", cursor="hand2")
             attach_label.pack(side=tk.LEFT, padx=(0,10))
-            attach_label.bind("<Button-1>", lambda e, ap=attachment_path: self._open_attachment(ap, detail_window))
+            attach_label.bind("<Button-1>", lambda e, ap=requirement.attachment_path: self._open_attachment(ap, detail_window))
         
         button_frame = ttk.Frame(detail_window)
         button_frame.pack(fill=tk.X, pady=15, padx=20)
         left_button_frame = ttk.Frame(button_frame)
         left_button_frame.pack(side=tk.LEFT, fill=tk.X)
-        if status == "reviewing":
-            ttk.Button(left_button_frame, text="審核通過", command=lambda: self.perform_approve_requirement(req_id, detail_window)).pack(side=tk.LEFT, padx=5)
-            ttk.Button(left_button_frame, text="退回修改", command=lambda: self.perform_reject_requirement(req_id, detail_window)).pack(side=tk.LEFT, padx=5)
-        if status != "invalid":
-            ttk.Button(left_button_frame, text="設為失效", command=lambda: self.perform_invalidate_requirement(req_id, detail_window)).pack(side=tk.LEFT, padx=5)
-        ttk.Button(left_button_frame, text="刪除需求單", command=lambda: self.perform_delete_requirement(req_id, detail_window)).pack(side=tk.LEFT, padx=5)
+        if requirement.status == "reviewing":
+            ttk.Button(left_button_frame, text="審核通過", command=lambda: self.perform_approve_requirement(requirement.id, detail_window)).pack(side=tk.LEFT, padx=5)
+            ttk.Button(left_button_frame, text="退回修改", command=lambda: self.perform_reject_requirement(requirement.id, detail_window)).pack(side=tk.LEFT, padx=5)
+        if requirement.status != "invalid":
+            ttk.Button(left_button_frame, text="設為失效", command=lambda: self.perform_invalidate_requirement(requirement.id, detail_window)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(left_button_frame, text="刪除需求單", command=lambda: self.perform_delete_requirement(requirement.id, detail_window)).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="關閉", command=detail_window.destroy).pack(side=tk.RIGHT)
         
     def show_scheduled_details(self, event):
@@ -1537,53 +1978,38 @@ class RequirementManager:
             return
         item = self.admin_scheduled_treeview.item(selected_item)
         req_id = item['values'][0]
-        
-        requirements_data = self.execute_with_connection(get_admin_scheduled_requirements, self.user_id) or []
-        requirement = None
-        for req_data in requirements_data:
-            if req_data[0] == req_id:
-                requirement = req_data
-                break
-        
-        if not requirement:
-            messagebox.showerror("錯誤", f"找不到ID為 {req_id} 的預約需求單詳情。")
-            return
+        self._load_requirement_details(req_id, self._show_scheduled_details_window,
+                                       f"找不到ID為 {req_id} 的預約需求單詳情。", assigner_id=self.user_id)
 
-        if len(requirement) < 15: # Expect 15 fields
-            messagebox.showerror("錯誤", "預約需求單資料不完整 (欄位不足)。")
-            return
-            
-        (req_id, title, description, status, priority, created_at, 
-         assigner_name, assigner_id, assignee_name, assignee_id,
-         scheduled_time, comment, completed_at, attachment_path, deleted_at) = requirement
-        
-        priority_text = "緊急" if priority == "urgent" else "普通" # Use 'priority' not item['values'][3]
+    def _show_scheduled_details_window(self, requirement):
+        """以讀取到的需求單建立預約需求單詳情視窗"""
+        priority_text = requirement.priority_text
 
-        detail_window = self.create_toplevel_window(f"預約需求單詳情 #{req_id}", "600x550") # Adjusted size
+        detail_window = self.create_toplevel_window(f"預約需求單詳情 #{requirement.id}", "600x550") # Adjusted size
         
-        ttk.Label(detail_window, text=title, font=('Arial', 14, 'bold')).pack(pady=(20, 10), padx=20, anchor=tk.W)
+        ttk.Label(detail_window, text=requirement.title, font=('Arial', 14, 'bold')).pack(pady=(20, 10), padx=20, anchor=tk.W)
         details_frame = ttk.Frame(detail_window)
         details_frame.pack(fill=tk.X, padx=20, pady=5)
         left_details = ttk.Frame(details_frame)
         left_details.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        ttk.Label(left_details, text=f"緊急程度: {priority_text}", font=('Arial', 10), foreground="red" if priority == "urgent" else "black").pack(pady=2, anchor=tk.W)
+        ttk.Label(left_details, text=f"緊急程度: {priority_text}", font=('Arial', 10), foreground="red" if requirement.priority == "urgent" else "black").pack(pady=2, anchor=tk.W)
         # Display scheduled_time, as this is a scheduled requirement
-        if scheduled_time:
-             ttk.Label(left_details, text=f"預約發派時間: {scheduled_time}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
+        if requirement.scheduled_time:
+             ttk.Label(left_details, text=f"預約發派時間: {self._format_list_time(requirement.scheduled_time, '%Y-%m-%d %H:%M:%S')}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
         else: # Fallback if scheduled_time is somehow null for a scheduled item
-             ttk.Label(left_details, text=f"發派時間: {created_at}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
+             ttk.Label(left_details, text=f"發派時間: {self._format_list_time(requirement.created_at, '%Y-%m-%d %H:%M:%S')}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
 
 
         right_details = ttk.Frame(details_frame)
         right_details.pack(side=tk.RIGHT, fill=tk.X, expand=True)
-        ttk.Label(right_details, text=f"指派給: {assignee_name}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
+        ttk.Label(right_details, text=f"指派給: {requirement.assignee_name}", font=('Arial', 10)).pack(pady=2, anchor=tk.W)
         
         ttk.Separator(detail_window, orient='horizontal').pack(fill=tk.X, padx=20, pady=10)
         ttk.Label(detail_window, text="需求內容:", font=('Arial', 10, 'bold')).pack(pady=(5, 5), padx=20, anchor=tk.W)
         content_frame = ttk.Frame(detail_window)
         content_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
         content_text = tk.Text(content_frame, wrap=tk.WORD, height=8)
-        content_text.insert(tk.END, description)
+        content_text.insert(tk.END, requirement.description)
         content_text.config(state=tk.DISABLED)
         scrollbar = ttk.Scrollbar(content_frame, command=content_text.yview)
         content_text.configure(yscrollcommand=scrollbar.set)
@@ -1591,26 +2017,26 @@ class RequirementManager:
         content_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # Comment and Completed_at are unlikely for not-yet-dispatched scheduled items, but show if present
-        if comment:
+        if requirement.comment:
             ttk.Label(detail_window, text="(預約時)備註/說明:", font=('Arial', 10, 'bold')).pack(pady=(10, 5), padx=20, anchor=tk.W)
             comment_display_frame = ttk.Frame(detail_window)
             comment_display_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
             comment_display_text = tk.Text(comment_display_frame, wrap=tk.WORD, height=3)
-            comment_display_text.insert(tk.END, comment)
+            comment_display_text.insert(tk.END, requirement.comment)
             comment_display_text.config(state=tk.DISABLED)
             comment_display_scrollbar = ttk.Scrollbar(comment_display_frame, command=comment_display_text.yview)
             comment_display_text.configure(yscrollcommand=comment_display_scrollbar.set)
             comment_display_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
             comment_display_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        if attachment_path: # From the initial unpacking
+        if requirement.attachment_path:
             ttk.Label(detail_window, text="附件:", font=('Arial', 10, 'bold')).pack(pady=(10,0), padx=20, anchor=tk.W)
             attachment_display_frame = ttk.Frame(detail_window)
             attachment_display_frame.pack(fill=tk.X, padx=20, pady=(0,5))
-            filename = os.path.basename(attachment_path)
+            filename = os.path.basename(requirement.attachment_path)
             attach_label = ttk.Label(attachment_display_frame, text=filename, foreground="blue", cursor="hand2")
             attach_label.pack(side=tk.LEFT, padx=(0,10))
-            attach_label.bind("<Button-1>", lambda e, ap=attachment_path: self._open_attachment(ap, detail_window))
+            attach_label.bind("<Button-1>", lambda e, ap=requirement.attachment_path: self._open_attachment(ap, detail_window))
         
         # Remove the old action_button_frame and its contents from show_scheduled_details
         # It was adding approve/reject buttons which are not applicable here.
@@ -1619,7 +2045,7 @@ class RequirementManager:
         button_frame = ttk.Frame(detail_window) # Re-create or use a new name for clarity
         button_frame.pack(fill=tk.X, pady=15, padx=20)
         
-        ttk.Button(button_frame, text="取消預約發派", command=lambda: self.perform_cancel_scheduled(req_id, detail_window)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="取消預約發派", command=lambda: self.perform_cancel_scheduled(requirement.id, detail_window)).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="關閉", command=detail_window.destroy).pack(side=tk.RIGHT)
 
     def cancel_scheduled_requirement(self):
@@ -1640,31 +2066,16 @@ class RequirementManager:
             
     def perform_cancel_scheduled(self, req_id, window_to_close=None):
         """執行取消預約發派"""
-        if self.execute_with_connection(cancel_scheduled_requirement, req_id):
-            messagebox.showinfo("成功", "已成功取消預約發派需求單")
-            if window_to_close:
-                window_to_close.destroy()
-            self.load_admin_scheduled_requirements()
-        else:
-            messagebox.showerror("錯誤", "取消預約發派失敗") 
+        def on_done(success):
+            if success:
+                messagebox.showinfo("成功", "已成功取消預約發派需求單")
+                if window_to_close:
+                    window_to_close.destroy()
+                self.load_admin_scheduled_requirements()
+            else:
+                messagebox.showerror("錯誤", "取消預約發派失敗")
 
-    def get_status_display_text(self, status):
-        """獲取狀態的顯示文字
-        
-        Args:
-            status: 狀態代碼
-            
-        Returns:
-            str: 顯示文字
-        """
-        status_map = {
-            'not_dispatched': '未發派',
-            'pending': '未完成',
-            'reviewing': '待審核',
-            'completed': '已完成',
-            'invalid': '已失效'
-        }
-        return status_map.get(status, status) 
+        self.run_in_background(cancel_scheduled_requirement, req_id, callback=on_done)
 
     def submit_requirement(self):
         """員工提交需求單完成情況"""
@@ -1789,70 +2200,86 @@ class RequirementManager:
                 messagebox.showerror("錯誤", f"複製提交的附件失敗: {e}", parent=window)
                 return
             
-        if self.execute_with_connection(submit_requirement, req_id, comment, attachment_db_path_for_submit):
-            messagebox.showinfo("成功", "需求單已提交，等待管理員審核")
-            window.destroy()
-            self.load_user_requirements()  # 重新加載需求單列表
-            # Clear submit attachment vars after successful submission
-            self.selected_submit_attachment_source_path = None
-            self.submit_attachment_path_var.set("")
-        else:
-            messagebox.showerror("錯誤", "提交需求單失敗") 
+        def on_done(success):
+            if success:
+                messagebox.showinfo("成功", "需求單已提交，等待管理員審核")
+                window.destroy()
+                self.load_user_requirements()  # 重新加載需求單列表
+                # Clear submit attachment vars after successful submission
+                self.selected_submit_attachment_source_path = None
+                self.submit_attachment_path_var.set("")
+            else:
+                messagebox.showerror("錯誤", "提交需求單失敗")
+
+        self.run_in_background(submit_requirement, req_id, comment, attachment_db_path_for_submit,
+                               callback=on_done)
 
     def perform_approve_requirement(self, req_id, window=None):
         """執行審核通過需求單"""
         confirm = messagebox.askyesno("確認審核", "確定要審核通過此需求單嗎？")
         if confirm:
-            if self.execute_with_connection(approve_requirement, req_id):
-                messagebox.showinfo("成功", "需求單已審核通過，狀態已改為「已完成」")
-                if window:
-                    window.destroy()
-                # 重新載入已發派和待審核需求單列表
-                self.load_admin_dispatched_requirements()
-                if hasattr(self, 'load_admin_reviewing_requirements'):
-                    self.load_admin_reviewing_requirements()
-            else:
-                messagebox.showerror("錯誤", "審核需求單失敗")
+            def on_done(success):
+                if success:
+                    messagebox.showinfo("成功", "需求單已審核通過，狀態已改為「已完成」")
+                    if window:
+                        window.destroy()
+                    # 重新載入已發派和待審核需求單列表
+                    self.load_admin_dispatched_requirements()
+                    if hasattr(self, 'load_admin_reviewing_requirements'):
+                        self.load_admin_reviewing_requirements()
+                else:
+                    messagebox.showerror("錯誤", "審核需求單失敗")
+
+            self.run_in_background(approve_requirement, req_id, callback=on_done)
                 
     def perform_reject_requirement(self, req_id, window=None):
         """執行退回需求單"""
         confirm = messagebox.askyesno("確認退回", "確定要退回此需求單嗎？狀態將改回「未完成」")
         if confirm:
-            if self.execute_with_connection(reject_requirement, req_id):
-                messagebox.showinfo("成功", "需求單已退回，狀態已改為「未完成」")
-                if window:
-                    window.destroy()
-                # 重新載入已發派和待審核需求單列表
-                self.load_admin_dispatched_requirements()
-                if hasattr(self, 'load_admin_reviewing_requirements'):
-                    self.load_admin_reviewing_requirements()
-            else:
-                messagebox.showerror("錯誤", "退回需求單失敗")
+            def on_done(success):
+                if success:
+                    messagebox.showinfo("成功", "需求單已退回，狀態已改為「未完成」")
+                    if window:
+                        window.destroy()
+                    # 重新載入已發派和待審核需求單列表
+                    self.load_admin_dispatched_requirements()
+                    if hasattr(self, 'load_admin_reviewing_requirements'):
+                        self.load_admin_reviewing_requirements()
+                else:
+                    messagebox.showerror("錯誤", "退回需求單失敗")
+
+            self.run_in_background(reject_requirement, req_id, callback=on_done)
                 
     def perform_invalidate_requirement(self, req_id, window=None):
         """執行使需求單失效"""
         confirm = messagebox.askyesno("確認設為失效", "確定要將此需求單設為失效嗎？此操作無法撤銷！")
         if confirm:
-            if self.execute_with_connection(invalidate_requirement, req_id):
-                messagebox.showinfo("成功", "需求單已設為失效")
-                if window:
-                    window.destroy()
-                self.load_admin_dispatched_requirements()
-            else:
-                messagebox.showerror("錯誤", "設為失效失敗") 
+            def on_done(success):
+                if success:
+                    messagebox.showinfo("成功", "需求單已設為失效")
+                    if window:
+                        window.destroy()
+                    self.load_admin_dispatched_requirements()
+                else:
+                    messagebox.showerror("錯誤", "設為失效失敗")
+
+            self.run_in_background(invalidate_requirement, req_id, callback=on_done)
 
     def perform_delete_requirement(self, req_id, window=None):
         """執行刪除需求單操作"""
         confirm = messagebox.askyesno("確認刪除", "確定要刪除此需求單嗎？\n刪除後可在垃圾桶中查看或恢復。")
         if confirm:
-            try:
-                if self.execute_with_connection(delete_requirement, req_id):
+            def on_done(success):
+                if success:
                     messagebox.showinfo("成功", "需求單已移至垃圾桶")
                     if window:
                         window.destroy()
                     self.load_admin_dispatched_requirements()
                 else:
                     messagebox.showerror("錯誤", "刪除需求單失敗")
+
+            try:
+                self.run_in_background(delete_requirement, req_id, callback=on_done)
             except Exception as e:
                 messagebox.showerror("錯誤", f"刪除需求單時發生異常: {str(e)}")
                 print(f"刪除需求單時發生異常: {str(e)}")
@@ -1881,9 +2308,9 @@ class RequirementManager:
             command=self.load_deleted_requirements
         ).pack(side=tk.RIGHT, padx=5)
         
-        # 創建樹狀視圖用於顯示已刪除的需求單
+        # 創建樹狀視圖用於顯示已刪除的需求單 (只建立可見範圍的列)
         columns = ("ID", "標題", "緊急程度", "刪除時間", "指派給", "狀態")
-        self.trash_treeview = ttk.Treeview(trash_frame, columns=columns, show="headings", selectmode="browse")
+        self.trash_treeview = VirtualTreeview(trash_frame, columns=columns, show="headings", selectmode="browse")
         
         # 設置列的寬度
         self.trash_treeview.column("ID", width=50, anchor=tk.CENTER)
@@ -1899,15 +2326,21 @@ class RequirementManager:
             
         # 添加滾動條
         scrollbar = ttk.Scrollbar(trash_frame, orient="vertical", command=self.trash_treeview.yview)
-        self.trash_treeview.configure(yscrollcommand=scrollbar.set)
+        self._bind_paged_treeview(
+            'trash', self.trash_treeview, scrollbar,
+            {"ID": "id", "標題": "title", "緊急程度": "priority",
+             "刪除時間": "deleted_at", "指派給": "assignee", "狀態": "status"},
+            self.load_deleted_requirements, 'deleted_at', True
+        )
+        # 列的顏色標籤只需設定一次
+        self.trash_treeview.tag_configure("urgent", foreground="red")
+        self.trash_treeview.tag_configure("normal", foreground="black")
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.trash_treeview.pack(fill=tk.BOTH, expand=True)
         
         # 綁定雙擊事件
         self.trash_treeview.bind("<Double-1>", self.show_deleted_details)
         
-        # 載入已刪除的需求單
-        self.load_deleted_requirements()
     
     def setup_profile_tab(self, parent):
         """設置個人資料標籤頁"""
@@ -1998,34 +2431,28 @@ class RequirementManager:
                 print(f"登出時發生錯誤: {e}")
                 messagebox.showerror("錯誤", f"登出時發生錯誤: {e}")
 
-    def load_deleted_requirements(self):
-        """載入已刪除的需求單"""
-        # 清空現有項目
-        for item in self.trash_treeview.get_children():
-            self.trash_treeview.delete(item)
-            
-        # 從數據庫獲取已刪除的需求單
-        requirements = self.execute_with_connection(get_deleted_requirements, self.user_id) or []
-        
-        # 填充樹狀視圖
+    def load_deleted_requirements(self, append=False):
+        """載入已刪除的需求單
+
+        Args:
+            append: True 表示接續載入下一頁，False 表示重新載入第一頁
+        """
+        # 在背景線程從數據庫獲取已刪除的需求單
+        self._fetch_list_page('trash', get_deleted_requirements, self.user_id, append=append,
+                              count_func=count_deleted_requirements,
+                              callback=self._render_deleted_requirements)
+
+    def _render_deleted_requirements(self, requirements, append):
+        """將查詢到的已刪除需求單更新到垃圾桶列表"""
+        rows = []
         for req in requirements:
-            req_id = req[0]
-            title = req[1]
-            priority = "緊急" if req[4] == "urgent" else "普通"
-            deleted_time = req[8][:19] if req[8] else "-"  # 截取日期時間部分
-            assignee = req[6]
-            status = self.get_status_display_text(req[3])
+            deleted_time = self._format_list_time(req.deleted_at, "%Y-%m-%d %H:%M:%S") or "-"
             
             # 根據緊急程度設置標籤
-            tag = "urgent" if priority == "緊急" else "normal"
-            
-            self.trash_treeview.insert(
-                "", "end", values=(req_id, title, priority, deleted_time, assignee, status), tags=(tag,)
-            )
-            
-        # 設置標籤顏色
-        self.trash_treeview.tag_configure("urgent", foreground="red")
-        self.trash_treeview.tag_configure("normal", foreground="black")
+            tag = "urgent" if req.priority == "urgent" else "normal"
+            rows.append((req.id, (req.id, req.title, req.priority_text, deleted_time, req.assignee_name, req.status_text), (tag,)))
+        
+        self._reconcile_treeview(self.trash_treeview, rows, append)
 
     def show_deleted_details(self, event):
         """顯示已刪除需求單的詳情"""
@@ -2037,29 +2464,22 @@ class RequirementManager:
         item = self.trash_treeview.item(selected_item)
         req_id = item['values'][0]
         
-        # 從數據庫獲取所有已刪除的需求單
-        requirements = self.execute_with_connection(get_deleted_requirements, self.user_id) or []
-        
-        # 查找對應的需求單
-        requirement = None
-        for req in requirements:
-            if req[0] == req_id:
-                requirement = req
-                break
-                
-        if not requirement:
-            messagebox.showerror("錯誤", "找不到需求單資訊")
-            return
-            
+        # 以主鍵從數據庫獲取該需求單
+        self._load_requirement_details(req_id, self._show_trash_details_window, "找不到需求單資訊",
+                                       assigner_id=self.user_id)
+
+    def _show_trash_details_window(self, requirement):
+        """以讀取到的需求單建立已刪除需求單詳情視窗"""
+        req_id = requirement.id
         # 解析需求單資訊
-        title = requirement[1]
-        description = requirement[2]
-        status = self.get_status_display_text(requirement[3])
-        priority = "緊急" if requirement[4] == "urgent" else "普通"
-        created_time = requirement[5][:19] if requirement[5] else "-"  # 截取日期時間部分
-        assignee = requirement[6]
-        deleted_time = requirement[8][:19] if requirement[8] else "-"  # 截取日期時間部分
-        comment = requirement[9] if requirement[9] else ""
+        title = requirement.title
+        description = requirement.description
+        status = requirement.status_text
+        priority = requirement.priority_text
+        created_time = self._format_list_time(requirement.created_at, "%Y-%m-%d %H:%M:%S") or "-"
+        assignee = requirement.assignee_name
+        deleted_time = self._format_list_time(requirement.deleted_at, "%Y-%m-%d %H:%M:%S") or "-"
+        comment = requirement.comment or ""
         
         # 創建詳情視窗
         detail_window = self.create_toplevel_window(f"已刪除需求單詳情 #{req_id}", "600x500")
@@ -2177,88 +2597,58 @@ class RequirementManager:
         """執行恢復需求單操作"""
         confirm = messagebox.askyesno("確認恢復", "確定要恢復此需求單嗎？")
         if confirm:
-            if self.execute_with_connection(restore_requirement, req_id):
-                messagebox.showinfo("成功", "需求單已恢復")
-                if window:
-                    window.destroy()
-                self.load_deleted_requirements()
-                self.load_admin_dispatched_requirements()
-            else:
-                messagebox.showerror("錯誤", "恢復需求單失敗")
+            def on_done(success):
+                if success:
+                    messagebox.showinfo("成功", "需求單已恢復")
+                    if window:
+                        window.destroy()
+                    self.load_deleted_requirements()
+                    self.load_admin_dispatched_requirements()
+                else:
+                    messagebox.showerror("錯誤", "恢復需求單失敗")
+
+            self.run_in_background(restore_requirement, req_id, callback=on_done)
 
     def refresh_staff_list(self):
         """刷新員工列表"""
-        try:
-            # 獲取當前選中的值（如果有）
-            current_selection = self.staff_var.get()
-            
-            # 重新從數據庫獲取員工列表
-            staffs = self.execute_with_connection(get_all_staff)
-            if staffs is None:
+        def on_loaded(changed):
+            if changed is None:
                 messagebox.showerror("錯誤", "無法獲取員工列表")
                 return
-            
-            # 更新下拉選單的值
-            self.staff_combobox['values'] = [f"{staff[1]} (ID:{staff[0]})" for staff in staffs]
-            
-            # 如果之前有選中值，嘗試保持它
-            if current_selection:
-                self.staff_combobox.set(current_selection)
-                
-            messagebox.showinfo("成功", "員工列表已刷新")
-        except Exception as e:
-            messagebox.showerror("錯誤", f"刷新員工列表時發生錯誤: {str(e)}")
-            print(f"刷新員工列表錯誤: {str(e)}")
-
-    def load_admin_reviewing_requirements(self):
-        """載入管理員待審核的需求單數據"""
-        # 清空現有數據
-        for item in self.admin_reviewing_treeview.get_children():
-            self.admin_reviewing_treeview.delete(item)
-            
-        # 獲取所有已發派的需求單 (這些應包含完整的15個欄位)
-        requirements = self.execute_with_connection(get_admin_dispatched_requirements, self.user_id) or []
-        
-        # 篩選狀態為「待審核」的需求單
-        reviewing_requirements = [req for req in requirements if len(req) == 15 and req[3] == 'reviewing']
-        
-        # 添加數據到表格
-        for req in reviewing_requirements:
             try:
-                # 解包完整的15個欄位
-                (req_id, title, description, status, priority, created_at, 
-                 assigner_name, assigner_id, assignee_name, assignee_id,
-                 scheduled_time, comment, completed_at, attachment_path, deleted_at) = req
-                
-                # 格式化緊急程度
-                priority_text = "緊急" if priority == "urgent" else "普通"
-                
-                # 格式化時間
-                date_text = created_at # Default
-                if isinstance(created_at, str):
-                    try:
-                        date_obj = datetime.datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                        date_text = date_obj.strftime("%Y-%m-%d %H:%M")
-                    except ValueError:
-                        pass # date_text remains original created_at
-                
-                # Treeview columns: ("id", "title", "assignee", "priority", "created_at")
-                item_id_val = self.admin_reviewing_treeview.insert(
-                    "", tk.END, 
-                    values=(req_id, title, assignee_name, priority_text, date_text)
-                )
-                
-                # 根據優先級設置行顏色
-                if priority == 'urgent':
-                    self.admin_reviewing_treeview.item(item_id_val, tags=('urgent',))
-                
+                # 更新所有員工選單，並保持先前選中的員工
+                self._sync_staff_widgets()
+                messagebox.showinfo("成功", "員工列表已刷新")
             except Exception as e:
-                print(f"處理待審核需求單時發生錯誤: {e}, 數據: {req}")
-                import traceback
-                print(traceback.format_exc())
-                    
-        # 設置標籤顏色
-        self.admin_reviewing_treeview.tag_configure('urgent', background='#ffecec')
+                messagebox.showerror("錯誤", f"刷新員工列表時發生錯誤: {str(e)}")
+                print(f"刷新員工列表錯誤: {str(e)}")
+
+        # users 沒有變更時只需一次主鍵查詢，不會重新讀取整份員工列表
+        self.run_in_background(self.staff_directory.refresh, callback=on_loaded, key='staff_list')
+
+    def load_admin_reviewing_requirements(self, append=False):
+        """載入管理員待審核的需求單數據
+
+        Args:
+            append: True 表示接續載入下一頁，False 表示重新載入第一頁
+        """
+        # 只向資料庫查詢狀態為「待審核」的已發派需求單
+        self._fetch_list_page('admin_reviewing', get_admin_dispatched_requirements,
+                              self.user_id, statuses=('reviewing',), append=append,
+                              callback=self._render_admin_reviewing_requirements)
+
+    def _render_admin_reviewing_requirements(self, requirements, append):
+        """將查詢到的需求單更新到待審核列表"""
+        rows = []
+        for req in requirements:
+            date_text = self._format_list_time(req.created_at)
+            
+            # Treeview columns: ("id", "title", "assignee", "priority", "created_at")
+            # 根據優先級設置行顏色
+            tags = ('urgent',) if req.priority == 'urgent' else ()
+            rows.append((req.id, (req.id, req.title, req.assignee_name, req.priority_text, date_text), tags))
+        
+        self._reconcile_treeview(self.admin_reviewing_treeview, rows, append)
 
     def show_reviewing_requirement_details(self, event):
         """顯示待審核需求單詳情"""
@@ -2270,31 +2660,20 @@ class RequirementManager:
         item = self.admin_reviewing_treeview.item(selected_item)
         req_id_from_tree = item['values'][0] # Renamed to avoid confusion with req_id from full data
         
-        # 獲取需求單詳情 (應包含完整的15個欄位)
-        requirements_data = self.execute_with_connection(get_admin_dispatched_requirements, self.user_id) or []
-        requirement_full = None # Renamed
-        
-        for req_data_full in requirements_data: # Renamed
-            if len(req_data_full) == 15 and req_data_full[0] == req_id_from_tree: # Check length before access
-                requirement_full = req_data_full
-                break
-        
-        if not requirement_full:
-            messagebox.showerror("錯誤", f"找不到ID為 {req_id_from_tree} 的完整需求單詳情。")
-            return
-            
-        # 解包完整的15個欄位
-        (req_id, title, description, status, priority, created_at, 
-         assigner_name, assigner_id, assignee_name, assignee_id,
-         scheduled_time, comment, completed_at, attachment_path, deleted_at) = requirement_full
-        
+        # 獲取需求單詳情
+        self._load_requirement_details(req_id_from_tree, self._show_reviewing_details_window,
+                                       f"找不到ID為 {req_id_from_tree} 的完整需求單詳情。",
+                                       assigner_id=self.user_id)
+
+    def _show_reviewing_details_window(self, requirement):
+        """以讀取到的需求單建立待審核需求單詳情視窗"""
         # 創建詳情對話框
-        detail_window = self.create_toplevel_window(f"待審核需求單詳情 #{req_id}", "600x650")
+        detail_window = self.create_toplevel_window(f"待審核需求單詳情 #{requirement.id}", "600x650")
         
         # 標題
         ttk.Label(
             detail_window, 
-            text=f"標題: {title}", 
+            text=f"標題: {requirement.title}", 
             font=('Arial', 12, 'bold')
         ).pack(pady=(20, 10), padx=20, anchor=tk.W)
         
@@ -2304,7 +2683,7 @@ class RequirementManager:
         
         status_label = ttk.Label(
             status_frame, 
-            text=f"狀態: {self.get_status_display_text(status)}", # Use actual status from data
+            text=f"狀態: {requirement.status_text}", # Use actual status from data
             font=('Arial', 10, 'bold'),
             foreground="blue"
         )
@@ -2319,7 +2698,7 @@ class RequirementManager:
         left_details.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
         # 緊急程度
-        priority_text = "緊急" if priority == "urgent" else "普通"
+        priority_text = requirement.priority_text
         priority_label = ttk.Label(
             left_details, 
             text=f"緊急程度: {priority_text}",
@@ -2327,15 +2706,11 @@ class RequirementManager:
         )
         priority_label.pack(pady=2, anchor=tk.W)
         
-        if priority == "urgent":
+        if requirement.priority == "urgent":
             priority_label.configure(foreground="red")
         
         # 發派時間
-        created_at_display = created_at
-        if isinstance(created_at, str):
-            try:
-                created_at_display = datetime.datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d %H:%M")
-            except ValueError: pass
+        created_at_display = self._format_list_time(requirement.created_at)
         ttk.Label(
             left_details, 
             text=f"發派時間: {created_at_display}", 
@@ -2349,20 +2724,16 @@ class RequirementManager:
         # 接收人
         ttk.Label(
             right_details, 
-            text=f"接收人: {assignee_name}", 
+            text=f"接收人: {requirement.assignee_name}", 
             font=('Arial', 10)
         ).pack(pady=2, anchor=tk.W)
         
         # 提交時間 (completed_at for reviewing items)
-        completed_at_display = completed_at
-        if isinstance(completed_at, str):
-            try:
-                completed_at_display = datetime.datetime.strptime(completed_at, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d %H:%M")
-            except ValueError: pass
+        completed_at_display = self._format_list_time(requirement.completed_at)
 
         ttk.Label(
             right_details, 
-            text=f"提交時間: {completed_at_display if completed_at else '-'}", # Show '-' if None
+            text=f"提交時間: {completed_at_display if requirement.completed_at else '-'}", # Show '-' if None
             font=('Arial', 10)
         ).pack(pady=2, anchor=tk.W)
         
@@ -2381,7 +2752,7 @@ class RequirementManager:
         content_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
         
         content_text = tk.Text(content_frame, wrap=tk.WORD, height=8)
-        content_text.insert(tk.END, description)
+        content_text.insert(tk.END, requirement.description)
         content_text.config(state=tk.DISABLED)
         
         scrollbar = ttk.Scrollbar(content_frame, command=content_text.yview)
@@ -2391,7 +2762,7 @@ class RequirementManager:
         content_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # 員工完成情況說明
-        if comment:
+        if requirement.comment:
             ttk.Label(
                 detail_window, 
                 text="員工完成情況說明:", 
@@ -2402,7 +2773,7 @@ class RequirementManager:
             comment_display_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
             
             comment_text_widget = tk.Text(comment_display_frame, wrap=tk.WORD, height=6) # Renamed
-            comment_text_widget.insert(tk.END, comment)
+            comment_text_widget.insert(tk.END, requirement.comment)
             comment_text_widget.config(state=tk.DISABLED)
             
             comment_scrollbar = ttk.Scrollbar(comment_display_frame, command=comment_text_widget.yview) # Use renamed widget
@@ -2412,15 +2783,15 @@ class RequirementManager:
             comment_text_widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True) # Use renamed widget
 
         # 附件顯示
-        if attachment_path:
+        if requirement.attachment_path:
             ttk.Label(detail_window, text="附件:", font=('Arial', 10, 'bold')).pack(pady=(10,0), padx=20, anchor=tk.W)
             attachment_display_frame_details = ttk.Frame(detail_window) # Unique name
             attachment_display_frame_details.pack(fill=tk.X, padx=20, pady=(0,5))
 
-            filename = os.path.basename(attachment_path)
+            filename = os.path.basename(requirement.attachment_path)
             attach_label = ttk.Label(attachment_display_frame_details, text=filename, foreground="blue", cursor="hand2")
             attach_label.pack(side=tk.LEFT, padx=(0,10))
-            attach_label.bind("<Button-1>", lambda e, ap=attachment_path: self._open_attachment(ap, detail_window))
+            attach_label.bind("<Button-1>", lambda e, ap=requirement.attachment_path: self._open_attachment(ap, detail_window))
         
         # 按鈕框架
         button_frame = ttk.Frame(detail_window)
@@ -2432,13 +2803,13 @@ class RequirementManager:
         ttk.Button(
             left_button_frame, 
             text="審核通過", 
-            command=lambda: self.perform_approve_requirement(req_id, detail_window)
+            command=lambda: self.perform_approve_requirement(requirement.id, detail_window)
         ).pack(side=tk.LEFT, padx=5)
         
         ttk.Button(
             left_button_frame, 
             text="退回修改", 
-            command=lambda: self.perform_reject_requirement(req_id, detail_window)
+            command=lambda: self.perform_reject_requirement(requirement.id, detail_window)
         ).pack(side=tk.LEFT, padx=5)
         
         right_button_frame = ttk.Frame(button_frame) # No need for this extra frame
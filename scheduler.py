@@ -0,0 +1,163 @@
+import datetime
+import heapq
+import threading
+import time
+
+from database import (create_connection, release_connection, close_connection,
+                      claim_due_requirements, get_upcoming_schedule,
+                      add_schedule_listener, remove_schedule_listener)
+
+
+def _parse_scheduled_time(value):
+    """將預約時間 (datetime 或 "%Y-%m-%d %H:%M:%S" 字串) 轉為 datetime；格式不符時視為已到期"""
+    if isinstance(value, datetime.datetime):
+        return value
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return datetime.datetime.min
+
+
+class DispatchScheduler:
+    """事件驅動的預約發派調度器
+
+    以最小堆積保存接下來的預約時間，線程睡到最早的預約到期才向資料庫發派；
+    同一程序內新增或取消預約時 (透過 database 的排程監聽者) 會立即被喚醒。
+    """
+
+    # 堆積中最多保存的預約筆數，用完時再從資料庫補充
+    SEED_LIMIT = 1000
+    # 即使沒有收到通知，也至少每隔這段時間 (秒) 重新讀取排程，
+    # 以涵蓋其他程序 (其他用戶端) 新增的預約
+    RESYNC_INTERVAL = 60
+    # 發生錯誤時的最長重試間隔 (秒)
+    MAX_RETRY_INTERVAL = 60
+
+    def __init__(self, on_dispatched=None, claimed_by=None):
+        """初始化調度器
+
+        Args:
+            on_dispatched: 發派後的回呼，參數為本次發派的需求單ID列表 (在調度器線程中呼叫)
+            claimed_by: 記錄在需求單上的調度器識別，預設為主機名稱與程序ID
+        """
+        self.on_dispatched = on_dispatched
+        self.claimed_by = claimed_by
+        self._heap = []
+        self._heap_complete = False
+        self._needs_resync = True
+        self._last_sync = 0.0
+        self._woken = False
+        self._running = False
+        self._thread = None
+        self._condition = threading.Condition()
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """在背景線程啟動調度器"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        add_schedule_listener(self.notify)
+        self._thread = threading.Thread(target=self._run, name="dispatch-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """停止調度器並等待線程結束"""
+        remove_schedule_listener(self.notify)
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def notify(self, scheduled_time=None):
+        """預約排程變更通知
+
+        有新預約時直接放入堆積；其他變更 (取消、恢復) 則要求重新讀取排程。
+        """
+        with self._condition:
+            if scheduled_time:
+                heapq.heappush(self._heap, (_parse_scheduled_time(scheduled_time), 0))
+            else:
+                self._needs_resync = True
+            self._woken = True
+            self._condition.notify()
+
+    def _sync(self, conn):
+        """從資料庫重新讀取接下來的預約時間"""
+        rows = get_upcoming_schedule(conn, self.SEED_LIMIT)
+        heap = [(_parse_scheduled_time(scheduled_time), req_id) for scheduled_time, req_id in rows]
+        heapq.heapify(heap)
+        with self._condition:
+            self._heap = heap
+            self._heap_complete = len(rows) < self.SEED_LIMIT
+            self._needs_resync = False
+        self._last_sync = time.monotonic()
+
+    def _pop_due(self, now):
+        """移除堆積中已到期的項目；回傳是否有到期項目
+
+        發派失敗時 _run 會要求重新讀取排程，仍未發派的預約因此回到堆積並立即重試。
+        """
+        due = False
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                heapq.heappop(self._heap)
+                due = True
+            if not self._heap and not self._heap_complete:
+                # 只載入了部分排程，用完時需要再補充
+                self._needs_resync = True
+        return due
+
+    def _next_wait(self):
+        """計算距離下一次需要醒來的秒數"""
+        wait = self.RESYNC_INTERVAL - (time.monotonic() - self._last_sync)
+        with self._condition:
+            if self._heap:
+                until_due = (self._heap[0][0] - datetime.datetime.now()).total_seconds()
+                wait = min(wait, until_due)
+        return max(wait, 0)
+
+    def _run(self):
+        retry_interval = 1
+        while self._running:
+            try:
+                conn = create_connection()
+                if conn is None:
+                    raise RuntimeError("無法創建資料庫連接")
+                try:
+                    if self._needs_resync or time.monotonic() - self._last_sync >= self.RESYNC_INTERVAL:
+                        self._sync(conn)
+
+                    dispatched_ids = []
+                    if self._pop_due(datetime.datetime.now()):
+                        dispatched_ids = claim_due_requirements(conn, self.claimed_by)
+                finally:
+                    release_connection(conn)
+
+                if dispatched_ids and self.on_dispatched:
+                    self.on_dispatched(dispatched_ids)
+
+                wait = self._next_wait()
+                retry_interval = 1
+            except Exception as e:
+                # 發生錯誤時逐步拉長重試間隔，並丟棄可能處於異常狀態的連接
+                print(f"預約發派調度器執行錯誤: {e}")
+                close_connection()
+                # 到期項目可能已從堆積移除卻未發派 (例如寫入鎖被佔用)，重試前重新讀取排程
+                with self._condition:
+                    self._needs_resync = True
+                wait = retry_interval
+                retry_interval = min(retry_interval * 2, self.MAX_RETRY_INTERVAL)
+
+            with self._condition:
+                if self._running and not self._woken:
+                    self._condition.wait(wait)
+                self._woken = False
+
+        # 調度器線程結束時關閉其專屬連接
+        close_connection()
@@ -0,0 +1,207 @@
+"""獨立的預約發派調度器 (不需要 GUI)
+
+在存放資料庫的伺服器上以常駐程序執行，取代每個桌面用戶端各自的調度線程。
+
+用法:
+    python scheduler_daemon.py [--db users.db] [--lock-file PATH] [--status-file PATH]
+"""
+import argparse
+import datetime
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+
+import database
+from scheduler import DispatchScheduler
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 心跳寫入狀態檔的間隔 (秒)
+HEARTBEAT_INTERVAL = 10
+# 常駐調度器重新讀取排程的間隔 (秒)；用戶端新增的預約在其他程序中，只能靠重新讀取得知
+RESYNC_INTERVAL = 5
+
+
+def default_lock_path(db_path):
+    return db_path + ".scheduler.lock"
+
+
+def default_status_path(db_path):
+    return db_path + ".scheduler.json"
+
+
+class InstanceLock:
+    """以檔案鎖確保同一個資料庫只有一個調度器常駐程序"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """嘗試取得鎖；已被其他程序持有時回傳 False"""
+        self._file = open(self.path, "a+")
+        try:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(f"{os.getpid()}\n")
+        self._file.flush()
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def write_status(path, status):
+    """以「先寫暫存檔再取代」的方式更新狀態檔，避免讀到寫一半的內容"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(status, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_status(path):
+    """讀取調度器狀態檔；不存在或格式錯誤時回傳 None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_daemon_alive(status_path, max_age=HEARTBEAT_INTERVAL * 3):
+    """根據狀態檔的心跳時間判斷常駐調度器是否仍在運作"""
+    status = read_status(status_path)
+    if not status or status.get("state") != "running":
+        return False
+    try:
+        heartbeat = datetime.datetime.strptime(status["heartbeat_at"], "%Y-%m-%d %H:%M:%S")
+    except (KeyError, TypeError, ValueError):
+        return False
+    return (datetime.datetime.now() - heartbeat).total_seconds() <= max_age
+
+
+def _now_str():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def run(db_path, lock_path, status_path, heartbeat_interval=HEARTBEAT_INTERVAL,
+        resync_interval=RESYNC_INTERVAL):
+    """執行常駐調度器直到收到 SIGINT / SIGTERM，回傳程序結束碼"""
+    lock = InstanceLock(lock_path)
+    if not lock.acquire():
+        print(f"已有調度器在運作 (鎖定檔: {lock_path})")
+        return 1
+
+    stop_event = threading.Event()
+    status_lock = threading.Lock()
+    status = {
+        "state": "starting",
+        "pid": os.getpid(),
+        "host": socket.gethostname(),
+        "db_path": db_path,
+        "started_at": _now_str(),
+        "heartbeat_at": _now_str(),
+        "last_dispatch_at": None,
+        "last_dispatch_count": 0,
+        "dispatched_total": 0,
+    }
+
+    def update_status(**changes):
+        with status_lock:
+            status.update(changes)
+            status["heartbeat_at"] = _now_str()
+            write_status(status_path, status)
+
+    def on_dispatched(dispatched_ids):
+        print(f"[{_now_str()}] 已自動發派 {len(dispatched_ids)} 個預約需求單: {dispatched_ids}")
+        update_status(
+            last_dispatch_at=_now_str(),
+            last_dispatch_count=len(dispatched_ids),
+            dispatched_total=status["dispatched_total"] + len(dispatched_ids),
+        )
+
+    def handle_signal(signum, frame):
+        print(f"收到信號 {signum}，準備停止調度器...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    scheduler = None
+    try:
+        database.set_database_path(db_path)
+        conn = database.create_connection()
+        if conn is None:
+            print(f"無法開啟資料庫: {db_path}")
+            return 1
+        database.create_tables(conn)
+        database.release_connection(conn)
+
+        scheduler = DispatchScheduler(on_dispatched=on_dispatched)
+        scheduler.RESYNC_INTERVAL = resync_interval
+        scheduler.start()
+        update_status(state="running")
+        print(f"預約發派調度器已啟動 (PID {os.getpid()}，資料庫 {db_path})")
+
+        # 主線程只負責心跳，並等待停止信號
+        while not stop_event.wait(heartbeat_interval):
+            update_status()
+        return 0
+    finally:
+        if scheduler:
+            scheduler.stop(timeout=5)
+        database.close_connection()
+        update_status(state="stopped")
+        lock.release()
+        print("預約發派調度器已停止")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="需求管理系統 - 預約發派調度器 (無 GUI)")
+    parser.add_argument("--db", default=database.DB_PATH, help="資料庫檔案路徑 (預設: %(default)s)")
+    parser.add_argument("--lock-file", help="單一實例鎖定檔 (預設: <db>.scheduler.lock)")
+    parser.add_argument("--status-file", help="狀態與心跳檔 (預設: <db>.scheduler.json)")
+    parser.add_argument("--heartbeat", type=float, default=HEARTBEAT_INTERVAL,
+                        help="心跳間隔秒數 (預設: %(default)s)")
+    parser.add_argument("--resync", type=float, default=RESYNC_INTERVAL,
+                        help="重新讀取排程的間隔秒數 (預設: %(default)s)")
+    args = parser.parse_args(argv)
+
+    db_path = os.path.abspath(args.db)
+    return run(
+        db_path,
+        args.lock_file or default_lock_path(db_path),
+        args.status_file or default_status_path(db_path),
+        args.heartbeat,
+        args.resync,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+-- 最新結構快照 (對應 database.MIGRATIONS 的最後一個版本)
+-- 既有資料庫由 database.migrate_database() 依 PRAGMA user_version 逐版升級
 CREATE TABLE users (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         username TEXT UNIQUE NOT NULL,
@@ -6,22 +8,128 @@ CREATE TABLE users (
                         email TEXT NOT NULL,
                         role TEXT NOT NULL DEFAULT 'staff'
                     );
-CREATE TABLE sqlite_sequence(name,seq);
-CREATE TABLE requirements (
+-- 需求單本體：同一份需求單派發給多位員工時只存一份；列表以 body_id 取得標題
+CREATE TABLE requirement_bodies (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        title TEXT NOT NULL,
+                        title TEXT NOT NULL
+                    );
+-- 本體的大文字欄位：只在詳情視窗讀取，超過門檻的內容以 zlib 壓縮存成 BLOB
+CREATE TABLE requirement_texts (
+                        body_id INTEGER PRIMARY KEY,
                         description TEXT NOT NULL,
+                        attachment_path TEXT,
+                        FOREIGN KEY (body_id) REFERENCES requirement_bodies (id)
+                    );
+-- 每位接收者一列 (指派)：狀態、時間等精簡欄位，列表、篩選與調度器只查詢這個表格
+CREATE TABLE requirement_items (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        body_id INTEGER NOT NULL,
                         assigner_id INTEGER NOT NULL,
                         assignee_id INTEGER NOT NULL,
-                        status TEXT NOT NULL DEFAULT 'pending',
-                        priority TEXT NOT NULL DEFAULT 'normal',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        scheduled_time TIMESTAMP,
-                        is_dispatched INTEGER DEFAULT 1,
-                        completed_at TIMESTAMP,
-                        comment TEXT,
-                        is_deleted INTEGER DEFAULT 0,
-                        deleted_at TIMESTAMP,
+                        status INTEGER NOT NULL DEFAULT 1,
+                        priority INTEGER NOT NULL DEFAULT 0,
+                        is_dispatched INTEGER NOT NULL DEFAULT 1,
+                        is_deleted INTEGER NOT NULL DEFAULT 0,
+                        created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+                        scheduled_time INTEGER,
+                        completed_at INTEGER,
+                        deleted_at INTEGER,
+                        dispatched_by TEXT,
+                        FOREIGN KEY (body_id) REFERENCES requirement_bodies (id),
                         FOREIGN KEY (assigner_id) REFERENCES users (id),
                         FOREIGN KEY (assignee_id) REFERENCES users (id)
                     );
+-- 員工提交的完成說明與附件 (附件優先於本體的附件)，只有提交過的指派才有資料
+CREATE TABLE requirement_comments (
+                        requirement_id INTEGER PRIMARY KEY,
+                        comment TEXT,
+                        attachment_path TEXT,
+                        FOREIGN KEY (requirement_id) REFERENCES requirement_items (id)
+                    );
+CREATE INDEX idx_requirement_items_assignee_list
+                        ON requirement_items (assignee_id, is_dispatched, is_deleted, created_at);
+CREATE INDEX idx_requirement_items_assigner_list
+                        ON requirement_items (assigner_id, is_dispatched, is_deleted, created_at);
+CREATE INDEX idx_requirement_items_assigner_scheduled
+                        ON requirement_items (assigner_id, is_dispatched, scheduled_time)
+                        WHERE is_deleted = 0;
+CREATE INDEX idx_requirement_items_assigner_assignee
+                        ON requirement_items (assigner_id, assignee_id, is_dispatched, is_deleted, created_at);
+CREATE INDEX idx_requirement_items_assigner_deleted
+                        ON requirement_items (assigner_id, deleted_at)
+                        WHERE is_deleted = 1;
+CREATE INDEX idx_requirement_items_due
+                        ON requirement_items (scheduled_time)
+                        WHERE is_dispatched = 0 AND is_deleted = 0;
+CREATE INDEX idx_requirement_items_assigner_status
+                        ON requirement_items (assigner_id, is_dispatched, is_deleted, status, created_at);
+CREATE INDEX idx_requirement_items_assignee_status
+                        ON requirement_items (assignee_id, is_dispatched, is_deleted, status, created_at);
+CREATE INDEX idx_requirement_items_body ON requirement_items (body_id);
+-- 相容檢視表：與版本 5 的 requirements 表格欄位相同 (文字狀態、本地時間字串)，只供讀取；
+-- 壓縮儲存的內容與完成說明為 NULL，由 description_compressed / comment_compressed 標示
+CREATE VIEW requirements AS
+                        SELECT r.id, b.title AS title, CASE WHEN typeof(t.description) = 'blob' THEN NULL ELSE t.description END AS description, r.assigner_id, r.assignee_id,
+                               CASE r.status WHEN 0 THEN 'not_dispatched' WHEN 1 THEN 'pending' WHEN 2 THEN 'reviewing' WHEN 3 THEN 'completed' WHEN 4 THEN 'invalid' WHEN 5 THEN 'cancelled' ELSE r.status END AS status,
+                               CASE r.priority WHEN 1 THEN 'urgent' ELSE 'normal' END AS priority,
+                               datetime(r.created_at, 'unixepoch', 'localtime') AS created_at,
+                               datetime(r.scheduled_time, 'unixepoch', 'localtime') AS scheduled_time,
+                               r.is_dispatched,
+                               datetime(r.completed_at, 'unixepoch', 'localtime') AS completed_at,
+                               CASE WHEN typeof(c.comment) = 'blob' THEN NULL ELSE c.comment END AS comment, COALESCE(c.attachment_path, t.attachment_path) AS attachment_path, r.is_deleted,
+                               datetime(r.deleted_at, 'unixepoch', 'localtime') AS deleted_at,
+                               r.dispatched_by,
+                               (typeof(t.description) = 'blob') AS description_compressed,
+                               (typeof(c.comment) = 'blob') AS comment_compressed
+                        FROM requirement_items r
+                        JOIN requirement_bodies b ON b.id = r.body_id
+                        LEFT JOIN requirement_texts t ON t.body_id = r.body_id
+                        LEFT JOIN requirement_comments c ON c.requirement_id = r.id;
+CREATE TABLE change_counters (
+                        scope TEXT NOT NULL,
+                        owner_id INTEGER NOT NULL,
+                        version INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (scope, owner_id)
+                    ) WITHOUT ROWID;
+CREATE TRIGGER trg_requirements_changed_insert AFTER INSERT ON requirement_items
+BEGIN
+    INSERT INTO change_counters (scope, owner_id, version) VALUES ('assigner', NEW.assigner_id, 1) ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;
+    INSERT INTO change_counters (scope, owner_id, version) VALUES ('assignee', NEW.assignee_id, 1) ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER trg_requirements_changed_update AFTER UPDATE ON requirement_items
+BEGIN
+    INSERT INTO change_counters (scope, owner_id, version) VALUES ('assigner', NEW.assigner_id, 1) ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;
+    INSERT INTO change_counters (scope, owner_id, version) VALUES ('assignee', NEW.assignee_id, 1) ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER trg_requirements_changed_delete AFTER DELETE ON requirement_items
+BEGIN
+    INSERT INTO change_counters (scope, owner_id, version) VALUES ('assigner', OLD.assigner_id, 1) ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;
+    INSERT INTO change_counters (scope, owner_id, version) VALUES ('assignee', OLD.assignee_id, 1) ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER trg_requirements_changed_owner AFTER UPDATE OF assigner_id, assignee_id ON requirement_items
+BEGIN
+    INSERT INTO change_counters (scope, owner_id, version) VALUES ('assigner', OLD.assigner_id, 1) ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;
+    INSERT INTO change_counters (scope, owner_id, version) VALUES ('assignee', OLD.assignee_id, 1) ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER trg_users_changed_insert AFTER INSERT ON users
+BEGIN
+    INSERT INTO change_counters (scope, owner_id, version) VALUES ('users', 0, 1) ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER trg_users_changed_update AFTER UPDATE ON users
+BEGIN
+    INSERT INTO change_counters (scope, owner_id, version) VALUES ('users', 0, 1) ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;
+END;
+CREATE TRIGGER trg_users_changed_delete AFTER DELETE ON users
+BEGIN
+    INSERT INTO change_counters (scope, owner_id, version) VALUES ('users', 0, 1) ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;
+END;
+-- 全文索引 (FTS5)：不保存文字的 (contentless) 索引，內容是 database.search_text() 轉換後的文字
+-- (解壓縮、中日韓文字拆成兩字一組)，由程式寫入需求單文字時在同一個交易中更新；
+-- 以 sqlite3 命令列工具等外部工具修改需求單文字後，以 python maintenance.py rebuild-search 重建
+CREATE VIRTUAL TABLE requirement_body_search USING fts5 (
+            title, description, content = '', prefix = '1'
+        );
+CREATE VIRTUAL TABLE requirement_comment_search USING fts5 (
+            comment, content = '', prefix = '1'
+        );
+PRAGMA user_version = 11;
@@ -0,0 +1,234 @@
+import bisect
+import re
+import threading
+from sqlite3 import Error
+
+from database import get_staff_profiles, get_change_version, add_user_listener
+
+# 員工過濾選單中「不限員工」的選項
+ALL_STAFF_LABEL = "全部員工"
+
+# 建立前綴索引時用來切分姓名、帳號與 Email 的字元
+_TOKEN_SEPARATORS = re.compile(r"[\s@._\-]+")
+
+
+class StaffSearchIndex:
+    """員工的前綴與子字串索引 (姓名、帳號、Email，不分大小寫)
+
+    - 前綴: 各欄位及其中的單字 (以空白、@、.、_、- 切分) 排序後以二分搜尋查詢
+    - 子字串: 所有員工的欄位依姓名順序串成一個字串，以 str.find 掃描，再以各員工
+      的起始位置 (二分搜尋) 對應回員工ID，找到足夠筆數即停止
+    數千名員工時每次按鍵都能在 1 毫秒內回應。
+    """
+
+    # 串接字串中欄位與員工之間的分隔字元，不會出現在查詢中
+    _FIELD_SEPARATOR = "\x00"
+    _STAFF_SEPARATOR = "\n"
+
+    def __init__(self, profiles=()):
+        """
+        Args:
+            profiles: [(id, name, username, email), ...]
+        """
+        self._rank = {}
+        self._texts = {}
+        self._prefixes = []
+        for profile in profiles:
+            self._prefixes.extend(self._index(*profile))
+        self._prefixes.sort()
+        self._build_text()
+
+    def __len__(self):
+        return len(self._rank)
+
+    def add(self, staff_id, name, username, email):
+        """加入一名員工 (重複加入同一ID會被忽略)"""
+        if staff_id in self._rank:
+            return
+        for entry in self._index(staff_id, name, username, email):
+            bisect.insort(self._prefixes, entry)
+        # 串接字串在下次搜尋時才重建
+        self._text = None
+
+    def search(self, query, limit=20):
+        """回傳最符合的員工ID列表
+
+        排序: 先是某個欄位或單字以查詢開頭的員工，再來是其他包含查詢的員工
+        (依姓名排序)；查詢為空時依姓名列出前 limit 名。
+        """
+        if self._text is None:
+            self._build_text()
+        query = query.strip().casefold()
+        if not query:
+            return self._ordered_ids[:limit]
+
+        results = []
+        seen = set()
+        index = bisect.bisect_left(self._prefixes, (query,))
+        while index < len(self._prefixes) and len(results) < limit:
+            token, staff_id = self._prefixes[index]
+            if not token.startswith(query):
+                break
+            if staff_id not in seen:
+                seen.add(staff_id)
+                results.append(staff_id)
+            index += 1
+
+        text = self._text
+        position = text.find(query)
+        while position != -1 and len(results) < limit:
+            index = bisect.bisect_right(self._starts, position) - 1
+            staff_id = self._ordered_ids[index]
+            if staff_id not in seen:
+                seen.add(staff_id)
+                results.append(staff_id)
+            # 同一名員工只需要找到一次，直接跳到下一名員工
+            next_start = self._starts[index + 1] if index + 1 < len(self._starts) else len(text)
+            position = text.find(query, next_start)
+        return results
+
+    def _index(self, staff_id, name, username, email):
+        """記錄一名員工的欄位與排序鍵，回傳前綴索引項目"""
+        fields = [field.casefold() for field in (name, username, email) if field]
+        self._rank[staff_id] = ((name or "").casefold(), staff_id)
+        self._texts[staff_id] = self._FIELD_SEPARATOR.join(fields)
+        tokens = set(fields)
+        for field in fields:
+            tokens.update(token for token in _TOKEN_SEPARATORS.split(field) if token)
+        return [(token, staff_id) for token in tokens]
+
+    def _build_text(self):
+        """依姓名順序重建串接字串與各員工的起始位置"""
+        self._ordered_ids = [staff_id for _, staff_id in sorted(self._rank.values())]
+        self._starts = []
+        position = 0
+        for staff_id in self._ordered_ids:
+            self._starts.append(position)
+            position += len(self._texts[staff_id]) + len(self._STAFF_SEPARATOR)
+        self._text = self._STAFF_SEPARATOR.join(self._texts[staff_id] for staff_id in self._ordered_ids)
+
+
+class StaffDirectory:
+    """員工名錄：在記憶體中保存員工 ID 與姓名的對照與搜尋索引，供所有員工選單共用
+
+    第一次使用時從資料庫載入一次；本程序以 add_user 註冊的員工直接加入名錄，
+    不必重新查詢。其他程序 (例如另一台電腦) 對 users 的修改由 refresh()
+    透過 users 的變更計數器得知，這時才整份重新載入。
+    名錄內容每次改變 version 都會增加，介面可據此判斷選單是否需要更新。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 依ID排序的 [(id, name, username, email), ...]
+        self._profiles = []
+        self._staff = []
+        self._names = {}
+        self._labels = {}
+        self._index = StaffSearchIndex()
+        # 名錄對應的 users 變更計數器值；None 表示尚未載入
+        self._users_version = None
+        self.version = 0
+
+    @staticmethod
+    def format_label(staff_id, name):
+        """選單中顯示的員工文字"""
+        return f"{name} (ID:{staff_id})"
+
+    @property
+    def loaded(self):
+        return self._users_version is not None
+
+    def ensure_loaded(self, conn):
+        """尚未載入時從資料庫載入，回傳是否可用"""
+        if not self.loaded:
+            self.refresh(conn)
+        return self.loaded
+
+    def refresh(self, conn):
+        """users 有變更時重新載入 (一次主鍵查詢即可判斷)
+
+        Returns:
+            bool: 名錄內容是否改變；讀取失敗時回傳 None
+        """
+        users_version = get_change_version(conn, 'users')
+        if users_version is None:
+            return None
+        if users_version == self._users_version:
+            return False
+        try:
+            profiles = [tuple(row) for row in get_staff_profiles(conn)]
+        except Error as e:
+            print(f"載入員工名錄時發生錯誤: {e}")
+            return None
+        changed = profiles != self._profiles
+        # 索引在鎖外建立，完成後才替換
+        index = StaffSearchIndex(profiles) if changed else None
+        with self._lock:
+            if changed:
+                self._set_profiles(profiles, index)
+            self._users_version = users_version
+            return changed
+
+    def on_user_added(self, user, users_version):
+        """add_user 的監聽者：新員工直接加入名錄與搜尋索引"""
+        user_id, username, name, email, role = user
+        with self._lock:
+            if not self.loaded:
+                return
+            if role == 'staff' and user_id not in self._names:
+                self._index.add(user_id, name, username, email)
+                self._set_profiles(self._profiles + [(user_id, name, username, email)], self._index)
+            # 只有這次新增的變更時才更新計數器；否則留給 refresh() 整份重新載入
+            if users_version == self._users_version + 1:
+                self._users_version = users_version
+
+    def search(self, query, limit=20):
+        """依姓名、帳號或 Email 搜尋員工，回傳最符合的 [(id, name), ...]"""
+        with self._lock:
+            return [(staff_id, self._names[staff_id]) for staff_id in self._index.search(query, limit)]
+
+    def search_labels(self, query, limit=20):
+        """搜尋員工並回傳選單文字"""
+        return [self.format_label(staff_id, name) for staff_id, name in self.search(query, limit)]
+
+    def staff(self):
+        """所有員工 [(id, name), ...]，依ID排序"""
+        return list(self._staff)
+
+    def labels(self):
+        """所有員工的選單文字，順序與 staff() 相同"""
+        return [self.format_label(staff_id, name) for staff_id, name in self._staff]
+
+    def name_of(self, staff_id):
+        return self._names.get(staff_id)
+
+    def label_of(self, staff_id):
+        name = self._names.get(staff_id)
+        return None if name is None else self.format_label(staff_id, name)
+
+    def id_for_label(self, label):
+        """由選單文字取得員工ID；「全部員工」或找不到時回傳 None"""
+        return self._labels.get(label)
+
+    def _set_profiles(self, profiles, index):
+        """替換名錄內容 (呼叫時需持有 self._lock)；以新物件替換，讀取端不需加鎖"""
+        self._profiles = profiles
+        self._staff = [(staff_id, name) for staff_id, name, _, _ in profiles]
+        self._names = dict(self._staff)
+        self._labels = {self.format_label(staff_id, name): staff_id for staff_id, name in self._staff}
+        self._index = index
+        self.version += 1
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_staff_directory():
+    """取得程序共用的員工名錄"""
+    global _directory
+    with _directory_lock:
+        if _directory is None:
+            _directory = StaffDirectory()
+            add_user_listener(_directory.on_user_added)
+        return _directory
@@ -0,0 +1,454 @@
+import datetime
+import sqlite3
+import threading
+
+import pytest
+
+import database
+
+ADMIN_ID, STAFF_ID, OTHER_STAFF_ID = 1, 2, 3
+
+USERS = [
+    (ADMIN_ID, 'admin', 'admin123', '王爺', 'admin@example.com', 'admin'),
+    (STAFF_ID, 'staff1', 'staff123', '李四', 'staff1@example.com', 'staff'),
+    (OTHER_STAFF_ID, 'staff2', 'staff123', '王五', 'staff2@example.com', 'staff'),
+]
+
+# 最早 (未版本化) 的資料庫結構：還沒有完成說明、附件與刪除相關的欄位
+LEGACY_SCHEMA = '''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        role TEXT NOT NULL DEFAULT 'staff'
+    );
+    CREATE TABLE requirements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT NOT NULL,
+        assigner_id INTEGER NOT NULL,
+        assignee_id INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        priority TEXT NOT NULL DEFAULT 'normal',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        scheduled_time TIMESTAMP,
+        is_dispatched INTEGER DEFAULT 1,
+        FOREIGN KEY (assigner_id) REFERENCES users (id),
+        FOREIGN KEY (assignee_id) REFERENCES users (id)
+    );
+'''
+
+LONG_DESCRIPTION = "請依照附件格式整理每月的報表並核對金額。" * 100
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """查詢快取是模組層級的，每個測試的資料庫都從 ID 1 開始，前後都要清空"""
+    database.clear_query_cache()
+    yield
+    database.clear_query_cache()
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'test.db')
+
+@pytest.fixture
+def conn(db_path):
+    """最新結構的資料庫，有一位管理員與兩位員工"""
+    conn = database.open_connection(db_path)
+    database.migrate_database(conn)
+    with conn:
+        conn.executemany(
+            "INSERT INTO users (id, username, password, name, email, role) VALUES (?, ?, ?, ?, ?, ?)",
+            USERS)
+    yield conn
+    conn.close()
+
+def count_rows(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def search_ids(conn, query, assigner_id=None, assignee_id=None):
+    if assignee_id is None:
+        assigner_id = assigner_id or ADMIN_ID
+    return [result.requirement.id for result in
+            database.search_requirements(conn, query, assigner_id=assigner_id, assignee_id=assignee_id)]
+
+def create_legacy_database(db_path):
+    """建立未版本化的舊資料庫；前兩筆是同一次派發給兩位員工"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany(
+        "INSERT INTO users (id, username, password, name, email, role) VALUES (?, ?, ?, ?, ?, ?)",
+        USERS)
+    conn.executemany('''
+        INSERT INTO requirements (id, title, description, assigner_id, assignee_id, status,
+                                  priority, created_at, scheduled_time, is_dispatched)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (1, '月報整理', LONG_DESCRIPTION, ADMIN_ID, STAFF_ID, 'pending', 'urgent',
+         '2024-01-02 09:00:00', None, 1),
+        (2, '月報整理', LONG_DESCRIPTION, ADMIN_ID, OTHER_STAFF_ID, 'completed', 'urgent',
+         '2024-01-02 09:00:00', None, 1),
+        (3, '採購清單', '列出下季需要的文具', ADMIN_ID, STAFF_ID, 'not_dispatched', 'normal',
+         '2024-01-03 10:00:00', '2099-01-01 08:00:00', 0),
+    ])
+    conn.commit()
+    conn.close()
+
+def test_migrate_legacy_database(db_path):
+    """由未版本化的舊資料庫升級到最新結構，資料完整保留"""
+    create_legacy_database(db_path)
+    conn = database.open_connection(db_path)
+    try:
+        assert database.get_schema_version(conn) == 0
+        assert database.migrate_database(conn) == database.SCHEMA_VERSION
+
+        assert count_rows(conn, 'users') == 3
+        assert count_rows(conn, 'requirement_items') == 3
+        assert count_rows(conn, 'requirements') == 3
+        # 同一次派發的兩筆合併為一份本體
+        assert count_rows(conn, 'requirement_bodies') == 2
+        assert count_rows(conn, 'requirement_texts') == 2
+
+        requirement = database.get_requirement_by_id(conn, 2)
+        assert requirement.title == '月報整理'
+        assert requirement.description == LONG_DESCRIPTION
+        assert requirement.status == 'completed'
+        assert requirement.priority == 'urgent'
+        assert requirement.assignee_name == '王五'
+        assert requirement.created_at == datetime.datetime(2024, 1, 2, 9, 0)
+        scheduled = database.get_requirement_by_id(conn, 3)
+        assert scheduled.status == 'not_dispatched'
+        assert scheduled.scheduled_time == datetime.datetime(2099, 1, 1, 8, 0)
+
+        # 升級前的內容由維護命令改為壓縮儲存，讀出的內容不變
+        assert database.compress_requirement_texts(conn) == 1
+        database.clear_query_cache()
+        stored = conn.execute("SELECT description FROM requirement_texts WHERE body_id = 1").fetchone()[0]
+        assert isinstance(stored, bytes)
+        assert database.get_requirement_by_id(conn, 1).description == LONG_DESCRIPTION
+
+        # 既有資料在升級時建立了全文索引；未發派的預約不在搜尋範圍內
+        assert search_ids(conn, '核對') == [2, 1]
+        assert search_ids(conn, '核對', assignee_id=OTHER_STAFF_ID) == [2]
+        assert search_ids(conn, '文具') == []
+    finally:
+        conn.close()
+
+def test_migrate_twice_changes_nothing(db_path):
+    """已是最新版本的資料庫再執行遷移不會改變結構"""
+    create_legacy_database(db_path)
+    conn = database.open_connection(db_path)
+    try:
+        database.migrate_database(conn)
+        schema = conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+        assert database.migrate_database(conn) == database.SCHEMA_VERSION
+        assert conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == schema
+    finally:
+        conn.close()
+
+def test_broadcast_stores_one_body(conn):
+    """派發給多位員工的需求單只存一份標題與內容，每位員工一列指派"""
+    assert database.create_requirements_bulk(
+        conn, '月報整理', LONG_DESCRIPTION, ADMIN_ID, [STAFF_ID, OTHER_STAFF_ID],
+        attachment_path='uploads/report.xlsx') == 2
+
+    assert count_rows(conn, 'requirement_bodies') == 1
+    assert count_rows(conn, 'requirement_texts') == 1
+    assert count_rows(conn, 'requirement_items') == 2
+    assert conn.execute("SELECT COUNT(DISTINCT body_id) FROM requirement_items").fetchone()[0] == 1
+
+    first, second = (database.get_requirement_by_id(conn, req_id) for req_id in (1, 2))
+    assert (first.assignee_id, second.assignee_id) == (STAFF_ID, OTHER_STAFF_ID)
+    for requirement in (first, second):
+        assert requirement.title == '月報整理'
+        assert requirement.description == LONG_DESCRIPTION
+        assert requirement.attachment_path == 'uploads/report.xlsx'
+        assert requirement.status == 'pending'
+
+def test_broadcast_assignments_change_independently(conn):
+    """一位員工的提交、審核與刪除不影響共用同一份本體的其他員工"""
+    database.create_requirements_bulk(
+        conn, '月報整理', '整理每月的報表', ADMIN_ID, [STAFF_ID, OTHER_STAFF_ID],
+        attachment_path='uploads/report.xlsx')
+    mine, other = 1, 2
+
+    assert database.submit_requirement(conn, mine, '已核對完成', 'uploads/result.xlsx')
+    submitted = database.get_requirement_by_id(conn, mine)
+    untouched = database.get_requirement_by_id(conn, other)
+    assert (submitted.status, submitted.comment) == ('reviewing', '已核對完成')
+    assert submitted.attachment_path == 'uploads/result.xlsx'
+    assert submitted.completed_at is not None
+    assert (untouched.status, untouched.comment, untouched.completed_at) == ('pending', None, None)
+    assert untouched.attachment_path == 'uploads/report.xlsx'
+
+    assert database.approve_requirement(conn, mine)
+    assert database.delete_requirement(conn, mine)
+    assert database.get_requirement_by_id(conn, mine).deleted_at is not None
+    untouched = database.get_requirement_by_id(conn, other)
+    assert untouched.status == 'pending'
+    assert untouched.deleted_at is None
+    assert untouched.description == '整理每月的報表'
+    assert database.count_user_requirements(conn, OTHER_STAFF_ID) == 1
+    assert database.count_user_requirements(conn, STAFF_ID) == 0
+
+    # 另一位員工之後提交，各自保留自己的完成說明
+    assert database.submit_requirement(conn, other, '報表已寄出')
+    assert database.get_requirement_by_id(conn, other).comment == '報表已寄出'
+    assert database.get_requirement_by_id(conn, mine).comment == '已核對完成'
+
+def test_broadcast_compat_view(conn):
+    """舊格式的 requirements 檢視表中，每位員工仍各有一列完整的需求單"""
+    database.create_requirements_bulk(
+        conn, '月報整理', '整理每月的報表', ADMIN_ID, [STAFF_ID, OTHER_STAFF_ID])
+    database.submit_requirement(conn, 1, '已核對完成')
+    rows = conn.execute(
+        "SELECT id, title, description, assignee_id, status, comment FROM requirements ORDER BY id").fetchall()
+    assert rows == [
+        (1, '月報整理', '整理每月的報表', STAFF_ID, 'reviewing', '已核對完成'),
+        (2, '月報整理', '整理每月的報表', OTHER_STAFF_ID, 'pending', None),
+    ]
+
+DUE_COUNT = 200
+
+@pytest.fixture
+def due_ids(conn):
+    """200 筆已到期的預約需求單 (另有一筆明天才到期)，回傳到期的需求單ID"""
+    past = datetime.datetime.now() - datetime.timedelta(minutes=5)
+    for i in range(DUE_COUNT):
+        database.create_requirement(conn, f'盤點 #{i}', '清點倉庫存貨', ADMIN_ID,
+                                    (STAFF_ID, OTHER_STAFF_ID)[i % 2], scheduled_time=past)
+    database.create_requirement(conn, '下週會議', '準備會議資料', ADMIN_ID, STAFF_ID,
+                                scheduled_time=datetime.datetime.now() + datetime.timedelta(days=1))
+    return list(range(1, DUE_COUNT + 1))
+
+def claim_concurrently(db_path, workers=4):
+    """多個調度器 (各自的連接) 同時認領，回傳 {調度器名稱: 認領的需求單ID}"""
+    barrier = threading.Barrier(workers)
+    claimed, errors = {}, []
+
+    def worker(name):
+        conn = database.open_connection(db_path)
+        try:
+            barrier.wait()
+            claimed[name] = database.claim_due_requirements(conn, name)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=worker, args=(f'scheduler-{i}',)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    return claimed
+
+def assert_claimed_once(conn, claimed, due_ids):
+    assert sorted(req_id for req_ids in claimed.values() for req_id in req_ids) == due_ids
+    for name, req_ids in claimed.items():
+        for req_id in req_ids:
+            assert conn.execute("SELECT dispatched_by, is_dispatched FROM requirement_items WHERE id = ?",
+                                (req_id,)).fetchone() == (name, 1)
+    # 尚未到期的預約不被認領
+    assert conn.execute("SELECT dispatched_by, is_dispatched FROM requirement_items WHERE id = ?",
+                        (DUE_COUNT + 1,)).fetchone() == (None, 0)
+    assert database.claim_due_requirements(conn, 'late') == []
+
+def test_each_due_requirement_is_claimed_once(conn, db_path, due_ids):
+    """多個調度器同時發派時，每筆到期的預約只被其中一個認領"""
+    assert_claimed_once(conn, claim_concurrently(db_path), due_ids)
+
+def test_claim_without_returning(conn, db_path, due_ids, monkeypatch):
+    """不支援 RETURNING 的舊版 SQLite 以寫入鎖保證同樣的結果"""
+    monkeypatch.setattr(database, '_HAS_RETURNING', False)
+    assert_claimed_once(conn, claim_concurrently(db_path), due_ids)
+
+def test_claimed_requirement_becomes_pending(conn, due_ids):
+    """發派後的需求單出現在員工的列表中，狀態為未完成"""
+    assert sorted(database.dispatch_scheduled_requirements(conn, 'scheduler')) == due_ids
+    requirement = database.get_requirement_by_id(conn, due_ids[0], assignee_id=STAFF_ID)
+    assert requirement.status == 'pending'
+    assert database.count_user_requirements(conn, STAFF_ID) == DUE_COUNT // 2
+
+def test_claim_raises_while_locked(conn, db_path, due_ids):
+    """寫入鎖被佔用時認領拋出錯誤 (調度器據此重試)，鎖釋放後同一批仍可發派"""
+    blocker = database.open_connection(db_path)
+    blocker.execute("PRAGMA busy_timeout = 0")
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("PRAGMA busy_timeout = 0")
+        with pytest.raises(sqlite3.OperationalError):
+            database.claim_due_requirements(conn, 'scheduler')
+        assert database.dispatch_scheduled_requirements(conn, 'scheduler') == []
+    finally:
+        blocker.rollback()
+        blocker.close()
+    assert sorted(database.claim_due_requirements(conn, 'scheduler')) == due_ids
+
+def change_trigger_sql(table, name, event, row):
+    """版本 5 發布時的變更計數器觸發器 (之後的遷移在新表格上重建相同的觸發器)"""
+    bump = ("INSERT INTO change_counters (scope, owner_id, version) VALUES ('{0}', {1}, 1) "
+            "ON CONFLICT (scope, owner_id) DO UPDATE SET version = version + 1;")
+    return (f"CREATE TRIGGER {name} {event} ON {table}\n"
+            f"BEGIN\n"
+            f"    {bump.format('assigner', f'{row}.assigner_id')}\n"
+            f"    {bump.format('assignee', f'{row}.assignee_id')}\n"
+            f"END")
+
+CHANGE_TRIGGERS = [
+    ('trg_requirements_changed_delete', 'AFTER DELETE', 'OLD'),
+    ('trg_requirements_changed_insert', 'AFTER INSERT', 'NEW'),
+    ('trg_requirements_changed_owner', 'AFTER UPDATE OF assigner_id, assignee_id', 'OLD'),
+    ('trg_requirements_changed_update', 'AFTER UPDATE', 'NEW'),
+]
+
+@pytest.mark.parametrize('version, table', [(5, 'requirements'), (8, 'requirement_items'),
+                                            (database.SCHEMA_VERSION, 'requirement_items')])
+def test_change_triggers_are_frozen(db_path, version, table):
+    """已發布的遷移產生的變更計數器觸發器與發布時相同"""
+    conn = database.open_connection(db_path)
+    try:
+        database.migrate_database(conn, target_version=version)
+        triggers = conn.execute('''
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'trigger' AND name LIKE 'trg_requirements_changed_%' ORDER BY name
+        ''').fetchall()
+        assert triggers == [(name, change_trigger_sql(table, name, event, row))
+                            for name, event, row in CHANGE_TRIGGERS]
+    finally:
+        conn.close()
+
+def test_compat_view_hides_compressed_text(db_path):
+    """版本 10 起相容檢視表以 NULL 與標示欄位取代壓縮過的文字；之前的版本不變"""
+    conn = database.open_connection(db_path)
+    try:
+        database.migrate_database(conn, target_version=9)
+        with conn:
+            conn.executemany(
+                "INSERT INTO users (id, username, password, name, email, role) VALUES (?, ?, ?, ?, ?, ?)",
+                USERS)
+        database.create_requirement(conn, '月報整理', LONG_DESCRIPTION, ADMIN_ID, STAFF_ID)
+        database.create_requirement(conn, '採購清單', '列出下季需要的文具', ADMIN_ID, STAFF_ID)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(requirements)")]
+        assert columns[-1] == 'dispatched_by'
+        assert isinstance(conn.execute("SELECT description FROM requirements WHERE id = 1").fetchone()[0], bytes)
+
+        database.migrate_database(conn)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(requirements)")]
+        assert columns[-3:] == ['dispatched_by', 'description_compressed', 'comment_compressed']
+        assert conn.execute(
+            "SELECT id, description, description_compressed, comment, comment_compressed "
+            "FROM requirements ORDER BY id").fetchall() == [
+            (1, None, 1, None, 0),
+            (2, '列出下季需要的文具', 0, None, 0),
+        ]
+        assert database.get_requirement_by_id(conn, 1).description == LONG_DESCRIPTION
+    finally:
+        conn.close()
+
+@pytest.fixture
+def search_conn(conn):
+    """有兩筆已發派需求單的資料庫 (ID 1 給員工一，ID 2 給員工二)"""
+    database.create_requirement(conn, '月報整理', '整理每月的報表', ADMIN_ID, STAFF_ID)
+    database.create_requirement(conn, '採購清單', '列出下季需要的文具', ADMIN_ID, OTHER_STAFF_ID)
+    return conn
+
+def test_new_requirement_is_searchable(search_conn):
+    """建立需求單時同時寫入全文索引，搜尋範圍限於發派者或接收者"""
+    assert search_ids(search_conn, '報表') == [1]
+    assert search_ids(search_conn, '文具') == [2]
+    assert search_ids(search_conn, '報表', assignee_id=OTHER_STAFF_ID) == []
+
+def test_search_follows_submit_and_reject(search_conn):
+    """完成說明的索引隨提交、退回與再次提交更新"""
+    assert database.submit_requirement(search_conn, 1, '已核對完成')
+    assert search_ids(search_conn, '核對') == [1]
+
+    # 退回時清除完成說明，索引中也一併刪除
+    assert database.reject_requirement(search_conn, 1)
+    assert search_ids(search_conn, '核對') == []
+
+    # 再次提交不同的說明 (超過門檻，壓縮儲存)
+    comment = "補上遺漏的發票影本。" * 200
+    assert database.submit_requirement(search_conn, 1, comment)
+    stored = search_conn.execute("SELECT comment FROM requirement_comments WHERE requirement_id = 1").fetchone()[0]
+    assert isinstance(stored, bytes)
+    assert search_ids(search_conn, '發票') == [1]
+    assert search_ids(search_conn, '核對') == []
+
+def test_search_index_matches_rebuild(search_conn):
+    """逐筆更新的索引與重建後的索引內容相同"""
+    database.submit_requirement(search_conn, 1, '已核對完成')
+    database.reject_requirement(search_conn, 1)
+    database.submit_requirement(search_conn, 1, '補上發票')
+
+    def vocabulary():
+        rows = []
+        for table in ('requirement_body_search', 'requirement_comment_search'):
+            search_conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS temp.{table}_vocab "
+                                f"USING fts5vocab(main, {table}, instance)")
+            rows.append(search_conn.execute(f"SELECT * FROM temp.{table}_vocab ORDER BY 1, 2, 3, 4").fetchall())
+        return rows
+
+    incremental = vocabulary()
+    assert database.rebuild_search_index(search_conn) == (2, 1)
+    assert vocabulary() == incremental
+
+def test_external_writer_and_rebuild(search_conn, db_path):
+    """外部工具 (沒有本程式註冊的函式) 可以修改需求單文字，重建索引後才搜尋得到"""
+    external = sqlite3.connect(db_path)
+    with external:
+        external.execute("UPDATE requirement_texts SET description = '整理每季的預算'")
+    external.close()
+    assert search_ids(search_conn, '預算') == []
+
+    assert database.rebuild_search_index(search_conn) == (2, 0)
+    assert search_ids(search_conn, '預算') == [2, 1]
+    assert search_ids(search_conn, '報表') == []
+
+def test_clear_all_empties_search_index(search_conn):
+    database.submit_requirement(search_conn, 1, '已核對完成')
+    assert database.clear_all_requirements_DANGEROUS(search_conn)
+    assert search_ids(search_conn, '報表') == []
+    for table in ('requirement_body_search', 'requirement_comment_search'):
+        assert count_rows(search_conn, table) == 0
+
+def test_upgrade_removes_search_triggers(db_path):
+    """版本 9 以觸發器維護索引 (外部工具寫入會失敗)，升級後移除觸發器並保留搜尋結果"""
+    conn = database.open_connection(db_path)
+    try:
+        database.migrate_database(conn, target_version=8)
+        with conn:
+            conn.executemany(
+                "INSERT INTO users (id, username, password, name, email, role) VALUES (?, ?, ?, ?, ?, ?)",
+                USERS)
+            conn.execute("INSERT INTO requirement_bodies (id, title) VALUES (1, '月報整理')")
+            conn.execute("INSERT INTO requirement_texts (body_id, description) VALUES (1, '整理每月的報表')")
+            conn.execute("INSERT INTO requirement_items (id, body_id, assigner_id, assignee_id) VALUES (1, 1, ?, ?)",
+                         (ADMIN_ID, STAFF_ID))
+            conn.execute("INSERT INTO requirement_comments (requirement_id, comment) VALUES (1, '已核對完成')")
+        database.migrate_database(conn, target_version=9)
+    finally:
+        conn.close()
+
+    external = sqlite3.connect(db_path)
+    with pytest.raises(sqlite3.OperationalError, match='search_text'):
+        external.execute("UPDATE requirement_texts SET description = '整理每季的預算'")
+    external.close()
+
+    conn = database.open_connection(db_path)
+    try:
+        assert database.migrate_database(conn) == database.SCHEMA_VERSION
+        assert conn.execute("SELECT name FROM sqlite_master WHERE sql LIKE '%search_text%'").fetchall() == []
+        assert search_ids(conn, '報表') == [1]
+        assert search_ids(conn, '核對') == [1]
+    finally:
+        conn.close()
+
+    external = sqlite3.connect(db_path)
+    with external:
+        external.execute("UPDATE requirement_texts SET description = '整理每季的預算'")
+    external.close()
@@ -0,0 +1,237 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTreeview(ttk.Treeview):
+    """只建立可見範圍列項目的 Treeview
+
+    所有列以 (iid, values, tags) 保存在 Python 列表中，Treeview 本身只放
+    目前視窗內的列，捲動時移動視窗並重用項目；數萬筆資料時建立與捲動的成本
+    只和可見列數有關。可以直接取代 ttk.Treeview：欄位、標題、標籤、選取與
+    雙擊等用法不變，資料則改用 set_rows() 設定。
+    """
+
+    # 無法從樣式取得列高時使用的預設值 (像素)
+    DEFAULT_ROW_HEIGHT = 20
+
+    def __init__(self, master=None, **kw):
+        # 捲動由本類別自行處理，不交給 Tk 的 yscrollcommand
+        self._yscrollcommand = kw.pop('yscrollcommand', None)
+        super().__init__(master, **kw)
+        self._rows = []
+        self._positions = {}
+        self._offset = 0
+        self._visible = int(kw.get('height', 10))
+        self._total_hint = None
+        self._has_more = False
+        self._loading = False
+        self._selected = set()
+        # 需要更多資料時呼叫 (由使用者設定，例如載入下一頁)
+        self.need_rows = None
+
+        self.bind("<Configure>", self._on_configure, add="+")
+        self.bind("<MouseWheel>", self._on_mousewheel, add="+")
+        self.bind("<Button-4>", lambda event: self._scroll_by(-3), add="+")
+        self.bind("<Button-5>", lambda event: self._scroll_by(3), add="+")
+        self.bind("<Up>", lambda event: self._move_selection(-1), add="+")
+        self.bind("<Down>", lambda event: self._move_selection(1), add="+")
+        self.bind("<Prior>", lambda event: self._move_selection(-self._visible), add="+")
+        self.bind("<Next>", lambda event: self._move_selection(self._visible), add="+")
+
+    def configure(self, cnf=None, **kw):
+        if 'yscrollcommand' in kw:
+            self._yscrollcommand = kw.pop('yscrollcommand')
+            self._update_scrollbar()
+            if not kw and cnf is None:
+                return None
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    # ---- 資料 ----
+
+    @property
+    def row_count(self):
+        """已載入的列數"""
+        return len(self._rows)
+
+    @property
+    def total(self):
+        """捲軸使用的總列數：已知總數時使用總數，否則以已載入列數估計"""
+        if not self._has_more:
+            return len(self._rows)
+        return max(self._total_hint or 0, len(self._rows) + 1)
+
+    def set_total(self, total, has_more):
+        """設定資料總筆數 (None 表示未知) 與是否還有未載入的資料"""
+        self._total_hint = total
+        self._has_more = has_more
+
+    def set_rows(self, rows, append=False):
+        """設定列資料並重繪可見範圍
+
+        Args:
+            rows: [(iid, values, tags), ...]，依顯示順序排列
+            append: True 表示接在已載入的列之後，False 表示取代全部資料
+        """
+        rows = [(str(iid), tuple(values), tuple(tags)) for iid, values, tags in rows]
+        if append:
+            start = len(self._rows)
+            self._rows.extend(rows)
+        else:
+            start = 0
+            self._rows = rows
+            self._positions = {}
+        for index, (iid, _, _) in enumerate(rows, start):
+            self._positions[iid] = index
+        self._render()
+
+    def set_loading(self, loading):
+        """顯示或隱藏列表末端的「載入中」提示列"""
+        if self._loading != loading:
+            self._loading = loading
+            self._render()
+
+    def window_end(self):
+        """目前視窗最後一列的位置 (不超過已載入的列數)"""
+        return min(len(self._rows), self._offset + self._visible + 1)
+
+    def missing_rows(self):
+        """要顯示目前視窗還需要載入的列數"""
+        return max(0, self._offset + self._visible + 1 - len(self._rows))
+
+    # ---- 捲動 ----
+
+    def yview(self, *args):
+        """捲軸介面：無參數時回傳 (first, last)，否則處理 moveto / scroll"""
+        if not args:
+            return self._fractions()
+        if args[0] == 'moveto':
+            self._set_offset(int(round(float(args[1]) * self.total)))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self._visible
+            self._set_offset(self._offset + amount)
+        return None
+
+    def yview_moveto(self, fraction):
+        self.yview('moveto', fraction)
+
+    def yview_scroll(self, number, what):
+        self.yview('scroll', number, what)
+
+    def see(self, item):
+        """捲動到指定的列"""
+        index = self._positions.get(str(item))
+        if index is None:
+            return
+        if index < self._offset:
+            self._set_offset(index)
+        elif index >= self._offset + self._visible:
+            self._set_offset(index - self._visible + 1)
+        if super().exists(item):
+            super().see(item)
+
+    def _fractions(self):
+        total = self.total
+        if total <= 0:
+            return (0.0, 1.0)
+        first = self._offset / total
+        last = min(1.0, (self._offset + self._visible) / total)
+        return (first, last)
+
+    def _set_offset(self, offset):
+        offset = max(0, min(offset, max(0, self.total - self._visible)))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _scroll_by(self, amount):
+        self._set_offset(self._offset + amount)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        # Windows 每格 120，macOS 為較小的整數
+        step = -int(event.delta / 120) if abs(event.delta) >= 120 else -int(event.delta)
+        return self._scroll_by(step * 3)
+
+    def _on_configure(self, event):
+        row_height = self._row_height()
+        # 扣掉標題列的高度
+        visible = max(1, (event.height - row_height - 4) // row_height)
+        if visible != self._visible:
+            self._visible = visible
+            self._render()
+
+    def _row_height(self):
+        try:
+            value = ttk.Style(self).lookup(self.cget('style') or 'Treeview', 'rowheight')
+            return int(value) if value else self.DEFAULT_ROW_HEIGHT
+        except (tk.TclError, TypeError, ValueError):
+            return self.DEFAULT_ROW_HEIGHT
+
+    def _move_selection(self, delta):
+        """方向鍵與翻頁鍵：依完整資料移動選取，必要時捲動視窗"""
+        if not self._rows:
+            return "break"
+        focus = super().focus()
+        index = self._positions.get(focus, self._offset - 1 if delta > 0 else self._offset)
+        index = max(0, min(len(self._rows) - 1, index + delta))
+        iid = self._rows[index][0]
+        self._selected = set()
+        self.see(iid)
+        if super().exists(iid):
+            self.selection_set(iid)
+            self.focus(iid)
+        return "break"
+
+    # ---- 繪製 ----
+
+    def _render(self):
+        """只把視窗範圍內的列放進 Treeview，並維持選取狀態"""
+        if self._offset > max(0, self.total - self._visible):
+            self._offset = max(0, self.total - self._visible)
+        window = self._rows[self._offset:self._offset + self._visible + 1]
+
+        current = list(super().get_children())
+        # 視窗內有選取時以它為準；否則保留移出視窗的選取，捲回來時恢復
+        selection = set(super().selection())
+        self._selected = selection or (self._selected - set(current))
+
+        wanted = {iid for iid, _, _ in window}
+        removed = [iid for iid in current if iid not in wanted]
+        if removed:
+            super().delete(*removed)
+            current = [iid for iid in current if iid in wanted]
+
+        for index, (iid, values, tags) in enumerate(window):
+            if super().exists(iid):
+                super().item(iid, values=values, tags=tags)
+                if index >= len(current) or current[index] != iid:
+                    super().move(iid, "", index)
+                    current.remove(iid)
+                    current.insert(index, iid)
+            else:
+                super().insert("", index, iid=iid, values=values, tags=tags)
+                current.insert(index, iid)
+
+        if self._loading and len(window) <= self._visible:
+            columns = self['columns']
+            values = [""] * len(columns)
+            if len(values) > 1:
+                values[1] = "載入中..."
+            super().insert("", tk.END, iid="__loading__", values=values, tags=('loading',))
+
+        reselect = [iid for iid in self._selected if iid in wanted]
+        if reselect and set(reselect) != set(super().selection()):
+            self.selection_set(reselect)
+
+        self._update_scrollbar()
+        if self.need_rows and self._has_more and self.missing_rows() > 0:
+            self.need_rows()
+
+    def _update_scrollbar(self):
+        if self._yscrollcommand:
+            first, last = self._fractions()
+            self._yscrollcommand(str(first), str(last))